@@ -0,0 +1,169 @@
+"""
+Async variants of the workload and migration read and run endpoints.
+
+These are plain Django async views (DRF views are sync-only) served under
+/api/async/. Under an ASGI server (``uvicorn workload_migrator.asgi:application``)
+a request waiting on the database or a slow client does not hold a worker
+thread. Responses, cursors and ?fields= handling match the sync API, and
+rendering reuses the DRF serializers. Querysets are fully prefetched before
+serialization, so serializing never touches the database.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import Migration, Workload
+from .pagination import IdCursorPagination
+from .serializers import MigrationSerializer, WorkloadSerializer
+from .views import migration_queryset, parse_run_options, workload_queryset
+
+
+def _not_found():
+    return JsonResponse({"detail": "Not found."}, status=404)
+
+
+def _invalid(exc):
+    return JsonResponse(exc.detail, status=400)
+
+
+async def paginate(request, queryset, serializer_class):
+    """
+    Cursor-paginate a queryset on id with the same cursors and page shape as
+    IdCursorPagination, so clients can page through either API.
+    """
+    paginator = IdCursorPagination()
+    paginator.base_url = request.build_absolute_uri()
+    try:
+        cursor = paginator.decode_cursor(request)
+    except NotFound as exc:
+        return JsonResponse({"detail": exc.detail}, status=404)
+    page_size = paginator.get_page_size(request)
+
+    reverse = cursor is not None and cursor.reverse
+    if cursor is None:
+        queryset = queryset.order_by("id")
+    elif reverse:
+        queryset = queryset.filter(id__lt=cursor.position).order_by("-id")
+    else:
+        queryset = queryset.filter(id__gt=cursor.position).order_by("id")
+
+    rows = [obj async for obj in queryset[: page_size + 1]]
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    next_url = previous_url = None
+    if rows:
+        if has_more or reverse:
+            next_url = paginator.encode_cursor(Cursor(0, False, rows[-1].pk))
+        if cursor is not None and (has_more or not reverse):
+            previous_url = paginator.encode_cursor(Cursor(0, True, rows[0].pk))
+
+    try:
+        serializer = serializer_class(rows, many=True, context={"request": request})
+    except ValidationError as exc:
+        return _invalid(exc)
+    return JsonResponse(
+        {"next": next_url, "previous": previous_url, "results": serializer.data}
+    )
+
+
+@require_GET
+async def workload_list(request):
+    request = Request(request)
+    return await paginate(request, workload_queryset(request), WorkloadSerializer)
+
+
+@require_GET
+async def workload_detail(request, pk):
+    request = Request(request)
+    try:
+        workload = await workload_queryset(request).aget(pk=pk)
+    except Workload.DoesNotExist:
+        return _not_found()
+    try:
+        serializer = WorkloadSerializer(workload, context={"request": request})
+    except ValidationError as exc:
+        return _invalid(exc)
+    return JsonResponse(serializer.data)
+
+
+@require_GET
+async def migration_list(request):
+    request = Request(request)
+    return await paginate(request, migration_queryset(request), MigrationSerializer)
+
+
+@require_GET
+async def migration_detail(request, pk):
+    request = Request(request)
+    try:
+        migration = await migration_queryset(request).aget(pk=pk)
+    except Migration.DoesNotExist:
+        return _not_found()
+    try:
+        serializer = MigrationSerializer(migration, context={"request": request})
+    except ValidationError as exc:
+        return _invalid(exc)
+    return JsonResponse(serializer.data)
+
+
+def _run_response(migration, task_id, replayed=False):
+    response = JsonResponse({"task_id": task_id, "status": migration.state}, status=202)
+    if replayed:
+        response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _already_running(migration):
+    return JsonResponse(
+        {"detail": "Migration is already running.", "task_id": migration.task_id},
+        status=409,
+    )
+
+
+@csrf_exempt
+@require_POST
+async def migration_run(request, pk):
+    """
+    Async counterpart of POST /api/migrations/{id}/run/ with the same body,
+    claim and Idempotency-Key semantics.
+    """
+    try:
+        migration = await Migration.objects.aget(pk=pk)
+    except Migration.DoesNotExist:
+        return _not_found()
+    parsers = [parser() for parser in api_settings.DEFAULT_PARSER_CLASSES]
+    options, errors = parse_run_options(Request(request, parsers=parsers))
+    if errors:
+        return JsonResponse(errors, status=400)
+    key = request.headers.get("Idempotency-Key", "")
+    if key and migration.run_key == key:
+        return _run_response(migration, migration.task_id, replayed=True)
+    if migration.is_running:
+        return _already_running(migration)
+    if await migration.selected_mountpoints.filter(
+        mount_point_name__iexact="C:\\"
+    ).aexists():
+        return JsonResponse(
+            {"detail": "Migrations including C:\\ are not allowed."}, status=400
+        )
+    from core.tasks import dispatch_migration
+
+    task_id = await sync_to_async(dispatch_migration)(
+        migration.pk,
+        simulated_minutes=0,
+        run_key=key,
+        incremental=options["incremental"],
+    )
+    await migration.arefresh_from_db()
+    if task_id is None:
+        return _already_running(migration)
+    return _run_response(migration, task_id)
@@ -0,0 +1,789 @@
+"""
+Micro-benchmarks for hot paths in the core app.
+
+Each benchmark is a function registered with @benchmark and returns a
+JSON-serialisable dict. Benchmarks run inside a transaction that is always
+rolled back, so they can be pointed at a development database safely:
+
+    python manage.py benchmark copy_mountpoints --param sizes=1,10,100,1000
+
+Benchmarks that need concurrent database connections (the "suite" load test)
+cannot share one transaction. They are registered with rollback=False, commit
+their seed data and delete it again when done.
+"""
+
+import asyncio
+import copy
+import heapq
+import ipaddress
+import itertools
+import math
+import platform
+import random
+import statistics
+import threading
+import time
+from uuid import uuid4
+
+import django
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.db.utils import load_backend
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Credentials, Migration, MigrationTarget, MountPoint, Workload
+from .transfer import GB, LocalTransport, TransferEngine
+
+BENCHMARKS = {}
+
+
+def benchmark(name, rollback=True):
+    def decorator(func):
+        func.rollback = rollback
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run_benchmark(name, **params):
+    """
+    Run a registered benchmark and discard everything it wrote.
+    """
+    func = BENCHMARKS[name]
+    if not func.rollback:
+        return func(**params)
+    result = {}
+    try:
+        with transaction.atomic():
+            result = func(**params)
+            raise _Rollback
+    except _Rollback:
+        pass
+    return result
+
+
+def measure(func, *args, **kwargs):
+    """
+    Call func once, returning its wall time in milliseconds and query count.
+    """
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+    return {"ms": round(elapsed * 1000, 3), "queries": len(ctx.captured_queries)}
+
+
+_ip_counter = 0
+
+
+def next_ip():
+    global _ip_counter
+    _ip_counter += 1
+    return (
+        f"10.{(_ip_counter >> 16) & 255}.{(_ip_counter >> 8) & 255}.{_ip_counter & 255}"
+    )
+
+
+def seed_migration(mountpoint_count, total_size=1):
+    """
+    Create a source workload with mountpoint_count mount points, a target
+    and a migration that selects all of them.
+    """
+    creds = Credentials.objects.create(username="bench", password="p", domain="d")
+    source = Workload.objects.create(ip=next_ip(), credentials=creds)
+    target_vm = Workload.objects.create(ip=next_ip(), credentials=creds)
+    mountpoints = MountPoint.objects.bulk_create(
+        MountPoint(workload=source, mount_point_name=f"M{i}", total_size=total_size)
+        for i in range(mountpoint_count)
+    )
+    target = MigrationTarget.objects.create(
+        cloud_type="aws", cloud_credentials=creds, target_vm=target_vm
+    )
+    migration = Migration.objects.create(source=source, migration_target=target)
+    migration.selected_mountpoints.set(mountpoints)
+    return migration
+
+
+@benchmark("copy_mountpoints")
+def copy_mountpoints(sizes=(1, 10, 100, 1000)):
+    """
+    Query count and latency of Migration.run against selected mount points.
+    """
+    if isinstance(sizes, int):
+        sizes = [sizes]
+    rows = []
+    for size in sizes:
+        migration = seed_migration(size)
+        engine = TransferEngine(LocalTransport())
+        stats = measure(migration.run, simulated_minutes=0, engine=engine)
+        rows.append({"mountpoints": size, **stats})
+    return {"benchmark": "copy_mountpoints", "results": rows}
+
+
+@benchmark("workload_save")
+def workload_save(rounds=100):
+    """
+    Queries per Workload.save() for freshly loaded and for created instances.
+    """
+    creds = Credentials.objects.create(username="bench", password="p", domain="d")
+    ids = [
+        Workload.objects.create(ip=next_ip(), credentials=creds).pk
+        for _ in range(rounds)
+    ]
+    loaded = list(Workload.objects.filter(pk__in=ids))
+    created = [Workload.objects.create(ip=next_ip(), credentials=creds)]
+
+    def save_all(objs):
+        for obj in objs:
+            obj.save()
+
+    rows = []
+    for label, objs in (("loaded", loaded), ("created", created * rounds)):
+        stats = measure(save_all, objs)
+        rows.append(
+            {
+                "instances": label,
+                "saves": rounds,
+                "queries_per_save": stats["queries"] / rounds,
+                "ms_per_save": round(stats["ms"] / rounds, 4),
+            }
+        )
+    return {"benchmark": "workload_save", "results": rows}
+
+
+def seed_inventory(rows):
+    """
+    Bulk-load about `rows` mount points, spread ten per workload, plus one
+    migration target and one migration per ten workloads. Everything is
+    generated server-side with generate_series, which takes seconds even for
+    millions of rows. Value distributions are skewed so that the indexed
+    predicates are selective, as in production:
+
+    - 1% of workloads have a C:\\ mount point;
+    - 1% of targets are vCloud;
+    - 1% of migrations are queued or running, the rest finished.
+    """
+    workloads = max(rows // 10, 1)
+    creds_id = Credentials.objects.create(username="bench", password="p", domain="d").pk
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO core_workload (ip, credentials_id) "
+            "SELECT '100.64.0.0'::inet + g, %s FROM generate_series(1, %s) g",
+            [creds_id, workloads],
+        )
+        cursor.execute(
+            "INSERT INTO core_mountpoint (workload_id, mount_point_name, total_size) "
+            "SELECT w.id, CASE WHEN n = 0 AND w.id %% 100 = 0 THEN 'C:\\' "
+            "ELSE chr(68 + n) || ':\\' END, 1 + (random() * 500)::int "
+            "FROM core_workload w CROSS JOIN generate_series(0, 9) n "
+            "WHERE w.credentials_id = %s",
+            [creds_id],
+        )
+        cursor.execute(
+            "INSERT INTO core_migrationtarget (cloud_type, cloud_credentials_id, "
+            "target_vm_id) SELECT CASE WHEN w.id %% 100 = 0 THEN 'vcloud' "
+            "ELSE (ARRAY['aws', 'azure', 'vsphere'])[1 + w.id %% 3] END, %s, w.id "
+            "FROM core_workload w WHERE w.credentials_id = %s AND w.id %% 10 = 0",
+            [creds_id, creds_id],
+        )
+        cursor.execute(
+            "INSERT INTO core_migration (source_id, migration_target_id, state, "
+            "priority, bytes_total, bytes_transferred, transfer_rate, task_id, "
+            "run_key, checkpoint) "
+            "SELECT t.target_vm_id - 1, t.id, CASE t.id %% 100 "
+            "WHEN 0 THEN 'queued' WHEN 1 THEN 'running' ELSE 'success' END, "
+            "0, 0, 0, 0, '', '', '{}' "
+            "FROM core_migrationtarget t WHERE t.cloud_credentials_id = %s",
+            [creds_id],
+        )
+        for table in ("core_workload", "core_mountpoint", "core_migration"):
+            cursor.execute(f"ANALYZE {table}")
+        cursor.execute("ANALYZE core_migrationtarget")
+
+
+def uses_index(plan):
+    return "Index Scan" in plan or "Index Only Scan" in plan
+
+
+@benchmark("index_plans")
+def index_plans(rows=1_000_000):
+    """
+    EXPLAIN ANALYZE output and timings of the indexed hot queries against a
+    seeded inventory of `rows` mount points.
+    """
+    started = time.perf_counter()
+    seed_inventory(rows)
+    seed_ms = round((time.perf_counter() - started) * 1000, 1)
+    migration = seed_migration(10)
+
+    queries = {
+        "mountpoint_name_iexact": MountPoint.objects.filter(
+            mount_point_name__iexact="c:\\"
+        ),
+        "migration_has_c_root": migration.selected_mountpoints.filter(
+            mount_point_name__iexact="C:\\"
+        ),
+        "mountpoint_by_workload_and_name": MountPoint.objects.filter(
+            workload_id=migration.source_id, mount_point_name="M1"
+        ),
+        "migrations_running": Migration.objects.filter(state=Migration.State.RUNNING),
+        "migrations_queued": Migration.objects.filter(state=Migration.State.QUEUED),
+        "targets_by_cloud_type": MigrationTarget.objects.filter(cloud_type="vcloud"),
+    }
+    results = []
+    for name, queryset in queries.items():
+        stats = measure(lambda: list(queryset.values_list("pk", flat=True)))
+        plan = queryset.explain(analyze=True)
+        results.append(
+            {
+                "query": name,
+                "ms": stats["ms"],
+                "uses_index": uses_index(plan),
+                "plan": plan.splitlines(),
+            }
+        )
+
+    # The same queries with index scans disabled, for comparison.
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_indexscan = off")
+        cursor.execute("SET LOCAL enable_bitmapscan = off")
+    for row, queryset in zip(results, queries.values()):
+        stats = measure(lambda: list(queryset.values_list("pk", flat=True)))
+        row["ms_without_index"] = stats["ms"]
+    return {
+        "benchmark": "index_plans",
+        "mountpoints": rows,
+        "seed_ms": seed_ms,
+        "results": results,
+    }
+
+
+CONNECTION_MODES = {
+    "new_connection": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False},
+    "persistent": {"CONN_MAX_AGE": None, "CONN_HEALTH_CHECKS": False},
+    "persistent_health_checks": {"CONN_MAX_AGE": None, "CONN_HEALTH_CHECKS": True},
+}
+
+
+def connection_for(mode, alias="default"):
+    """
+    A standalone DatabaseWrapper for `alias` with the mode's settings applied.
+    It is independent of the benchmark's rolled-back transaction.
+    """
+    settings_dict = copy.deepcopy(connections.settings[alias])
+    overrides = CONNECTION_MODES[mode]
+    settings_dict.update(overrides)
+    backend = load_backend(settings_dict["ENGINE"])
+    return backend.DatabaseWrapper(settings_dict, alias)
+
+
+@benchmark("db_connections")
+def db_connections(requests=200, modes=tuple(CONNECTION_MODES)):
+    """
+    Per-request latency of a small read query under each connection mode.
+    Every simulated request ends like a real one (request_finished or
+    task_postrun): close_if_unusable_or_obsolete() closes or keeps the
+    connection as configured.
+    """
+    if isinstance(modes, str):
+        modes = [modes]
+    rows = []
+    for mode in modes:
+        conn = connection_for(mode)
+        conn.ensure_connection()
+        conn.close_if_unusable_or_obsolete()
+
+        timings = []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT id, ip FROM core_workload LIMIT 10")
+                    cursor.fetchall()
+                conn.close_if_unusable_or_obsolete()
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            conn.close()
+        rows.append(
+            {
+                "mode": mode,
+                "requests": requests,
+                "mean_ms": round(statistics.fmean(timings), 3),
+                "p50_ms": round(statistics.median(timings), 3),
+                "p95_ms": round(statistics.quantiles(timings, n=20)[-1], 3),
+            }
+        )
+    return {"benchmark": "db_connections", "results": rows}
+
+
+def summarize(latencies, elapsed):
+    """
+    Throughput and latency percentiles (nearest-rank) for a load-test run.
+    """
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return round(ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)], 3)
+
+    return {
+        "requests": len(ordered),
+        "rps": round(len(ordered) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+async def drive_requests(url, requests, concurrency, params=None):
+    """
+    Issue `requests` GETs against url through the ASGI handler, at most
+    `concurrency` at a time, and summarise throughput and latency. Every
+    request carries a distinct `_` query parameter so response caches miss.
+    """
+    client = AsyncClient()
+    run = uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(url, {**(params or {}), "_": f"{run}{i}"})
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return {
+        "errors": errors,
+        **summarize(latencies, time.perf_counter() - started),
+    }
+
+
+@benchmark("async_load")
+def async_load(requests=200, concurrency=(1, 10, 50), rows=1000, page_size=20):
+    """
+    Concurrent-request throughput of the sync DRF workload list and its async
+    counterpart, both driven through the ASGI handler as uvicorn would.
+    Inside the benchmark's transaction every query runs on one thread and
+    connection, so this compares per-request cost under concurrency. It does
+    not show the worker-slot savings a real ASGI deployment gets from
+    awaiting slow clients.
+    """
+    if isinstance(concurrency, int):
+        concurrency = [concurrency]
+    seed_inventory(rows)
+    paths = {
+        "sync": reverse("workload-list"),
+        "async": reverse("async-workload-list"),
+    }
+    results = []
+    for level in concurrency:
+        for label, url in paths.items():
+            stats = async_to_sync(drive_requests)(
+                url, requests, level, {"page_size": page_size}
+            )
+            results.append({"path": label, "concurrency": level, **stats})
+    return {"benchmark": "async_load", "results": results}
+
+
+# Fleet shape used by the load-test suite. Every workload has a C:\ system
+# drive plus a few data drives; sizes are log-normal, so most volumes are
+# tens to hundreds of GB with a long tail of multi-TB ones.
+CLOUD_WEIGHTS = {"aws": 50, "azure": 30, "vsphere": 15, "vcloud": 5}
+DATA_DRIVES = "DEFGHIJ"
+
+
+def _volume_gb(rng, system=False):
+    median = 80 if system else 200
+    return max(1, min(int(rng.lognormvariate(math.log(median), 1.0)), 16384))
+
+
+def seed_fleet(workloads=200, migrations=50, seed=0):
+    """
+    Create `workloads` source workloads with mount points and up to
+    `migrations` not-started migrations of their data drives, each to its
+    own target VM. Everything hangs off one Credentials row, so deleting
+    that row removes the whole fleet.
+    :return: the Credentials row
+    """
+    rng = random.Random(seed)
+    ips = (str(ipaddress.ip_address("198.18.0.0") + i) for i in itertools.count(1))
+    creds = Credentials.objects.create(username="bench", password="p", domain="d")
+    sources = Workload.objects.bulk_create(
+        Workload(ip=next(ips), credentials=creds) for _ in range(workloads)
+    )
+    drives = {}
+    for workload in sources:
+        count = min(int(rng.expovariate(1 / 2)), len(DATA_DRIVES))
+        drives[workload.pk] = [
+            MountPoint(
+                workload=workload, mount_point_name="C:\\", total_size=_volume_gb(rng)
+            )
+        ] + [
+            MountPoint(
+                workload=workload,
+                mount_point_name=f"{letter}:\\",
+                total_size=_volume_gb(rng),
+            )
+            for letter in DATA_DRIVES[:count]
+        ]
+    MountPoint.objects.bulk_create(mp for mps in drives.values() for mp in mps)
+
+    movable = [w for w in sources if len(drives[w.pk]) > 1]
+    chosen = rng.sample(movable, min(migrations, len(movable)))
+    target_vms = Workload.objects.bulk_create(
+        Workload(ip=next(ips), credentials=creds) for _ in chosen
+    )
+    targets = MigrationTarget.objects.bulk_create(
+        MigrationTarget(
+            cloud_type=rng.choices(
+                list(CLOUD_WEIGHTS), weights=list(CLOUD_WEIGHTS.values())
+            )[0],
+            cloud_credentials=creds,
+            target_vm=vm,
+        )
+        for vm in target_vms
+    )
+    planned = Migration.objects.bulk_create(
+        Migration(source=source, migration_target=target)
+        for source, target in zip(chosen, targets)
+    )
+    Selected = Migration.selected_mountpoints.through
+    Selected.objects.bulk_create(
+        Selected(migration_id=migration.pk, mountpoint_id=mp.pk)
+        for migration, source in zip(planned, chosen)
+        for mp in drives[source.pk][1:]
+    )
+    return creds
+
+
+def drive_concurrently(call, requests, concurrency):
+    """
+    Call call(i) for i in range(requests) from `concurrency` threads, each
+    with its own database connection. call returns True on success.
+    :return: throughput, latency percentiles, errors and queries per call
+    """
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies, queries = [], []
+    errors = 0
+
+    def worker():
+        nonlocal errors
+        try:
+            while (i := next(counter)) < requests:
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    try:
+                        ok = call(i)
+                    except Exception:
+                        ok = False
+                    elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    queries.append(len(ctx.captured_queries))
+                    errors += not ok
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "concurrency": concurrency,
+        "errors": errors,
+        **summarize(latencies, time.perf_counter() - started),
+        "queries_per_request": round(statistics.fmean(queries), 2),
+    }
+
+
+def suite_endpoints(creds):
+    """
+    Read endpoints exercised by the suite: name -> function of i returning
+    a URL. Detail endpoints cycle through the seeded rows.
+    """
+    workload_ids = list(creds.workloads.values_list("pk", flat=True))
+    migration_ids = list(
+        Migration.objects.filter(source__credentials=creds).values_list("pk", flat=True)
+    )
+    return {
+        "workload_list": lambda i: reverse("workload-list"),
+        "workload_detail": lambda i: reverse(
+            "workload-detail", args=[workload_ids[i % len(workload_ids)]]
+        ),
+        "target_list": lambda i: reverse("migrationtarget-list"),
+        "migration_list": lambda i: reverse("migration-list"),
+        "migration_detail": lambda i: reverse(
+            "migration-detail", args=[migration_ids[i % len(migration_ids)]]
+        ),
+        "async_workload_list": lambda i: reverse("async-workload-list"),
+        "async_migration_list": lambda i: reverse("async-migration-list"),
+    }
+
+
+@benchmark("suite", rollback=False)
+def suite(
+    workloads=200,
+    migrations=50,
+    requests=200,
+    concurrency=10,
+    page_size=50,
+    chunk_gb=64,
+    cached=0,
+    seed=0,
+):
+    """
+    Load test of the REST API and the migration pipeline against a seeded
+    fleet. Each read endpoint gets `requests` GETs from `concurrency`
+    threads. Unless `cached` is set, every request misses the response
+    cache. Then every seeded migration is run through the run_migration
+    task (eagerly), again from `concurrency` threads. The fleet is committed
+    so the threads can see it, and deleted afterwards.
+    """
+    from core.tasks import run_migration
+
+    started = time.perf_counter()
+    creds = seed_fleet(workloads, migrations, seed=seed)
+    try:
+        seed_ms = round((time.perf_counter() - started) * 1000, 1)
+        run = uuid4().hex[:8]
+        endpoints = {}
+        for name, url_for in suite_endpoints(creds).items():
+
+            def get(i, url_for=url_for):
+                params = {"page_size": page_size}
+                if not cached:
+                    params["_"] = f"{run}{i}"
+                return Client().get(url_for(i), params).status_code == 200
+
+            endpoints[name] = drive_concurrently(get, requests, concurrency)
+
+        migration_ids = list(
+            Migration.objects.filter(source__credentials=creds).values_list(
+                "pk", flat=True
+            )
+        )
+        total_gb = MountPoint.objects.filter(
+            pk__in=Migration.selected_mountpoints.through.objects.filter(
+                migration_id__in=migration_ids
+            ).values("mountpoint_id")
+        ).aggregate(total=Sum("total_size"))["total"]
+
+        def migrate(i):
+            result = run_migration.apply((migration_ids[i],), {"simulated_minutes": 0})
+            return result.successful() and result.result is True
+
+        with override_settings(MIGRATION_CHUNK_SIZE=chunk_gb * GB):
+            pipeline = drive_concurrently(migrate, len(migration_ids), concurrency)
+        pipeline["gb_transferred"] = total_gb or 0
+    finally:
+        creds.delete()
+
+    return {
+        "benchmark": "suite",
+        "created_at": timezone.now().isoformat(),
+        "environment": {
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+        },
+        "params": {
+            "workloads": workloads,
+            "migrations": migrations,
+            "requests": requests,
+            "concurrency": concurrency,
+            "page_size": page_size,
+            "chunk_gb": chunk_gb,
+            "cached": bool(cached),
+            "seed": seed,
+        },
+        "seed_ms": seed_ms,
+        "endpoints": endpoints,
+        "run_migration": pipeline,
+    }
+
+
+@benchmark("plan")
+def plan(migrations=(1000, 10_000, 100_000)):
+    """
+    Latency and query count of plan_migrations() over growing waves of
+    seeded migrations.
+    """
+    from core.planner import plan_migrations
+
+    if isinstance(migrations, int):
+        migrations = [migrations]
+    rows = []
+    for count in migrations:
+        creds = seed_fleet(workloads=count * 2, migrations=count)
+        queryset = Migration.objects.filter(source__credentials=creds)
+        stats = measure(plan_migrations, queryset)
+        rows.append({"migrations": queryset.count(), **stats})
+        creds.delete()
+    return {"benchmark": "plan", "results": rows}
+
+
+def simulate_workers(jobs, nodes, prefetch_multiplier, acks_late):
+    """
+    Discrete-event model of Celery worker nodes draining their queues, all
+    published at t=0.
+
+    jobs: [(queue, seconds)] in publish order.
+    nodes: [(queues, concurrency)], one entry per worker node.
+    A node reserves messages from the queues it consumes until it holds
+    prefetch_multiplier * concurrency unacknowledged ones, and runs them in
+    order as its processes free up. With acks_late a running task stays
+    unacknowledged; otherwise it is acked on start and the node reserves
+    another message in its place. The broker hands messages out round-robin.
+
+    :return: completion time of each job, aligned with jobs
+    """
+    pending = {}
+    for index, (queue, _) in enumerate(jobs):
+        pending.setdefault(queue, []).append(index)
+    for backlog in pending.values():
+        backlog.reverse()  # pop() takes the oldest
+    limit = [prefetch_multiplier * concurrency for _, concurrency in nodes]
+    reserved = [[] for _ in nodes]
+    running = [0] * len(nodes)
+    done = [None] * len(jobs)
+    events = []  # (finish time, node)
+    now = 0.0
+
+    def unacked(n):
+        return len(reserved[n]) + (running[n] if acks_late else 0)
+
+    def deliver():
+        delivered = True
+        while delivered:
+            delivered = False
+            for n, (queues, _) in enumerate(nodes):
+                if unacked(n) >= limit[n]:
+                    continue
+                for queue in queues:
+                    if pending.get(queue):
+                        reserved[n].append(pending[queue].pop())
+                        delivered = True
+                        break
+
+    def start():
+        for n, (_, concurrency) in enumerate(nodes):
+            while reserved[n] and running[n] < concurrency:
+                index = reserved[n].pop(0)
+                running[n] += 1
+                done[index] = now + jobs[index][1]
+                heapq.heappush(events, (done[index], n))
+
+    deliver()
+    start()
+    while events:
+        now, n = heapq.heappop(events)
+        running[n] -= 1
+        deliver()
+        start()
+        deliver()
+    return done
+
+
+def split_processes(total, weights):
+    """
+    Split `total` worker processes across queues in proportion to `weights`
+    (e.g. each queue's hours of work), giving every queue at least one.
+    """
+    shares = [max(1, round(total * w / sum(weights))) for w in weights]
+    while sum(shares) > total and max(shares) > 1:
+        shares[shares.index(max(shares))] -= 1
+    while sum(shares) < total:
+        shares[shares.index(max(shares))] += 1
+    return shares
+
+
+@benchmark("queue_routing_sim")
+def queue_routing_sim(migrations=500, processes=14, nodes=3, gb_per_hour=360, seed=0):
+    """
+    Simulated completion times of a mixed wave of migrations, published at
+    once, under
+    the old setup and under size-aware routing, with the same total number of
+    worker processes:
+
+    - single_queue: `nodes` worker nodes on one queue with Celery's defaults
+      (prefetch multiplier 4, ack on start);
+    - single_queue_prefetch_1: the same nodes with prefetch 1 and acks_late;
+    - routed: one node per MIGRATION_QUEUES queue, prefetch 1 and acks_late,
+      with the processes split by each queue's share of the work.
+
+    Sizes follow the seed_fleet distribution. Durations are size over
+    `gb_per_hour` per process. This is a model, not a measurement: nothing
+    touches a broker, a worker or the database (see simulate_workers), so
+    broker latency, task overhead and redelivery are not accounted for.
+    """
+    from core.tasks import migration_queue
+
+    rng = random.Random(seed)
+    sizes = []
+    for _ in range(migrations):
+        count = max(1, min(int(rng.expovariate(1 / 2)), len(DATA_DRIVES)))
+        sizes.append(sum(_volume_gb(rng) for _ in range(count)))
+    queues = [migration_queue(size) for size in sizes]
+    seconds = [size / gb_per_hour * 3600 for size in sizes]
+
+    names = [name for name, _ in settings.MIGRATION_QUEUES]
+    work = [sum(s for q, s in zip(queues, seconds) if q == name) or 1 for name in names]
+    routed_nodes = [
+        ((name,) if i else ("celery", name), share)
+        for i, (name, share) in enumerate(zip(names, split_processes(processes, work)))
+    ]
+    single = [("celery", duration) for duration in seconds]
+    single_nodes = [
+        (("celery",), share) for share in split_processes(processes, [1] * nodes)
+    ]
+    setups = {
+        "single_queue": (single, single_nodes, 4, False),
+        "single_queue_prefetch_1": (single, single_nodes, 1, True),
+        "routed": (list(zip(queues, seconds)), routed_nodes, 1, True),
+    }
+
+    def minutes(values):
+        ordered = sorted(values)
+
+        def percentile(p):
+            return round(ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)] / 60)
+
+        return {
+            "p50_min": percentile(50),
+            "p95_min": percentile(95),
+            "max_min": round(ordered[-1] / 60),
+        }
+
+    results = []
+    for name, (jobs, nodes, multiplier, acks_late) in setups.items():
+        done = simulate_workers(jobs, nodes, multiplier, acks_late)
+        row = {
+            "setup": name,
+            "processes": [concurrency for _, concurrency in nodes],
+            "all": minutes(done),
+        }
+        for queue in names:
+            subset = [done[i] for i in range(migrations) if queues[i] == queue]
+            if subset:
+                row[queue] = {"migrations": len(subset), **minutes(subset)}
+        results.append(row)
+    return {"benchmark": "queue_routing_sim", "results": results}
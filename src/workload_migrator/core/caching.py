@@ -0,0 +1,171 @@
+"""
+Response cache for read-heavy API endpoints.
+
+Rendered list and retrieve responses are stored in Django's cache together
+with an ETag. Cache keys embed version counters instead of being deleted:
+
+- one list version per namespace ("workloads", "targets"), bumped whenever
+  any row that can appear in that namespace's responses changes;
+- one version per object, bumped when that object (or something nested
+  in it) changes.
+
+Bumping a version makes every dependent key unreachable at once, which works
+the same on locmem and Redis. Versions are random tokens rather than numbers:
+the cache may evict a version key like any other, and a fresh token never
+brings back the responses stored under an earlier one. Bumps are applied
+when the surrounding transaction commits, so a response rendered from
+uncommitted rows is never cached under the new version. The model signal
+handlers in core.signals do the bumping. Bulk writes that skip signals call
+invalidate() directly.
+"""
+
+import hashlib
+import threading
+from contextlib import contextmanager
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+
+WORKLOADS = "workloads"
+TARGETS = "targets"
+
+_local = threading.local()
+
+
+def _timeout():
+    return getattr(settings, "API_CACHE_TIMEOUT", 300)
+
+
+def _version_key(namespace, pk=None):
+    return f"api:v:{namespace}" if pk is None else f"api:v:{namespace}:{pk}"
+
+
+def _new_version():
+    return uuid4().hex[:12]
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def _bump_all(keys):
+    cache.set_many({key: _new_version() for key in keys}, None)
+
+
+def _bump_on_commit(keys):
+    if keys:
+        transaction.on_commit(lambda: _bump_all(keys))
+
+
+def invalidate(namespace, pks=()):
+    """
+    Invalidate the namespace's list responses and the given objects' detail
+    responses once the current transaction commits (at once outside one).
+    Inside batch_invalidation() the bumps are collected and applied once
+    on exit.
+    """
+    keys = {_version_key(namespace)} | {_version_key(namespace, pk) for pk in pks}
+    pending = getattr(_local, "pending", None)
+    if pending is not None:
+        pending.update(keys)
+        return
+    _bump_on_commit(keys)
+
+
+@contextmanager
+def batch_invalidation():
+    """
+    Coalesce invalidations (e.g. one post_delete per deleted row) so each
+    version counter is bumped at most once.
+    """
+    if getattr(_local, "pending", None) is not None:
+        yield
+        return
+    _local.pending = set()
+    try:
+        yield
+    finally:
+        pending, _local.pending = _local.pending, None
+        _bump_on_commit(pending)
+
+
+def _etag(content):
+    return '"' + hashlib.md5(content, usedforsecurity=False).hexdigest() + '"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("If-None-Match", "")
+    return etag in {tag.strip() for tag in header.split(",")} or header == "*"
+
+
+class CachedResponseMixin:
+    """
+    Viewset mixin that serves list() and retrieve() from the cache and
+    answers conditional GETs (If-None-Match) with 304 Not Modified.
+    """
+
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, None, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        object_pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self._cached(request, object_pk, super().retrieve, *args, **kwargs)
+
+    def _cache_key(self, request, object_pk):
+        namespace = self.cache_namespace
+        versions = [_get_version(_version_key(namespace))]
+        if object_pk is not None:
+            versions.append(_get_version(_version_key(namespace, object_pk)))
+        variant = "|".join(
+            [
+                request.get_host(),
+                request.get_full_path(),
+                request.headers.get("Accept", ""),
+            ]
+        )
+        digest = hashlib.md5(variant.encode(), usedforsecurity=False).hexdigest()
+        version = ".".join(str(v) for v in versions)
+        return f"api:r:{namespace}:{version}:{digest}"
+
+    def _cached(self, request, object_pk, handler, *args, **kwargs):
+        key = self._cache_key(request, object_pk)
+        entry = cache.get(key)
+        if entry is not None:
+            if etag_matches(request, entry["etag"]):
+                response = HttpResponseNotModified()
+            else:
+                response = HttpResponse(
+                    entry["content"], content_type=entry["content_type"]
+                )
+            response["ETag"] = entry["etag"]
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        response = self.finalize_response(request, response, *args, **kwargs)
+        response.render()
+        etag = _etag(response.content)
+        cache.set(
+            key,
+            {
+                "content": response.content,
+                "content_type": response["Content-Type"],
+                "etag": etag,
+            },
+            _timeout(),
+        )
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
@@ -0,0 +1,171 @@
+"""
+Publish/subscribe channel for migration state and progress changes.
+
+Producers (Migration.run, the progress tracker, the scheduler) call
+publish_migration() from synchronous code. The server-sent events view
+subscribes asynchronously. RedisBroker connects processes, such as Celery
+workers and ASGI web servers, in production. InMemoryBroker is an
+in-process stand-in for development and tests.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+ALL_MIGRATIONS = "migrations"
+
+
+def migration_channel(migration_id):
+    return f"migrations.{migration_id}"
+
+
+def migration_event(migration):
+    """
+    The payload pushed to subscribers for a migration.
+    """
+    return {
+        "id": migration.pk,
+        "state": migration.state,
+        "bytes_total": migration.bytes_total,
+        "bytes_transferred": migration.bytes_transferred,
+        "transfer_rate": migration.transfer_rate,
+        "eta_seconds": migration.eta_seconds,
+    }
+
+
+class InMemoryBroker:
+    """
+    Process-local broker. Messages published from any thread are delivered
+    to subscribers on their own event loops.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def subscribe(self, channel):
+        return _InMemorySubscription(self, channel)
+
+    def _add(self, channel, subscription):
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+
+    def _remove(self, channel, subscription):
+        with self._lock:
+            self._subscribers[channel].discard(subscription)
+
+
+class _InMemorySubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.broker._add(self.channel, self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker._remove(self.channel, self)
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+        except RuntimeError:  # subscriber's loop already closed
+            self.broker._remove(self.channel, self)
+
+    async def get(self, timeout=None):
+        """
+        Next message, or None if nothing arrived within timeout seconds.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RedisBroker:
+    """
+    Broker backed by Redis pub/sub, shared by web and worker processes.
+    """
+
+    def __init__(self, url=None):
+        self.url = url or settings.MIGRATION_EVENTS_URL
+        self._client = None
+
+    def publish(self, channel, message):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(channel, json.dumps(message, cls=DjangoJSONEncoder))
+
+    def subscribe(self, channel):
+        return _RedisSubscription(self.url, channel)
+
+
+class _RedisSubscription:
+    def __init__(self, url, channel):
+        self.url = url
+        self.channel = channel
+
+    async def __aenter__(self):
+        import redis.asyncio
+
+        self.client = redis.asyncio.Redis.from_url(self.url)
+        self.pubsub = self.client.pubsub()
+        await self.pubsub.subscribe(self.channel)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.pubsub.unsubscribe(self.channel)
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+    async def get(self, timeout=None):
+        message = await self.pubsub.get_message(
+            ignore_subscribe_messages=True, timeout=timeout
+        )
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+
+@lru_cache(maxsize=None)
+def _load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    path = getattr(settings, "MIGRATION_EVENTS_BROKER", "core.events.InMemoryBroker")
+    return _load_broker(path)
+
+
+def publish_migration(migration):
+    """
+    Push a migration's current state and progress to its subscribers.
+    Publishing is best-effort: a broker outage must never fail a migration.
+    """
+    message = migration_event(migration)
+    try:
+        broker = get_broker()
+        broker.publish(ALL_MIGRATIONS, message)
+        broker.publish(migration_channel(migration.pk), message)
+    except Exception:
+        logger.warning("Could not publish event for migration %s", migration.pk)
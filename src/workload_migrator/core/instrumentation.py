@@ -0,0 +1,348 @@
+"""
+Per-request and per-task instrumentation.
+
+For every HTTP request (InstrumentationMiddleware) and every Celery task
+(receivers in core.signals), a Measurement records:
+
+- wall time;
+- the number of database queries and the time spent in them;
+- time spent turning model instances into API data (TimedSerializerMixin).
+
+The current Measurement lives in a context variable. Queries run through
+sync_to_async, and eager tasks started by a request, are attributed to it.
+Results are:
+
+- returned on responses as a Server-Timing header;
+- aggregated into per-process counters and histograms, exposed in the
+  Prometheus text format by metrics_view at /metrics on web processes, and
+  by serve_metrics() on Celery worker processes;
+- optionally profiled: when PROFILE_SAMPLE_RATE > 0, that fraction of
+  requests runs under a profiler (cProfile, or pyinstrument if
+  PROFILER="pyinstrument"). Any profiled request slower than
+  PROFILE_THRESHOLD_MS is dumped to PROFILE_DIR.
+"""
+
+import contextvars
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+_current = contextvars.ContextVar("measurement", default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+@dataclass
+class Measurement:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_seconds: float = 0.0
+    serialize_seconds: float = 0.0
+    serializing: bool = False
+    parent: "Measurement | None" = None
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def merge_into_parent(self):
+        if self.parent is not None:
+            self.parent.queries += self.queries
+            self.parent.db_seconds += self.db_seconds
+            self.parent.serialize_seconds += self.serialize_seconds
+
+
+def begin():
+    """
+    Start measuring; returns a token for end().
+    """
+    measurement = Measurement(parent=_current.get())
+    return measurement, _current.set(measurement)
+
+
+def end(measurement, token):
+    _current.reset(token)
+    measurement.merge_into_parent()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute_wrapper, installed on every connection (see
+    core.signals), that charges query time to the current Measurement.
+    """
+    measurement = _current.get()
+    if measurement is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        measurement.queries += 1
+        measurement.db_seconds += time.perf_counter() - started
+
+
+class TimedSerializerMixin:
+    """
+    Charge the time spent in to_representation() to the current Measurement.
+    Nested serializers are counted once, as part of their outermost parent.
+    """
+
+    def to_representation(self, instance):
+        measurement = _current.get()
+        if measurement is None or measurement.serializing:
+            return super().to_representation(instance)
+        measurement.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            measurement.serializing = False
+            measurement.serialize_seconds += time.perf_counter() - started
+
+
+def server_timing(measurement):
+    """
+    Server-Timing header value for a finished measurement.
+    """
+    queries = f'desc="{measurement.queries} queries"'
+    return ", ".join(
+        [
+            f"total;dur={measurement.elapsed * 1000:.1f}",
+            f"db;dur={measurement.db_seconds * 1000:.1f};{queries}",
+            f"serialize;dur={measurement.serialize_seconds * 1000:.1f}",
+        ]
+    )
+
+
+class Registry:
+    """
+    Per-process Prometheus-style counters and histograms. Label sets are
+    tuples of (name, value) pairs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)  # (metric, labels) -> value
+        self.histograms = {}  # (metric, labels) -> [bucket counts..., sum, count]
+
+    def inc(self, metric, labels, value=1):
+        with self._lock:
+            self.counters[(metric, labels)] += value
+
+    def observe(self, metric, labels, value):
+        with self._lock:
+            histogram = self.histograms.setdefault(
+                (metric, labels), [0] * len(DURATION_BUCKETS) + [0.0, 0]
+            )
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def record(self, kind, labels, outcome, measurement):
+        """
+        Add a finished request (kind "http") or task (kind "task").
+        `outcome` is a (name, value) label pair, e.g. ("status", "200").
+        """
+        prefix = f"workload_migrator_{kind}"
+        self.inc(f"{prefix}_total", labels + (outcome,))
+        self.observe(f"{prefix}_duration_seconds", labels, measurement.elapsed)
+        self.inc(f"{prefix}_db_queries_total", labels, measurement.queries)
+        self.inc(f"{prefix}_db_seconds_total", labels, measurement.db_seconds)
+        self.inc(
+            f"{prefix}_serialize_seconds_total", labels, measurement.serialize_seconds
+        )
+
+    def exposition(self):
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, list(value)) for key, value in self.histograms.items()
+            )
+        lines = []
+        for (metric, labels), value in counters:
+            lines.append(f"{metric}{_format(labels)} {value:g}")
+        for (metric, labels), histogram in histograms:
+            for bound, count in zip(DURATION_BUCKETS, histogram):
+                lines.append(f"{metric}_bucket{_format(labels, le=bound)} {count}")
+            inf = _format(labels, le="+Inf")
+            lines.append(f"{metric}_bucket{inf} {histogram[-1]}")
+            lines.append(f"{metric}_sum{_format(labels)} {histogram[-2]:g}")
+            lines.append(f"{metric}_count{_format(labels)} {histogram[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _format(labels, le=None):
+    pairs = [f'{name}="{value}"' for name, value in labels]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+registry = Registry()
+
+
+def metrics_view(request):
+    """
+    GET /metrics: this process's request and task metrics.
+    """
+    return HttpResponse(registry.exposition(), content_type="text/plain; version=0.0.4")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.exposition().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host="0.0.0.0"):
+    """
+    Serve this process's registry at http://host:port/metrics from a daemon
+    thread, for processes without a web server (Celery workers).
+    :return: the server; call shutdown() on it to stop
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+def _profile_sampled():
+    rate = getattr(settings, "PROFILE_SAMPLE_RATE", 0)
+    return rate > 0 and random.random() < rate
+
+
+def _start_profiler(kind):
+    """
+    Start a profiler; returns it and the callable that stops it.
+    """
+    if kind == "pyinstrument":
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        return profiler, profiler.stop
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler, profiler.disable
+
+
+@contextmanager
+def maybe_profile(request, measurement):
+    """
+    Profile the block if the request is sampled; dump the profile if the
+    request turned out slower than PROFILE_THRESHOLD_MS.
+    """
+    if not _profile_sampled():
+        yield
+        return
+    kind = getattr(settings, "PROFILER", "cprofile")
+    profiler, stop = _start_profiler(kind)
+    try:
+        yield
+    finally:
+        stop()
+        threshold = getattr(settings, "PROFILE_THRESHOLD_MS", 500)
+        if measurement.elapsed * 1000 >= threshold:
+            _dump_profile(profiler, kind, request)
+
+
+def _dump_profile(profiler, kind, request):
+    directory = Path(getattr(settings, "PROFILE_DIR", "profiles"))
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", request.path).strip("-") or "root"
+    stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{slug}"
+    if kind == "pyinstrument":
+        (directory / f"{stem}.html").write_text(profiler.output_html())
+    else:
+        profiler.dump_stats(directory / f"{stem}.prof")
+
+
+def _view_label(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match and match.view_name else "unmatched"
+
+
+def _finish(request, response, measurement, token):
+    end(measurement, token)
+    if not response.streaming:
+        response["Server-Timing"] = server_timing(measurement)
+    registry.record(
+        "http",
+        (("view", _view_label(request)), ("method", request.method)),
+        ("status", str(response.status_code)),
+        measurement,
+    )
+    return response
+
+
+class InstrumentationMiddleware:
+    """
+    Measure every request; see the module docstring.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        measurement, token = begin()
+        with maybe_profile(request, measurement):
+            response = self.get_response(request)
+        return _finish(request, response, measurement, token)
+
+    async def __acall__(self, request):
+        measurement, token = begin()
+        with maybe_profile(request, measurement):
+            response = await self.get_response(request)
+        return _finish(request, response, measurement, token)
+
+
+_tasks = {}  # task_id -> (Measurement, token)
+
+
+def task_started(task_id):
+    _tasks[task_id] = begin()
+
+
+def task_finished(task_id, task_name, state):
+    started = _tasks.pop(task_id, None)
+    if started is None:
+        return
+    measurement, token = started
+    try:
+        end(measurement, token)
+    except ValueError:  # token from another context (should not happen)
+        pass
+    registry.record(
+        "task", (("task", task_name),), ("state", state or "UNKNOWN"), measurement
+    )
@@ -0,0 +1,58 @@
+import json
+
+from core.benchmarks import BENCHMARKS, run_benchmark
+from django.core.management.base import BaseCommand, CommandError
+
+
+def parse_value(raw):
+    """
+    Turn "5" into 5 and "1,10,100" into [1, 10, 100]; leave other strings as-is.
+    """
+    parts = raw.split(",")
+    try:
+        values = [int(part) for part in parts]
+    except ValueError:
+        return raw
+    return values if len(values) > 1 else values[0]
+
+
+class Command(BaseCommand):
+    help = "Run a registered core benchmark and print its results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", nargs="?", help="Benchmark to run")
+        parser.add_argument(
+            "--param",
+            action="append",
+            default=[],
+            metavar="KEY=VALUE",
+            help="Keyword argument passed to the benchmark (repeatable)",
+        )
+        parser.add_argument("--output", help="Also write the results to this file")
+        parser.add_argument(
+            "--list", action="store_true", help="List available benchmarks"
+        )
+
+    def handle(self, *args, **options):
+        if options["list"] or not options["name"]:
+            for name in sorted(BENCHMARKS):
+                self.stdout.write(name)
+            return
+
+        name = options["name"]
+        if name not in BENCHMARKS:
+            raise CommandError(f"Unknown benchmark: {name}")
+
+        params = {}
+        for item in options["param"]:
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise CommandError(f"Invalid --param {item!r}, expected KEY=VALUE")
+            params[key] = parse_value(value)
+
+        result = run_benchmark(name, **params)
+        output = json.dumps(result, indent=2)
+        self.stdout.write(output)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(output + "\n")
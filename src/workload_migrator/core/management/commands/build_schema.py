@@ -0,0 +1,17 @@
+from core import schema
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema once and write it, with a manifest, to "
+        "API_SCHEMA_DIR for API_SCHEMA_MODE=static."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output-dir", help="Write here instead of API_SCHEMA_DIR")
+
+    def handle(self, *args, **options):
+        manifest = schema.build(options["output_dir"])
+        for name, entry in sorted(manifest["formats"].items()):
+            self.stdout.write(f"{name}: {entry['file']} {entry['etag']}")
@@ -0,0 +1,170 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Credentials",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("username", models.CharField(max_length=150)),
+                ("password", models.CharField(max_length=128)),
+                ("domain", models.CharField(max_length=150)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Workload",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ip", models.GenericIPAddressField(unique=True)),
+                (
+                    "credentials",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="workloads",
+                        to="core.credentials",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="MountPoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mount_point_name", models.CharField(max_length=10)),
+                (
+                    "total_size",
+                    models.PositiveIntegerField(help_text="Total size in GB"),
+                ),
+                (
+                    "workload",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mountpoints",
+                        to="core.workload",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="MigrationTarget",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "cloud_type",
+                    models.CharField(
+                        choices=[
+                            ("aws", "AWS"),
+                            ("azure", "Azure"),
+                            ("vsphere", "vSphere"),
+                            ("vcloud", "vCloud"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "cloud_credentials",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cloud_target_credentials",
+                        to="core.credentials",
+                    ),
+                ),
+                (
+                    "target_vm",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="as_migration_target",
+                        to="core.workload",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Migration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("not_started", "Not Started"),
+                            ("running", "Running"),
+                            ("error", "Error"),
+                            ("success", "Success"),
+                        ],
+                        default="not_started",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "migration_target",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="migrations",
+                        to="core.migrationtarget",
+                    ),
+                ),
+                (
+                    "selected_mountpoints",
+                    models.ManyToManyField(related_name="+", to="core.mountpoint"),
+                ),
+                (
+                    "source",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="migrations",
+                        to="core.workload",
+                    ),
+                ),
+            ],
+        ),
+    ]
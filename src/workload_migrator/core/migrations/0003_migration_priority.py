@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_migrationbatch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="migration",
+            name="priority",
+            field=models.IntegerField(
+                default=0, help_text="Higher runs first when queued for the scheduler"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="migration",
+            name="state",
+            field=models.CharField(
+                choices=[
+                    ("not_started", "Not Started"),
+                    ("queued", "Queued"),
+                    ("running", "Running"),
+                    ("error", "Error"),
+                    ("success", "Success"),
+                ],
+                default="not_started",
+                max_length=20,
+            ),
+        ),
+    ]
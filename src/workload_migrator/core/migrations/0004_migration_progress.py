@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_migration_priority"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="migration",
+            name="bytes_total",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="migration",
+            name="bytes_transferred",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="migration",
+            name="transfer_rate",
+            field=models.FloatField(default=0, help_text="Bytes per second"),
+        ),
+        migrations.AddField(
+            model_name="migration",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="migration",
+            name="finished_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="migration",
+            name="progress_updated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_migration_progress"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="migration",
+            name="checkpoint",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Chunks already transferred, used to resume a failed run",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_migration_checkpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="migration",
+            name="task_id",
+            field=models.CharField(
+                blank=True,
+                help_text="Celery task that owns the current run",
+                max_length=255,
+            ),
+        ),
+        migrations.AddField(
+            model_name="migration",
+            name="run_key",
+            field=models.CharField(
+                blank=True,
+                help_text="Idempotency-Key of the last run request",
+                max_length=255,
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+"""
+Merge mount points that share a workload and name, so that 0008 can add the
+(workload, mount_point_name) unique constraint.
+
+The row with the lowest pk is kept. Migrations that selected a duplicate
+select the kept row instead, then the duplicates are deleted. This runs
+apart from 0008 because PostgreSQL refuses to alter a table with pending
+deferred foreign-key checks in the same transaction.
+"""
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+BATCH_SIZE = 1000
+
+
+def dedupe_mountpoints(apps, schema_editor):
+    MountPoint = apps.get_model("core", "MountPoint")
+    Selected = apps.get_model("core", "Migration").selected_mountpoints.through
+
+    groups = (
+        MountPoint.objects.values("workload_id", "mount_point_name")
+        .annotate(keep=Min("pk"), rows=Count("pk"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    duplicates = []
+    for group in groups.iterator(chunk_size=BATCH_SIZE):
+        others = list(
+            MountPoint.objects.filter(
+                workload_id=group["workload_id"],
+                mount_point_name=group["mount_point_name"],
+            )
+            .exclude(pk=group["keep"])
+            .values_list("pk", flat=True)
+        )
+        selecting = set(
+            Selected.objects.filter(mountpoint_id__in=others).values_list(
+                "migration_id", flat=True
+            )
+        )
+        selecting -= set(
+            Selected.objects.filter(
+                mountpoint_id=group["keep"], migration_id__in=selecting
+            ).values_list("migration_id", flat=True)
+        )
+        Selected.objects.bulk_create(
+            Selected(migration_id=migration_id, mountpoint_id=group["keep"])
+            for migration_id in selecting
+        )
+        duplicates.extend(others)
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        MountPoint.objects.filter(
+            pk__in=duplicates[start : start + BATCH_SIZE]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_migration_claim"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_mountpoints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:08
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_dedupe_mountpoints"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="mountpoint",
+            constraint=models.UniqueConstraint(
+                fields=("workload", "mount_point_name"),
+                name="uniq_mountpoint_workload_name",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="mountpoint",
+            name="workload",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="mountpoints",
+                to="core.workload",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="mountpoint",
+            index=models.Index(
+                django.db.models.functions.text.Upper("mount_point_name"),
+                name="mountpoint_name_upper_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="migrationtarget",
+            index=models.Index(fields=["cloud_type"], name="target_cloud_type_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="migration",
+            index=models.Index(
+                condition=models.Q(("state__in", ["queued", "running"])),
+                fields=["state"],
+                name="migration_active_state_idx",
+            ),
+        ),
+    ]
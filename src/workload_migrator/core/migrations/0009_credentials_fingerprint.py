@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_hot_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="credentials",
+            name="fingerprint",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=64
+            ),
+        ),
+    ]
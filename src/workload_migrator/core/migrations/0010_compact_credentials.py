@@ -0,0 +1,66 @@
+"""
+Fill in Credentials.fingerprint and merge rows with identical content.
+
+Every workload and target pointing at a duplicate is moved to the row with
+the lowest pk for that fingerprint (the row interning picks), then the
+duplicates are deleted. Updates through the API are copy-on-write, so the
+merged rows are safe to share whether or not CREDENTIALS_DEDUP is on.
+"""
+
+import hashlib
+from collections import defaultdict
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def credentials_fingerprint(username, password, domain):
+    # A copy of core.models.credentials_fingerprint as of this migration, so
+    # later changes to the model code cannot change what it computes.
+    raw = "\0".join([username, domain, password]).encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+def compact_credentials(apps, schema_editor):
+    Credentials = apps.get_model("core", "Credentials")
+    Workload = apps.get_model("core", "Workload")
+    MigrationTarget = apps.get_model("core", "MigrationTarget")
+
+    batch = []
+    groups = defaultdict(list)
+    for creds in Credentials.objects.order_by("pk").iterator(chunk_size=BATCH_SIZE):
+        creds.fingerprint = credentials_fingerprint(
+            creds.username, creds.password, creds.domain
+        )
+        groups[creds.fingerprint].append(creds.pk)
+        batch.append(creds)
+        if len(batch) == BATCH_SIZE:
+            Credentials.objects.bulk_update(batch, ["fingerprint"])
+            batch = []
+    Credentials.objects.bulk_update(batch, ["fingerprint"])
+
+    duplicates = []
+    for keep, *others in groups.values():
+        if not others:
+            continue
+        Workload.objects.filter(credentials_id__in=others).update(credentials_id=keep)
+        MigrationTarget.objects.filter(cloud_credentials_id__in=others).update(
+            cloud_credentials_id=keep
+        )
+        duplicates.extend(others)
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        Credentials.objects.filter(
+            pk__in=duplicates[start : start + BATCH_SIZE]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_credentials_fingerprint"),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_credentials, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_compact_credentials"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MigrationShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("not_started", "Not Started"),
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("error", "Error"),
+                            ("success", "Success"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                ("task_id", models.CharField(blank=True, max_length=255)),
+                ("bytes_total", models.BigIntegerField(default=0)),
+                ("bytes_transferred", models.BigIntegerField(default=0)),
+                (
+                    "transfer_rate",
+                    models.FloatField(default=0, help_text="Bytes per second"),
+                ),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("progress_updated_at", models.DateTimeField(blank=True, null=True)),
+                ("checkpoint", models.JSONField(blank=True, default=dict)),
+                ("error", models.TextField(blank=True)),
+                (
+                    "migration",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shards",
+                        to="core.migration",
+                    ),
+                ),
+                (
+                    "mountpoint",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.mountpoint",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("migration", "mountpoint"), name="uniq_shard_mountpoint"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+"""
+Mark the row interning hands out for each fingerprint and make it unique.
+
+The lowest pk per fingerprint is marked, which is the row
+0010_compact_credentials kept. Rows created with CREDENTIALS_DEDUP off may
+share content with it; they stay unmarked and are left alone.
+"""
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def mark_interned(apps, schema_editor):
+    Credentials = apps.get_model("core", "Credentials")
+    first = (
+        Credentials.objects.exclude(fingerprint="")
+        .values("fingerprint")
+        .annotate(first_pk=Min("pk"))
+        .values("first_pk")
+    )
+    Credentials.objects.filter(pk__in=first).update(interned=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_migrationshard"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="credentials",
+            name="interned",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_interned, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="credentials",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("interned", True)),
+                fields=("fingerprint",),
+                name="uniq_interned_credentials",
+            ),
+        ),
+    ]
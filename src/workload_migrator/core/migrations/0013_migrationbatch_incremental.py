@@ -0,0 +1,33 @@
+"""
+Store whether a batch runs incrementally, now that its members are started
+over time by advance_batch rather than all at once.
+
+Batches still open were dispatched as a chord whose callback closes them;
+they are closed here so advance_batch does not start their members again.
+"""
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def close_open_batches(apps, schema_editor):
+    MigrationBatch = apps.get_model("core", "MigrationBatch")
+    MigrationBatch.objects.filter(finished_at__isnull=True).update(
+        finished_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_credentials_interned"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="migrationbatch",
+            name="incremental",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(close_open_batches, migrations.RunPython.noop),
+    ]
@@ -1,23 +1,208 @@
+import hashlib
 import time
+from datetime import timedelta
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce, Upper
+from django.utils import timezone
+
+from . import caching
+from .events import publish_migration
+from .progress import ProgressTracker, ShardProgressTracker
+from .transfer import DEFAULT_CHUNK_SIZE, GB, Checkpoint, TransferEngine, count_chunks
+
+
+def credentials_fingerprint(username, password, domain):
+    """
+    Content address of a set of credentials: SHA-256 over the fields.
+    """
+    raw = "\0".join([username, domain, password]).encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+def credentials_dedup():
+    return getattr(settings, "CREDENTIALS_DEDUP", False)
+
+
+def heartbeat_cutoff():
+    """
+    Runs whose progress_updated_at heartbeat is older than this are presumed
+    dead (MIGRATION_HEARTBEAT_TIMEOUT seconds ago).
+    """
+    timeout = getattr(settings, "MIGRATION_HEARTBEAT_TIMEOUT", 900)
+    return timezone.now() - timedelta(seconds=timeout)
+
+
+def stale_heartbeat():
+    """
+    Q for rows whose heartbeat is missing or older than heartbeat_cutoff().
+    """
+    return Q(progress_updated_at__isnull=True) | Q(
+        progress_updated_at__lt=heartbeat_cutoff()
+    )
+
+
+class CredentialsQuerySet(models.QuerySet):
+    """
+    Interning: find-or-create Credentials by content, so that every workload
+    and target using the same service account shares one row. The interned
+    row for a fingerprint is unique in the database, so concurrent requests
+    interning the same credentials agree on one row.
+    """
+
+    def intern(self, username, password, domain):
+        return self.intern_many(
+            [{"username": username, "password": password, "domain": domain}]
+        )[0]
+
+    def intern_many(self, items):
+        """
+        Intern a list of {username, password, domain} dicts with one SELECT,
+        plus one INSERT ... ON CONFLICT DO NOTHING and a second SELECT for
+        rows that did not exist yet. A row inserted concurrently by another
+        transaction is picked up by the second SELECT instead of duplicated.
+        Returns rows aligned with items.
+        """
+        fingerprints = [credentials_fingerprint(**item) for item in items]
+        wanted = dict(zip(fingerprints, items))
+        pks = self._interned_pks(wanted)
+        missing = [fp for fp in wanted if fp not in pks]
+        if missing:
+            self.bulk_create(
+                [
+                    Credentials(fingerprint=fp, interned=True, **wanted[fp])
+                    for fp in missing
+                ],
+                ignore_conflicts=True,
+            )
+            pks.update(self._interned_pks(missing))
+        rows = {}
+        for fp, item in wanted.items():
+            creds = Credentials(pk=pks[fp], fingerprint=fp, interned=True, **item)
+            creds._state.adding = False
+            creds._state.db = self.db
+            rows[fp] = creds
+        return [rows[fp] for fp in fingerprints]
+
+    def _interned_pks(self, fingerprints):
+        return dict(
+            self.filter(fingerprint__in=fingerprints, interned=True).values_list(
+                "fingerprint", "pk"
+            )
+        )
 
 
 class Credentials(models.Model):
     """
     Stores credentials for accessing a workload or cloud.
     All fields are required.
+
+    With CREDENTIALS_DEDUP, nested writes intern rows by fingerprint (see
+    CredentialsQuerySet), so a row may be shared by many workloads and
+    targets; shared rows are never updated in place (see replace()).
+    ``interned`` marks the one row per fingerprint that interning hands out.
     """
 
     username = models.CharField(max_length=150)
     password = models.CharField(max_length=128)
     domain = models.CharField(max_length=150)
+    fingerprint = models.CharField(
+        max_length=64, blank=True, default="", db_index=True, editable=False
+    )
+    interned = models.BooleanField(default=False, editable=False)
+
+    objects = CredentialsQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fingerprint"],
+                condition=Q(interned=True),
+                name="uniq_interned_credentials",
+            )
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_fingerprint = instance.__dict__.get("fingerprint")
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.fingerprint = credentials_fingerprint(
+            self.username, self.password, self.domain
+        )
+        stale = getattr(self, "_loaded_fingerprint", None)
+        if stale and stale != self.fingerprint:
+            # No longer the row for its old content, and not necessarily
+            # the only row with its new content.
+            self.interned = False
+        super().save(*args, **kwargs)
+        self._loaded_fingerprint = self.fingerprint
+
+    def is_shared(self):
+        owners = Workload.objects.filter(credentials_id=self.pk).count()
+        owners += MigrationTarget.objects.filter(cloud_credentials_id=self.pk).count()
+        return owners > 1
+
+    def replace(self, **changes):
+        """
+        Credentials for one owner that used to have self, with `changes`
+        applied (copy-on-write). The caller points the owner at the result
+        and then calls delete_if_unreferenced() on self.
+
+        A row used by a single owner without CREDENTIALS_DEDUP is updated in
+        place. Otherwise the row may be shared and is left alone: the result
+        is the interned row for the new values (with dedup) or a new row.
+        """
+        values = {
+            "username": self.username,
+            "password": self.password,
+            "domain": self.domain,
+            **changes,
+        }
+        if credentials_dedup():
+            return Credentials.objects.intern(**values)
+        if not self.is_shared():
+            for attr, value in changes.items():
+                setattr(self, attr, value)
+            self.save()
+            return self
+        return Credentials.objects.create(**values)
+
+    def delete_if_unreferenced(self):
+        """
+        Delete this row if no workload or target uses it any more.
+        """
+        Credentials.objects.filter(pk=self.pk).exclude(
+            Exists(Workload.objects.filter(credentials_id=OuterRef("pk")))
+        ).exclude(
+            Exists(MigrationTarget.objects.filter(cloud_credentials_id=OuterRef("pk")))
+        ).delete()
 
     def __str__(self):
         return f"{self.username}@{self.domain}"
 
 
+class WorkloadQuerySet(models.QuerySet):
+    """
+    Rejects set-based writes to ``ip``, which bypass Workload.save().
+    """
+
+    def update(self, **kwargs):
+        if "ip" in kwargs:
+            raise ValueError("IP address cannot be changed once set.")
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if "ip" in fields:
+            raise ValueError("IP address cannot be changed once set.")
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+
 class Workload(models.Model):
     """
     Represents a VM or workload with an immutable IP and associated credentials.
@@ -30,12 +215,32 @@ class Workload(models.Model):
         related_name="workloads",
     )
 
+    objects = WorkloadQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "ip" in instance.__dict__:
+            instance._loaded_ip = instance.ip
+        return instance
+
     def save(self, *args, **kwargs):
-        if self.pk is not None:
-            orig = Workload.objects.get(pk=self.pk)
-            if orig.ip != self.ip:
+        update_fields = kwargs.get("update_fields")
+        if self.pk is not None and (update_fields is None or "ip" in update_fields):
+            # The IP seen when the row was loaded (or last saved) is kept on the
+            # instance, so the common case needs no extra query. Only instances
+            # that never saw their stored IP fall back to reading it.
+            orig_ip = self.__dict__.get("_loaded_ip")
+            if orig_ip is None:
+                orig_ip = (
+                    Workload.objects.filter(pk=self.pk)
+                    .values_list("ip", flat=True)
+                    .first()
+                )
+            if orig_ip is not None and orig_ip != self.ip:
                 raise ValueError("IP address cannot be changed once set.")
         super().save(*args, **kwargs)
+        self._loaded_ip = self.ip
 
     def __str__(self):
         return f"Workload(ip={self.ip})"
@@ -50,10 +255,23 @@ class MountPoint(models.Model):
         Workload,
         on_delete=models.CASCADE,
         related_name="mountpoints",
+        db_index=False,  # covered by the (workload, mount_point_name) constraint
     )
     mount_point_name = models.CharField(max_length=10)
     total_size = models.PositiveIntegerField(help_text="Total size in GB")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["workload", "mount_point_name"],
+                name="uniq_mountpoint_workload_name",
+            ),
+        ]
+        indexes = [
+            # Serves case-insensitive (iexact) lookups such as the C:\ check.
+            models.Index(Upper("mount_point_name"), name="mountpoint_name_upper_idx"),
+        ]
+
     def __str__(self):
         return f"{self.workload.ip}:{self.mount_point_name} ({self.total_size}GB)"
 
@@ -85,6 +303,9 @@ class MigrationTarget(models.Model):
         related_name="as_migration_target",
     )
 
+    class Meta:
+        indexes = [models.Index(fields=["cloud_type"], name="target_cloud_type_idx")]
+
     def clean(self):
         if self.cloud_type not in dict(self.CLOUD_CHOICES):
             raise ValidationError(f"Invalid cloud_type: {self.cloud_type}")
@@ -93,6 +314,21 @@ class MigrationTarget(models.Model):
         return f"MigrationTarget({self.cloud_type} -> {self.target_vm.ip})"
 
 
+class MigrationQuerySet(models.QuerySet):
+    def stale(self):
+        """
+        Migrations marked running whose run stopped reporting progress: the
+        worker died, or the task was never published.
+        """
+        return self.filter(Q(state=Migration.State.RUNNING) & stale_heartbeat())
+
+    def claimable(self):
+        """
+        Migrations a new run may claim: anything not running, plus stale runs.
+        """
+        return self.filter(~Q(state=Migration.State.RUNNING) | stale_heartbeat())
+
+
 class Migration(models.Model):
     """
     Represents a migration from a source workload to a MigrationTarget,
@@ -101,6 +337,7 @@ class Migration(models.Model):
 
     class State(models.TextChoices):
         NOT_STARTED = "not_started", "Not Started"
+        QUEUED = "queued", "Queued"
         RUNNING = "running", "Running"
         ERROR = "error", "Error"
         SUCCESS = "success", "Success"
@@ -124,42 +361,650 @@ class Migration(models.Model):
         choices=State.choices,
         default=State.NOT_STARTED,
     )
+    priority = models.IntegerField(
+        default=0, help_text="Higher runs first when queued for the scheduler"
+    )
+    bytes_total = models.BigIntegerField(default=0)
+    bytes_transferred = models.BigIntegerField(default=0)
+    transfer_rate = models.FloatField(default=0, help_text="Bytes per second")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    progress_updated_at = models.DateTimeField(null=True, blank=True)
+    task_id = models.CharField(
+        max_length=255, blank=True, help_text="Celery task that owns the current run"
+    )
+    run_key = models.CharField(
+        max_length=255, blank=True, help_text="Idempotency-Key of the last run request"
+    )
+    checkpoint = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Chunks already transferred, used to resume a failed run",
+    )
 
-    def run(self, simulated_minutes: int = 1):
+    objects = MigrationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Only queued and running migrations are polled (scheduler,
+            # claims, batch status), and they are a small fraction of the
+            # table, so finished and idle rows are left out of the index.
+            models.Index(
+                fields=["state"],
+                name="migration_active_state_idx",
+                condition=Q(state__in=["queued", "running"]),
+            ),
+        ]
+
+    def run(
+        self,
+        simulated_minutes: int = 1,
+        engine=None,
+        task_id: str = "",
+        claimed: bool = False,
+        incremental: bool = False,
+        window: float = None,
+    ):
         """
         Execute the migration:
         - Disallow if 'C:\\' is selected
-        - Mark as running
-        - Sleep to simulate transfer
+        - Atomically claim the row as running and record the total bytes to
+          move; return False without doing anything if another run owns it
+        - Stream the selected mount points through the transfer engine,
+          skipping chunks recorded in the checkpoint of an earlier failed run
+          and reporting progress and checkpoints in throttled batches
         - Copy selected mount points onto the target VM
         - Update state to SUCCESS or ERROR
+
+        In incremental mode only the mount points that are missing from the
+        target VM or differ in size are transferred (see target_changes), and
+        the target is brought in line with inserts, updates and deletes
+        instead of being rebuilt. A re-sync with no changes transfers nothing.
+
+        With window (seconds) the transfer stops taking new chunks once the
+        window has elapsed. If chunks are left, progress and the checkpoint
+        are saved, the row stays RUNNING under task_id and None is returned;
+        resume() carries on from there.
+
+        :param task_id: id of the Celery task executing the run
+        :param claimed: the dispatcher already claimed the row for task_id
+        :param incremental: transfer and apply only what changed on the target
+        :param window: seconds of transfer before returning early
+        :return: True if this call completed the migration, False if another
+            run owns it, None if the window ended with chunks left
         """
-        if self.selected_mountpoints.filter(mount_point_name__iexact="C:\\").exists():
+        if self.has_c_root():
+            if claimed:
+                Migration.objects.filter(pk=self.pk, task_id=task_id).update(
+                    state=self.State.ERROR
+                )
             raise ValidationError("Migrations including C:\\ are not allowed.")
 
+        selected, transferred, duration = self._plan_transfer(
+            simulated_minutes, incremental
+        )
+        engine = engine or TransferEngine()
+        checkpoint = Checkpoint.load(self.checkpoint, engine.chunk_size)
+        started = {
+            "state": self.State.RUNNING,
+            "task_id": task_id,
+            "bytes_total": sum(mp.total_size for mp in transferred) * GB,
+            "bytes_transferred": checkpoint.bytes_done(transferred),
+            "transfer_rate": 0,
+            "started_at": timezone.now(),
+            "finished_at": None,
+        }
+        started["progress_updated_at"] = started["started_at"]
+        if not self.claim(task_id if claimed else None, **started):
+            return False
+        for attr, value in started.items():
+            setattr(self, attr, value)
+        publish_migration(self)
+        return self._transfer(
+            selected,
+            transferred,
+            duration,
+            engine,
+            checkpoint,
+            task_id=task_id,
+            incremental=incremental,
+            window=window,
+        )
+
+    def resume(
+        self,
+        task_id: str,
+        simulated_minutes: int = 1,
+        engine=None,
+        incremental: bool = False,
+        window: float = None,
+        retry: bool = False,
+    ):
+        """
+        Continue a windowed run (see run()) that task_id owns, from its
+        checkpoint. The simulated duration is scaled to the bytes left.
+        :param retry: task_id is retrying after its own window failed, so
+            the run may be in ERROR (still owned by task_id) as well
+        :return: as run()
+        """
+        states = [self.State.RUNNING]
+        if retry:
+            states.append(self.State.ERROR)
+        resumed = Migration.objects.filter(
+            pk=self.pk, task_id=task_id, state__in=states
+        ).update(state=self.State.RUNNING, progress_updated_at=timezone.now())
+        if not resumed:
+            return False
         self.state = self.State.RUNNING
-        self.save()
-
+        selected, transferred, duration = self._plan_transfer(
+            simulated_minutes, incremental
+        )
+        engine = engine or TransferEngine()
+        checkpoint = Checkpoint.load(self.checkpoint, engine.chunk_size)
+        total = sum(mp.total_size for mp in transferred) * GB
+        if total:
+            duration *= (total - checkpoint.bytes_done(transferred)) / total
+        return self._transfer(
+            selected,
+            transferred,
+            duration,
+            engine,
+            checkpoint,
+            task_id=task_id,
+            incremental=incremental,
+            window=window,
+        )
+
+    def _plan_transfer(self, simulated_minutes, incremental):
+        """
+        :return: (selected, transferred, duration): the selection, the mount
+            points to transfer, and the simulated seconds for them
+        """
+        selected = list(self.selected_mountpoints.all())
+        transferred = selected
+        duration = simulated_minutes * 60
+        if incremental:
+            transferred = self.target_changes(selected)[0]
+            selected_gb = sum(mp.total_size for mp in selected)
+            if selected_gb:
+                duration *= sum(mp.total_size for mp in transferred) / selected_gb
+        return selected, transferred, duration
+
+    def _transfer(
+        self,
+        selected,
+        transferred,
+        duration,
+        engine,
+        checkpoint,
+        task_id="",
+        incremental=False,
+        window=None,
+    ):
+        """
+        Transfer (one window of) the run's chunks, then finalise the target
+        VM once every chunk is done. Shared by run() and resume().
+        """
+        deadline = time.monotonic() + window if window else None
         try:
-            time.sleep(simulated_minutes * 60)
+            progress = ProgressTracker(self, checkpoint=checkpoint)
+            engine.transfer(
+                transferred,
+                duration=duration,
+                on_chunk=progress.update,
+                checkpoint=checkpoint,
+                deadline=deadline,
+            )
+            if checkpoint.chunks_done(transferred) < count_chunks(
+                transferred, engine.chunk_size
+            ):
+                progress.flush()
+                return None
+
+            with transaction.atomic():
+                if not self.owned_by(task_id, lock=True):
+                    return False
+                if incremental:
+                    self.sync_mountpoints_to_target(selected)
+                else:
+                    self.copy_mountpoints_to_target(selected)
+                self.state = self.State.SUCCESS
+                self.finished_at = timezone.now()
+                self.progress_updated_at = self.finished_at
+                self.checkpoint = {}
+                self.save()
 
-            target_vm = self.migration_target.target_vm
-            target_vm.mountpoints.all().delete()
+        except Exception:
+            self.state = self.State.ERROR
+            self.checkpoint = checkpoint.as_dict()
+            Migration.objects.filter(
+                pk=self.pk, state=self.State.RUNNING, task_id=task_id
+            ).update(
+                state=self.state,
+                checkpoint=self.checkpoint,
+                bytes_transferred=self.bytes_transferred,
+            )
+            raise
+        return True
+
+    def claim(self, owner=None, **fields):
+        """
+        Move the row to RUNNING with a single conditional UPDATE so that only
+        one of several concurrent callers wins.
+
+        Without owner any migration that is not already running, or whose
+        run has a stale heartbeat, can be claimed. With owner (a task id) the
+        row must already belong to that task: claimed by its dispatcher and
+        not yet started, left in ERROR by a previous attempt that is now being
+        retried, or still RUNNING but with a stale heartbeat (the worker died
+        and the broker redelivered the message). A redelivered message whose
+        run is still alive and reporting progress loses the claim.
+        """
+        rows = Migration.objects.filter(pk=self.pk)
+        if owner:
+            rows = rows.filter(task_id=owner).filter(
+                Q(state=self.State.ERROR)
+                | Q(state=self.State.RUNNING, started_at__isnull=True)
+                | Q(state=self.State.RUNNING) & stale_heartbeat()
+            )
+        else:
+            rows = rows.claimable()
+        fields.setdefault("state", self.State.RUNNING)
+        return rows.update(**fields) == 1
+
+    def owned_by(self, task_id, lock=False):
+        """
+        Whether the run of task_id still holds the claim, i.e. nobody took
+        the row over after its heartbeat went stale. With lock the row is
+        locked until the end of the transaction.
+        """
+        rows = Migration.objects.filter(
+            pk=self.pk, state=self.State.RUNNING, task_id=task_id
+        )
+        if lock:
+            rows = rows.select_for_update()
+        return rows.exists()
+
+    @property
+    def is_running(self):
+        """
+        Whether a live run holds the claim (running, with a fresh heartbeat).
+        """
+        return self.state == self.State.RUNNING and not (
+            self.progress_updated_at is None
+            or self.progress_updated_at < heartbeat_cutoff()
+        )
+
+    @property
+    def eta_seconds(self):
+        """
+        Estimated seconds until the transfer completes at the current rate.
+        """
+        if self.state != self.State.RUNNING or not self.transfer_rate:
+            return None
+        remaining = max(self.bytes_total - self.bytes_transferred, 0)
+        return round(remaining / self.transfer_rate, 1)
+
+    def has_c_root(self):
+        return self.selected_mountpoints.filter(
+            mount_point_name__iexact="C:\\"
+        ).exists()
+
+    def should_shard(self):
+        """
+        Whether to run as per-mount-point shards: the selection has at least
+        MIGRATION_SHARD_MIN_MOUNTPOINTS mount points (0 disables sharding).
+        """
+        threshold = getattr(settings, "MIGRATION_SHARD_MIN_MOUNTPOINTS", 0)
+        return bool(threshold) and self.selected_mountpoints.count() >= threshold
+
+    def start_shards(
+        self, task_id: str = "", claimed: bool = False, incremental: bool = False
+    ):
+        """
+        Sharded counterpart of the first half of run(): check the selection,
+        claim the row and prepare one MigrationShard per selected mount point
+        (in incremental mode, per mount point that changed on the target).
+
+        Shards left over from a failed run are resumed: those that succeeded
+        are kept, the others restart from their own checkpoints. Shards of
+        mount points no longer selected are dropped.
 
-            for mp in self.selected_mountpoints.all():
-                MountPoint.objects.create(
-                    workload=target_vm,
+        :return: ids of the shards to run, or None if the claim was lost
+        """
+        if self.has_c_root():
+            if claimed:
+                Migration.objects.filter(pk=self.pk, task_id=task_id).update(
+                    state=self.State.ERROR
+                )
+            raise ValidationError("Migrations including C:\\ are not allowed.")
+
+        selected = list(self.selected_mountpoints.all())
+        if incremental:
+            selected = self.target_changes(selected)[0]
+        chunk_size = getattr(settings, "MIGRATION_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+        with transaction.atomic():
+            if not self.claim(task_id if claimed else None, task_id=task_id):
+                return None
+            self.shards.exclude(mountpoint__in=selected).delete()
+            shards = {shard.mountpoint_id: shard for shard in self.shards.all()}
+            for mp in selected:
+                shard = shards.get(mp.pk) or MigrationShard(
+                    migration=self, mountpoint=mp
+                )
+                if shard.state != self.State.SUCCESS:
+                    checkpoint = Checkpoint.load(shard.checkpoint, chunk_size)
+                    shard.state = self.State.QUEUED
+                    shard.task_id = ""
+                    shard.bytes_total = mp.total_size * GB
+                    shard.bytes_transferred = checkpoint.bytes_done([mp])
+                    shard.transfer_rate = 0
+                    shard.error = ""
+                shards[mp.pk] = shard
+            MigrationShard.objects.bulk_create(
+                [shard for shard in shards.values() if shard.pk is None]
+            )
+            MigrationShard.objects.bulk_update(
+                [shard for shard in shards.values() if shard.pk is not None],
+                fields=[
+                    "state",
+                    "task_id",
+                    "bytes_total",
+                    "bytes_transferred",
+                    "transfer_rate",
+                    "error",
+                ],
+            )
+            started = {
+                "state": self.State.RUNNING,
+                "task_id": task_id,
+                "bytes_total": sum(mp.total_size for mp in selected) * GB,
+                "bytes_transferred": sum(
+                    shard.bytes_transferred for shard in shards.values()
+                ),
+                "transfer_rate": 0,
+                "started_at": timezone.now(),
+                "finished_at": None,
+            }
+            started["progress_updated_at"] = started["started_at"]
+            Migration.objects.filter(pk=self.pk).update(**started)
+        for attr, value in started.items():
+            setattr(self, attr, value)
+        publish_migration(self)
+        return [
+            shard.pk for shard in shards.values() if shard.state != self.State.SUCCESS
+        ]
+
+    def finish_shards(self, task_id: str = "", incremental: bool = False):
+        """
+        Chord callback of a sharded run: if every shard succeeded, copy the
+        selection onto the target VM and mark the migration SUCCESS (dropping
+        the shards, as run() drops its checkpoint); otherwise mark it ERROR
+        and keep the shards so a re-run only repeats the failed ones.
+
+        Like run(), this only happens while the run of task_id still holds
+        the claim, with the row locked; a run that was expired, re-dispatched
+        or taken over in the meantime leaves the row and target VM alone.
+        :return: the final state, or None if the claim was lost
+        """
+        with transaction.atomic():
+            if not self.owned_by(task_id, lock=True):
+                return None
+            failed = self.shards.exclude(state=self.State.SUCCESS).exists()
+            if failed:
+                self.state = self.State.ERROR
+            else:
+                selected = self.selected_mountpoints.all()
+                if incremental:
+                    self.sync_mountpoints_to_target(selected)
+                else:
+                    self.copy_mountpoints_to_target(selected)
+                self.shards.all().delete()
+                self.state = self.State.SUCCESS
+                self.finished_at = timezone.now()
+                self.progress_updated_at = self.finished_at
+                self.checkpoint = {}
+            self.transfer_rate = 0
+            self.save(
+                update_fields=[
+                    "state",
+                    "finished_at",
+                    "progress_updated_at",
+                    "checkpoint",
+                    "transfer_rate",
+                ]
+            )
+        return self.state
+
+    def copy_mountpoints_to_target(self, mountpoints):
+        """
+        Replace the target VM's mount points with copies of the given ones
+        using one DELETE and one batched INSERT.
+        """
+        target_vm_id = self.migration_target.target_vm_id
+        with caching.batch_invalidation():
+            MountPoint.objects.filter(workload_id=target_vm_id).delete()
+            MountPoint.objects.bulk_create(
+                MountPoint(
+                    workload_id=target_vm_id,
                     mount_point_name=mp.mount_point_name,
                     total_size=mp.total_size,
                 )
+                for mp in mountpoints
+            )
+            caching.invalidate(caching.WORKLOADS, [target_vm_id])
 
-            self.state = self.State.SUCCESS
-            self.save()
+    def target_changes(self, mountpoints):
+        """
+        Diff the given source mount points against the target VM's current
+        ones, matching by name and size. Contents are not compared: a mount
+        point with the same name and size on the target counts as in sync.
+        :return: (changed, updated, stale): the source mount points missing
+            from the target or resized, the target rows to resize (already
+            carrying their new size), and the target rows not in the selection
+        """
+        current = {
+            mp.mount_point_name: mp
+            for mp in MountPoint.objects.filter(
+                workload_id=self.migration_target.target_vm_id
+            )
+        }
+        changed, updated = [], []
+        for mp in mountpoints:
+            existing = current.pop(mp.mount_point_name, None)
+            if existing is not None and existing.total_size == mp.total_size:
+                continue
+            if existing is not None:
+                existing.total_size = mp.total_size
+                updated.append(existing)
+            changed.append(mp)
+        return changed, updated, list(current.values())
+
+    def sync_mountpoints_to_target(self, mountpoints):
+        """
+        Bring the target VM's mount points in line with the given ones by
+        applying only the differences: one DELETE, one batched INSERT and one
+        batched UPDATE at most, and no writes at all if nothing changed.
+        Unchanged rows keep their primary keys.
+        :return: (inserted, updated, deleted) counts
+        """
+        target_vm_id = self.migration_target.target_vm_id
+        changed, updated, stale = self.target_changes(mountpoints)
+        resized = {mp.mount_point_name for mp in updated}
+        inserted = [mp for mp in changed if mp.mount_point_name not in resized]
+        if not (inserted or updated or stale):
+            return 0, 0, 0
+        with caching.batch_invalidation():
+            if stale:
+                MountPoint.objects.filter(pk__in=[mp.pk for mp in stale]).delete()
+            MountPoint.objects.bulk_create(
+                MountPoint(
+                    workload_id=target_vm_id,
+                    mount_point_name=mp.mount_point_name,
+                    total_size=mp.total_size,
+                )
+                for mp in inserted
+            )
+            MountPoint.objects.bulk_update(updated, ["total_size"])
+            caching.invalidate(caching.WORKLOADS, [target_vm_id])
+        return len(inserted), len(updated), len(stale)
 
-        except Exception:
+    def __str__(self):
+        return f"Migration({self.source.ip} → {self.migration_target.cloud_type}/{self.migration_target.target_vm.ip})"
+
+
+class MigrationShard(models.Model):
+    """
+    One selected mount point of a migration run in sharded mode (see
+    Migration.should_shard). Each shard is transferred by its own Celery
+    task on any worker and tracks its own state, progress and checkpoint,
+    so a failure marks only the shard it happened in.
+    """
+
+    State = Migration.State
+
+    migration = models.ForeignKey(
+        Migration, on_delete=models.CASCADE, related_name="shards"
+    )
+    mountpoint = models.ForeignKey(
+        MountPoint, on_delete=models.CASCADE, related_name="+"
+    )
+    state = models.CharField(max_length=20, choices=State.choices, default=State.QUEUED)
+    task_id = models.CharField(max_length=255, blank=True)
+    bytes_total = models.BigIntegerField(default=0)
+    bytes_transferred = models.BigIntegerField(default=0)
+    transfer_rate = models.FloatField(default=0, help_text="Bytes per second")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    progress_updated_at = models.DateTimeField(null=True, blank=True)
+    checkpoint = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["migration", "mountpoint"], name="uniq_shard_mountpoint"
+            ),
+        ]
+
+    def run(self, task_id: str = "", duration: float = 0, engine=None):
+        """
+        Transfer this shard's mount point, resuming from its checkpoint.
+        A failure is recorded on the shard (state ERROR, checkpoint, error)
+        and re-raised.
+
+        The shard is claimed with one conditional UPDATE: only a queued or
+        failed shard, or one already owned by task_id whose heartbeat went
+        stale (a message redelivered after its worker died), can be started.
+        :return: True if this call ran the shard
+        """
+        now = timezone.now()
+        claimed = (
+            MigrationShard.objects.filter(pk=self.pk)
+            .filter(
+                Q(state__in=[self.State.QUEUED, self.State.ERROR])
+                | Q(
+                    state=self.State.RUNNING,
+                    task_id=task_id,
+                    progress_updated_at__lt=heartbeat_cutoff(),
+                )
+            )
+            .update(
+                state=self.State.RUNNING,
+                task_id=task_id,
+                started_at=now,
+                progress_updated_at=now,
+            )
+        )
+        if not claimed:
+            return False
+        self.state = self.State.RUNNING
+        self.task_id = task_id
+
+        mountpoint = self.mountpoint
+        engine = engine or TransferEngine()
+        checkpoint = Checkpoint.load(self.checkpoint, engine.chunk_size)
+        try:
+            progress = ShardProgressTracker(self, checkpoint=checkpoint)
+            engine.transfer(
+                [mountpoint],
+                duration=duration,
+                on_chunk=progress.update,
+                checkpoint=checkpoint,
+            )
+            progress.flush()
+        except Exception as exc:
             self.state = self.State.ERROR
-            self.save()
+            self.error = str(exc)
+            self.checkpoint = checkpoint.as_dict()
+            self.transfer_rate = 0
+            self.save(update_fields=["state", "error", "checkpoint", "transfer_rate"])
             raise
+        self.state = self.State.SUCCESS
+        self.finished_at = timezone.now()
+        self.transfer_rate = 0
+        self.checkpoint = {}
+        self.save(update_fields=["state", "finished_at", "transfer_rate", "checkpoint"])
+        return True
 
     def __str__(self):
-        return f"Migration({self.source.ip} → {self.migration_target.cloud_type}/{self.migration_target.target_vm.ip})"
+        return f"MigrationShard({self.migration_id}:{self.mountpoint_id})"
+
+
+class MigrationBatch(models.Model):
+    """
+    A set of migrations dispatched together through
+    POST /api/migrations/run-batch/, used as a handle for aggregate progress.
+    """
+
+    migrations = models.ManyToManyField(Migration, related_name="batches")
+    concurrency = models.PositiveIntegerField(default=1)
+    incremental = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def run_key(self):
+        """
+        run_key the batch dispatches its members with, marking them started.
+        """
+        return f"batch-{self.pk}"
+
+    def pending(self):
+        """
+        Members the batch has not started yet, highest priority first.
+        """
+        return (
+            self.migrations.exclude(state=Migration.State.RUNNING)
+            .exclude(run_key=self.run_key)
+            .order_by("-priority", "pk")
+        )
+
+    def progress(self):
+        """
+        Number of member migrations in each state and the bytes they have
+        to move and have moved, in a single query.
+        """
+        counts = {state: 0 for state in Migration.State.values}
+        rows = (
+            self.migrations.order_by()
+            .values_list("state")
+            .annotate(
+                n=Count("id"),
+                total=Coalesce(Sum("bytes_total"), 0),
+                done=Coalesce(Sum("bytes_transferred"), 0),
+            )
+        )
+        bytes_total = bytes_transferred = 0
+        for state, n, total, done in rows:
+            counts[state] = n
+            bytes_total += total
+            bytes_transferred += done
+        return {
+            "states": counts,
+            "bytes_total": bytes_total,
+            "bytes_transferred": bytes_transferred,
+        }
+
+    def __str__(self):
+        return f"MigrationBatch({self.pk})"
@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key.
+
+    Each page is a single indexed range scan (``WHERE id > cursor LIMIT n``)
+    with no COUNT(*) or OFFSET, so cost stays flat as tables grow.
+    """
+
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
@@ -0,0 +1,191 @@
+"""
+Dry-run planning for a wave of migrations.
+
+plan_migrations() sizes a set of migrations per target VM and per cloud type,
+predicts how long the wave takes from historical throughput, and flags
+conflicts, without changing anything. Every figure is computed with database
+aggregates, so the number of queries does not grow with the number of
+migrations.
+
+Duration model: migrations to the same target VM run one after another
+(each run replaces the VM's mount points). Each cloud runs at most
+MIGRATION_SCHEDULER["PER_CLOUD"] migrations at a time. Clouds run in
+parallel. Throughput per cloud type is bytes transferred divided by time
+spent across finished migrations (bytes_total / (finished_at - started_at),
+summed). Cloud types without history use the overall figure, or
+MIGRATION_PLAN_DEFAULT_THROUGHPUT if there is no history at all.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Migration
+from .transfer import GB
+
+
+def historical_throughput():
+    """
+    Observed bytes per second per cloud type, plus "*" for all clouds.
+    :return: {cloud_type: {"bytes_per_second": float, "samples": int}}
+    """
+    finished = Migration.objects.filter(
+        state=Migration.State.SUCCESS,
+        started_at__isnull=False,
+        finished_at__isnull=False,
+        bytes_total__gt=0,
+    )
+    rows = (
+        finished.values("migration_target__cloud_type")
+        .annotate(
+            bytes=Sum("bytes_total"),
+            busy=Sum(
+                ExpressionWrapper(
+                    F("finished_at") - F("started_at"), output_field=DurationField()
+                )
+            ),
+            samples=Count("pk"),
+        )
+        .order_by()
+    )
+    result = {}
+    total_bytes = total_seconds = total_samples = 0
+    for row in rows:
+        seconds = row["busy"].total_seconds()
+        total_bytes += row["bytes"]
+        total_seconds += seconds
+        total_samples += row["samples"]
+        if seconds > 0:
+            result[row["migration_target__cloud_type"]] = {
+                "bytes_per_second": row["bytes"] / seconds,
+                "samples": row["samples"],
+            }
+    if total_seconds > 0:
+        result["*"] = {
+            "bytes_per_second": total_bytes / total_seconds,
+            "samples": total_samples,
+        }
+    return result
+
+
+def _cloud_limit():
+    conf = getattr(settings, "MIGRATION_SCHEDULER", {})
+    return conf.get("PER_CLOUD") or None
+
+
+def plan_migrations(queryset):
+    """
+    Plan the given migrations. See the module docstring for the model.
+    """
+    history = historical_throughput()
+    default = history.get("*") or {
+        "bytes_per_second": getattr(
+            settings, "MIGRATION_PLAN_DEFAULT_THROUGHPUT", 100 * 1024**2
+        ),
+        "samples": 0,
+    }
+
+    def rate(cloud_type):
+        return history.get(cloud_type, default)["bytes_per_second"]
+
+    # One row per (target VM, cloud type); Count is distinct because the
+    # join to the selected mount points repeats each migration.
+    per_target = (
+        queryset.values(
+            "migration_target__target_vm_id", "migration_target__cloud_type"
+        )
+        .annotate(
+            migrations=Count("pk", distinct=True),
+            gb=Coalesce(Sum("selected_mountpoints__total_size"), 0),
+        )
+        .order_by("migration_target__target_vm_id")
+    )
+
+    targets = {}
+    clouds = defaultdict(
+        lambda: {"migrations": 0, "total_gb": 0, "targets": 0, "longest": 0.0}
+    )
+    for row in per_target:
+        vm = row["migration_target__target_vm_id"]
+        cloud_type = row["migration_target__cloud_type"]
+        seconds = row["gb"] * GB / rate(cloud_type)
+        target = targets.setdefault(
+            vm,
+            {
+                "target_vm": vm,
+                "migrations": 0,
+                "total_gb": 0,
+                "estimated_seconds": 0.0,
+            },
+        )
+        target["migrations"] += row["migrations"]
+        target["total_gb"] += row["gb"]
+        target["estimated_seconds"] += seconds
+        cloud = clouds[cloud_type]
+        cloud["migrations"] += row["migrations"]
+        cloud["total_gb"] += row["gb"]
+        cloud["targets"] += 1
+        cloud["longest"] = max(cloud["longest"], target["estimated_seconds"])
+
+    limit = _cloud_limit()
+    cloud_rows = []
+    for cloud_type, cloud in sorted(clouds.items()):
+        serial = cloud["total_gb"] * GB / rate(cloud_type)
+        parallel = serial / min(limit or cloud["targets"], cloud["targets"])
+        cloud_rows.append(
+            {
+                "cloud_type": cloud_type,
+                "migrations": cloud["migrations"],
+                "targets": cloud["targets"],
+                "total_gb": cloud["total_gb"],
+                "estimated_seconds": round(max(parallel, cloud["longest"]), 1),
+            }
+        )
+    for target in targets.values():
+        target["estimated_seconds"] = round(target["estimated_seconds"], 1)
+
+    shared = [vm for vm, target in targets.items() if target["migrations"] > 1]
+    sharing = defaultdict(list)
+    if shared:
+        for vm, pk in (
+            queryset.filter(migration_target__target_vm_id__in=shared)
+            .order_by("pk")
+            .values_list("migration_target__target_vm_id", "pk")
+        ):
+            sharing[vm].append(pk)
+    c_root = list(
+        queryset.filter(selected_mountpoints__mount_point_name__iexact="C:\\")
+        .order_by("pk")
+        .values_list("pk", flat=True)
+        .distinct()
+    )
+
+    return {
+        "migrations": sum(cloud["migrations"] for cloud in cloud_rows),
+        "total_gb": sum(cloud["total_gb"] for cloud in cloud_rows),
+        "estimated_seconds": max(
+            (cloud["estimated_seconds"] for cloud in cloud_rows), default=0
+        ),
+        "throughput": {
+            cloud_type: {
+                "bytes_per_second": round(rate(cloud_type), 1),
+                "samples": history.get(cloud_type, default)["samples"],
+                "source": (
+                    "cloud_history"
+                    if cloud_type in history
+                    else "overall_history" if "*" in history else "default"
+                ),
+            }
+            for cloud_type in sorted(clouds)
+        },
+        "clouds": cloud_rows,
+        "targets": list(targets.values()),
+        "conflicts": {
+            "shared_target_vm": [
+                {"target_vm": vm, "migrations": pks} for vm, pks in sharing.items()
+            ],
+            "c_root": c_root,
+        },
+    }
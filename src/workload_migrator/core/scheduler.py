@@ -0,0 +1,176 @@
+"""
+Admission control for queued migrations.
+
+MigrationScheduler decides which queued migrations may start, given limits on
+concurrent migrations per target VM, per cloud type, and on the total GB in
+flight. It is a pure in-memory structure; the schedule_migrations task in
+core.tasks rebuilds it from the database on every tick.
+
+Jobs wait in one heap per target VM. A global "ready" heap holds the head of
+every target that still has room, and targets whose cloud is saturated are
+parked until a job on that cloud finishes. Each admission is therefore
+O(log n) in the number of queued jobs.
+"""
+
+import heapq
+import itertools
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+
+ORDERINGS = {
+    # Highest priority first, smaller jobs first within a priority.
+    "priority": lambda job: (-job.priority, job.size_gb),
+    # Shortest job first: maximises completed migrations per hour.
+    "size": lambda job: (job.size_gb, -job.priority),
+    # Largest job first: starts long transfers early to shorten the wave.
+    "size_desc": lambda job: (-job.size_gb, -job.priority),
+}
+
+
+@dataclass(frozen=True)
+class Job:
+    """
+    A migration as seen by the scheduler.
+    """
+
+    migration_id: int
+    target_id: int
+    cloud_type: str
+    size_gb: int = 0
+    priority: int = 0
+
+
+@dataclass(frozen=True)
+class Limits:
+    """
+    Concurrency limits; None means unlimited.
+    """
+
+    per_target: int | None = 1
+    per_cloud: int | None = None
+    max_gb_in_flight: int | None = None
+
+    @classmethod
+    def from_settings(cls):
+        conf = getattr(settings, "MIGRATION_SCHEDULER", {})
+        return cls(
+            per_target=conf.get("PER_TARGET", 1) or None,
+            per_cloud=conf.get("PER_CLOUD") or None,
+            max_gb_in_flight=conf.get("MAX_GB_IN_FLIGHT") or None,
+        )
+
+
+class MigrationScheduler:
+    def __init__(self, limits=None, order="priority"):
+        if order not in ORDERINGS:
+            raise ValueError(f"Unknown scheduler order: {order}")
+        self.limits = limits or Limits()
+        self._key = ORDERINGS[order]
+        self._seq = itertools.count()
+        self._queues = defaultdict(list)  # target_id -> heap of (key, seq, job)
+        self._ready = []  # heap of (key, seq, target_id)
+        self._parked = defaultdict(set)  # cloud_type -> {target_id}
+        self._running_per_target = defaultdict(int)
+        self._running_per_cloud = defaultdict(int)
+        self.gb_in_flight = 0
+        self.queued = 0
+
+    @classmethod
+    def from_settings(cls):
+        conf = getattr(settings, "MIGRATION_SCHEDULER", {})
+        return cls(Limits.from_settings(), order=conf.get("ORDER", "priority"))
+
+    def submit(self, job: Job) -> None:
+        """
+        Queue a job for admission.
+        """
+        queue = self._queues[job.target_id]
+        entry = (self._key(job), next(self._seq), job)
+        heapq.heappush(queue, entry)
+        self.queued += 1
+        if queue[0] is entry:
+            self._push_ready(job.target_id)
+
+    def start(self, job: Job) -> None:
+        """
+        Account for a job that is running (admitted here or already in flight).
+        """
+        self._running_per_target[job.target_id] += 1
+        self._running_per_cloud[job.cloud_type] += 1
+        self.gb_in_flight += job.size_gb
+
+    def finish(self, job: Job) -> None:
+        """
+        Release the capacity held by a running job.
+        """
+        self._running_per_target[job.target_id] -= 1
+        self._running_per_cloud[job.cloud_type] -= 1
+        self.gb_in_flight -= job.size_gb
+        self._push_ready(job.target_id)
+        if self._cloud_has_room(job.cloud_type):
+            for target_id in self._parked.pop(job.cloud_type, ()):
+                self._push_ready(target_id)
+
+    def admit(self) -> Job | None:
+        """
+        Pop the best job that fits within every limit, or None if nothing can
+        start now. A job that would exceed the GB budget blocks admission
+        (rather than being skipped) so large migrations are not starved; it
+        is admitted regardless once nothing else is in flight.
+        """
+        while self._ready:
+            key, seq, target_id = self._ready[0]
+            queue = self._queues.get(target_id)
+            if (
+                not queue
+                or queue[0][:2] != (key, seq)
+                or not self._target_has_room(target_id)
+            ):
+                heapq.heappop(self._ready)
+                continue
+
+            job = queue[0][2]
+            if not self._cloud_has_room(job.cloud_type):
+                heapq.heappop(self._ready)
+                self._parked[job.cloud_type].add(target_id)
+                continue
+
+            budget = self.limits.max_gb_in_flight
+            if (
+                budget is not None
+                and self.gb_in_flight
+                and self.gb_in_flight + job.size_gb > budget
+            ):
+                return None
+
+            heapq.heappop(self._ready)
+            heapq.heappop(queue)
+            if not queue:
+                del self._queues[target_id]
+            self.queued -= 1
+            self.start(job)
+            self._push_ready(target_id)
+            return job
+        return None
+
+    def admit_all(self) -> list:
+        admitted = []
+        while (job := self.admit()) is not None:
+            admitted.append(job)
+        return admitted
+
+    def _push_ready(self, target_id) -> None:
+        queue = self._queues.get(target_id)
+        if queue and self._target_has_room(target_id):
+            key, seq, _ = queue[0]
+            heapq.heappush(self._ready, (key, seq, target_id))
+
+    def _target_has_room(self, target_id) -> bool:
+        limit = self.limits.per_target
+        return limit is None or self._running_per_target[target_id] < limit
+
+    def _cloud_has_room(self, cloud_type) -> bool:
+        limit = self.limits.per_cloud
+        return limit is None or self._running_per_cloud[cloud_type] < limit
@@ -0,0 +1,153 @@
+"""
+Precomputed OpenAPI schema.
+
+Generating the schema walks every viewset and serializer, which costs
+hundreds of milliseconds per request. With API_SCHEMA_MODE="static" the
+schema is generated once instead:
+
+- at build or deploy time by ``manage.py build_schema``, which writes
+  versioned, content-addressed artifacts plus a manifest to API_SCHEMA_DIR;
+- or, when no artifacts have been built, on the first request, and then
+  kept in memory for the life of the process.
+
+schema_view serves artifacts from disk with FileResponse, so the WSGI
+server can hand the file to sendfile(). Responses carry an ETag, and
+conditional requests get 304 Not Modified. API_SCHEMA_MODE="live" keeps
+drf-spectacular's per-request generation, which is handy while editing
+serializers.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.views.decorators.http import require_safe
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+from .caching import etag_matches
+
+FORMATS = {
+    "yaml": (OpenApiYamlRenderer, "application/vnd.oai.openapi; charset=utf-8"),
+    "json": (OpenApiJsonRenderer, "application/vnd.oai.openapi+json; charset=utf-8"),
+}
+MANIFEST = "manifest.json"
+
+_generated = {}  # format -> (content, etag), for processes without artifacts
+_manifests = {}  # schema dir -> manifest, or None if nothing was built
+
+
+def _digest(content):
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+def _etag(content):
+    return f'"{_digest(content)}"'
+
+
+def generate():
+    """
+    Generate the schema once and render it in every format.
+    :return: {format: bytes}
+    """
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return {
+        name: renderer().render(schema, renderer_context={})
+        for name, (renderer, _) in FORMATS.items()
+    }
+
+
+def schema_dir():
+    return Path(getattr(settings, "API_SCHEMA_DIR", "schema"))
+
+
+def build(directory=None):
+    """
+    Write the schema artifacts and their manifest; see the module docstring.
+    :return: the manifest
+    """
+    directory = Path(directory or schema_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    version = spectacular_settings.VERSION or "0"
+    manifest = {
+        "version": version,
+        "built_at": timezone.now().isoformat(),
+        "formats": {},
+    }
+    for name, content in generate().items():
+        digest = _digest(content)
+        filename = f"openapi-{version}-{digest[:12]}.{name}"
+        (directory / filename).write_bytes(content)
+        manifest["formats"][name] = {"file": filename, "etag": f'"{digest}"'}
+    # Write the manifest last, so readers never see it point at a missing file.
+    tmp = directory / f".{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2))
+    tmp.replace(directory / MANIFEST)
+    _manifests.pop(str(directory), None)
+    return manifest
+
+
+def _manifest():
+    directory = schema_dir()
+    key = str(directory)
+    if key not in _manifests:
+        try:
+            _manifests[key] = json.loads((directory / MANIFEST).read_text())
+        except FileNotFoundError:
+            _manifests[key] = None
+    return _manifests[key]
+
+
+def _in_memory(fmt):
+    if fmt not in _generated:
+        for name, content in generate().items():
+            _generated[name] = (content, _etag(content))
+    return _generated[fmt]
+
+
+def _format(request):
+    requested = request.GET.get("format", "")
+    if requested in ("json", "openapi-json"):
+        return "json"
+    if requested in ("yaml", "openapi"):
+        return "yaml"
+    return "json" if "json" in request.headers.get("Accept", "") else "yaml"
+
+
+_live_view = SpectacularAPIView.as_view()
+
+
+@require_safe
+def schema_view(request):
+    """
+    GET /api/schema/ (?format=json or yaml, or by Accept header).
+    """
+    if getattr(settings, "API_SCHEMA_MODE", "live") == "live":
+        return _live_view(request)
+
+    fmt = _format(request)
+    content_type = FORMATS[fmt][1]
+    manifest = _manifest()
+    if manifest is not None:
+        entry = manifest["formats"][fmt]
+        etag = entry["etag"]
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(
+                open(schema_dir() / entry["file"], "rb"), content_type=content_type
+            )
+    else:
+        content, etag = _in_memory(fmt)
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=content_type)
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    return response
@@ -1,6 +1,78 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q
 from rest_framework import serializers
 
-from .models import Credentials, Migration, MigrationTarget, MountPoint, Workload
+from . import caching
+from .instrumentation import TimedSerializerMixin
+from .models import (
+    Credentials,
+    Migration,
+    MigrationBatch,
+    MigrationShard,
+    MigrationTarget,
+    MountPoint,
+    Workload,
+    credentials_dedup,
+    credentials_fingerprint,
+    stale_heartbeat,
+)
+
+
+def requested_fields(request):
+    """
+    Return the set of field names from a ``?fields=a,b`` query parameter on a
+    read request, or None when all fields should be rendered.
+    """
+    if request is None or request.method not in ("GET", "HEAD"):
+        return None
+    raw = request.query_params.get("fields")
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(",") if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Drop any top-level fields not listed in the request's ``?fields=`` parameter.
+    Unknown names are rejected with a 400 rather than rendering empty objects.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get("request"))
+        if fields is not None:
+            unknown = fields - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError(
+                    {"fields": f"Unknown fields: {sorted(unknown)}"}
+                )
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+def new_credentials(data):
+    """
+    Credentials row for a nested create: the shared interned row under
+    CREDENTIALS_DEDUP, otherwise a fresh one.
+    """
+    if credentials_dedup():
+        return Credentials.objects.intern(**data)
+    return Credentials.objects.create(**data)
+
+
+def change_credentials(instance, field, data):
+    """
+    Apply a nested credentials update to instance.<field> copy-on-write
+    (see Credentials.replace); the caller saves instance.
+    :return: the previous row if it was replaced, else None
+    """
+    current = getattr(instance, field)
+    creds = current.replace(**data)
+    if creds.pk == current.pk:
+        return None
+    setattr(instance, field, creds)
+    return current
 
 
 class CredentialsSerializer(serializers.ModelSerializer):
@@ -13,7 +85,9 @@ class CredentialsSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "password", "domain"]
 
 
-class MountPointSerializer(serializers.ModelSerializer):
+class MountPointSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     """
     Serializer for MountPoint model.
     """
@@ -30,7 +104,9 @@ class MountPointSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class WorkloadSerializer(serializers.ModelSerializer):
+class WorkloadSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     """
     Serializer for Workload model.
     """
@@ -44,15 +120,25 @@ class WorkloadSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         creds_data = validated_data.pop("credentials")
-        creds = Credentials.objects.create(**creds_data)
+        creds = new_credentials(creds_data)
         return Workload.objects.create(credentials=creds, **validated_data)
 
     def update(self, instance, validated_data):
         validated_data.pop("ip", None)
-        return super().update(instance, validated_data)
+        creds_data = validated_data.pop("credentials", None)
+        replaced = None
+        with transaction.atomic():
+            if creds_data:
+                replaced = change_credentials(instance, "credentials", creds_data)
+            instance = super().update(instance, validated_data)
+            if replaced is not None:
+                replaced.delete_if_unreferenced()
+        return instance
 
 
-class MigrationTargetSerializer(serializers.ModelSerializer):
+class MigrationTargetSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     """
     Serializer for MigrationTarget model.
     """
@@ -66,21 +152,25 @@ class MigrationTargetSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         creds_data = validated_data.pop("cloud_credentials")
-        creds = Credentials.objects.create(**creds_data)
+        creds = new_credentials(creds_data)
         return MigrationTarget.objects.create(cloud_credentials=creds, **validated_data)
 
     def update(self, instance, validated_data):
         validated_data.pop("target_vm", None)
         creds_data = validated_data.pop("cloud_credentials", None)
-        if creds_data:
-            creds = instance.cloud_credentials
-            for attr, value in creds_data.items():
-                setattr(creds, attr, value)
-            creds.save()
-        return super().update(instance, validated_data)
+        replaced = None
+        with transaction.atomic():
+            if creds_data:
+                replaced = change_credentials(instance, "cloud_credentials", creds_data)
+            instance = super().update(instance, validated_data)
+            if replaced is not None:
+                replaced.delete_if_unreferenced()
+        return instance
 
 
-class MigrationSerializer(serializers.ModelSerializer):
+class MigrationSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     """
     Serializer for Migration model.
     """
@@ -88,8 +178,388 @@ class MigrationSerializer(serializers.ModelSerializer):
     selected_mountpoints = serializers.PrimaryKeyRelatedField(
         many=True, queryset=MountPoint.objects.all()
     )
+    eta_seconds = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Migration
-        fields = ["id", "source", "migration_target", "selected_mountpoints", "state"]
-        read_only_fields = ["state"]
+        fields = [
+            "id",
+            "source",
+            "migration_target",
+            "selected_mountpoints",
+            "state",
+            "priority",
+            "bytes_total",
+            "bytes_transferred",
+            "transfer_rate",
+            "eta_seconds",
+            "started_at",
+            "finished_at",
+            "task_id",
+        ]
+        read_only_fields = [
+            "state",
+            "task_id",
+            "bytes_total",
+            "bytes_transferred",
+            "transfer_rate",
+            "started_at",
+            "finished_at",
+        ]
+
+
+class MigrationShardSerializer(serializers.ModelSerializer):
+    """
+    Serializer for one shard of a sharded migration run.
+    """
+
+    mount_point_name = serializers.CharField(
+        source="mountpoint.mount_point_name", read_only=True
+    )
+
+    class Meta:
+        model = MigrationShard
+        fields = [
+            "id",
+            "mountpoint",
+            "mount_point_name",
+            "state",
+            "bytes_total",
+            "bytes_transferred",
+            "transfer_rate",
+            "started_at",
+            "finished_at",
+            "error",
+        ]
+        read_only_fields = fields
+
+
+class MigrationFilterSerializer(serializers.Serializer):
+    """
+    The ``filter`` selector of MigrationSelectionSerializer. Values are
+    type-checked here so that a bad one is a 400, not a database error.
+    """
+
+    state = serializers.ChoiceField(choices=Migration.State.choices, required=False)
+    source = serializers.IntegerField(required=False)
+    migration_target = serializers.IntegerField(required=False)
+    cloud_type = serializers.ChoiceField(
+        choices=MigrationTarget.CLOUD_CHOICES, required=False
+    )
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            unknown = set(data) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError(
+                    f"Unsupported filter keys: {sorted(unknown)}"
+                )
+        value = super().to_internal_value(data)
+        if "cloud_type" in value:
+            value["migration_target__cloud_type"] = value.pop("cloud_type")
+        return value
+
+
+class MigrationSelectionSerializer(serializers.Serializer):
+    """
+    Select migrations either by explicit ``ids`` or by a ``filter``.
+    """
+
+    SELECTORS = ["ids", "filter"]
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    filter = MigrationFilterSerializer(required=False)
+
+    def selector(self, attrs):
+        """
+        The name of the one selector in attrs.
+        """
+        chosen = [name for name in self.SELECTORS if name in attrs]
+        if len(chosen) != 1:
+            names = ", ".join(self.SELECTORS[:-1]) + " or " + self.SELECTORS[-1]
+            raise serializers.ValidationError(f"Provide exactly one of {names}.")
+        return chosen[0]
+
+    def selected(self, attrs):
+        """
+        The queryset of migrations chosen by the one selector in attrs.
+        """
+        if self.selector(attrs) == "ids":
+            return Migration.objects.filter(pk__in=attrs["ids"])
+        return Migration.objects.filter(**attrs["filter"])
+
+
+class RunOptionsSerializer(serializers.Serializer):
+    """
+    Request body for POST /api/migrations/{id}/run/ (sync and async).
+    ``incremental`` syncs only what changed on the target VM.
+    """
+
+    incremental = serializers.BooleanField(default=False)
+
+
+class RunBatchSerializer(MigrationSelectionSerializer):
+    """
+    Request body for POST /api/migrations/run-batch/.
+    Select migrations either by explicit ``ids`` or by a ``filter``.
+    ``incremental`` syncs only what changed on each target VM.
+    """
+
+    concurrency = serializers.IntegerField(required=False, min_value=1)
+    incremental = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        queryset = self.selected(attrs)
+
+        c_root = Migration.selected_mountpoints.through.objects.filter(
+            migration_id=OuterRef("pk"), mountpoint__mount_point_name__iexact="C:\\"
+        )
+        rows = list(
+            queryset.annotate(
+                has_c_root=Exists(c_root),
+                running=ExpressionWrapper(
+                    Q(state=Migration.State.RUNNING) & ~stale_heartbeat(),
+                    output_field=BooleanField(),
+                ),
+            )
+            .order_by("pk")
+            .values_list("pk", "running", "has_c_root")
+        )
+
+        errors = {}
+        found = [pk for pk, _, _ in rows]
+        if "ids" in attrs:
+            missing = sorted(set(attrs["ids"]) - set(found))
+            if missing:
+                errors["missing"] = f"Migrations not found: {missing}"
+        elif not rows:
+            raise serializers.ValidationError("Filter matched no migrations.")
+        c_root_ids = [pk for pk, _, has_c_root in rows if has_c_root]
+        if c_root_ids:
+            errors["c_root"] = (
+                f"Migrations including C:\\ are not allowed: {c_root_ids}"
+            )
+        running = [pk for pk, is_running, _ in rows if is_running]
+        if running:
+            errors["running"] = f"Migrations already running: {running}"
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        attrs["migration_ids"] = found
+        attrs.setdefault(
+            "concurrency", getattr(settings, "MIGRATION_BATCH_CONCURRENCY", 10)
+        )
+        return attrs
+
+
+class PlanSerializer(MigrationSelectionSerializer):
+    """
+    Request body for POST /api/migrations/plan/. Select migrations by
+    ``ids``, by a ``filter``, or as every migration of the given source
+    ``workloads``.
+    """
+
+    SELECTORS = ["ids", "filter", "workloads"]
+
+    workloads = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+
+    def selected(self, attrs):
+        if self.selector(attrs) == "workloads":
+            return Migration.objects.filter(source__in=attrs["workloads"])
+        return super().selected(attrs)
+
+    def validate(self, attrs):
+        queryset = self.selected(attrs)
+        if "ids" in attrs:
+            found = set(queryset.values_list("pk", flat=True))
+            missing = sorted(set(attrs["ids"]) - found)
+            if missing:
+                raise serializers.ValidationError(
+                    {"missing": f"Migrations not found: {missing}"}
+                )
+        attrs["queryset"] = queryset
+        return attrs
+
+
+class MigrationBatchSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for MigrationBatch with aggregate progress.
+    """
+
+    class Meta:
+        model = MigrationBatch
+        fields = ["id", "concurrency", "incremental", "created_at", "finished_at"]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data.update(instance.progress())
+        data["total"] = sum(data["states"].values())
+        return data
+
+
+def bulk_batch_size():
+    return getattr(settings, "BULK_BATCH_SIZE", 1000)
+
+
+def bulk_max_items():
+    return getattr(settings, "BULK_MAX_ITEMS", 10000)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer that runs per-item field validation, then hands the whole
+    batch to check_batch() so cross-row checks can be done in one query.
+    check_batch() returns a list with one error dict (or {}) per item.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        errors = self.check_batch(items)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def check_batch(self, items):
+        return [{} for _ in items]
+
+
+class WorkloadBulkListSerializer(BulkListSerializer):
+    def check_batch(self, items):
+        errors = [{} for _ in items]
+        seen = {}
+        for index, item in enumerate(items):
+            ip = item["ip"]
+            if ip in seen:
+                errors[index]["ip"] = [f"Duplicate of item {seen[ip]} in this batch."]
+            else:
+                seen[ip] = index
+            names = [mp["mount_point_name"] for mp in item.get("mountpoints", [])]
+            if len(set(names)) != len(names):
+                errors[index]["mountpoints"] = ["Mount point names must be unique."]
+        existing = set(
+            Workload.objects.filter(ip__in=list(seen)).values_list("ip", flat=True)
+        )
+        for ip in existing:
+            errors[seen[ip]]["ip"] = ["workload with this ip already exists."]
+        return errors
+
+    def create(self, validated_data):
+        batch_size = bulk_batch_size()
+        with transaction.atomic():
+            if credentials_dedup():
+                creds = Credentials.objects.intern_many(
+                    [item["credentials"] for item in validated_data]
+                )
+            else:
+                creds = Credentials.objects.bulk_create(
+                    [
+                        Credentials(
+                            fingerprint=credentials_fingerprint(**item["credentials"]),
+                            **item["credentials"],
+                        )
+                        for item in validated_data
+                    ],
+                    batch_size=batch_size,
+                )
+            workloads = Workload.objects.bulk_create(
+                [
+                    Workload(ip=item["ip"], credentials=cred)
+                    for item, cred in zip(validated_data, creds)
+                ],
+                batch_size=batch_size,
+            )
+            MountPoint.objects.bulk_create(
+                [
+                    MountPoint(workload=workload, **mp)
+                    for item, workload in zip(validated_data, workloads)
+                    for mp in item.get("mountpoints", [])
+                ],
+                batch_size=batch_size,
+            )
+        # bulk_create sends no signals; new rows only change list responses.
+        caching.invalidate(caching.WORKLOADS)
+        return workloads
+
+
+class NestedMountPointSerializer(serializers.ModelSerializer):
+    """
+    Mount point nested under a workload in a bulk import.
+    """
+
+    class Meta:
+        model = MountPoint
+        fields = ["mount_point_name", "total_size"]
+
+
+class WorkloadBulkSerializer(serializers.ModelSerializer):
+    """
+    Item serializer for POST /api/workloads/bulk/.
+    IP uniqueness is checked once for the whole batch instead of per row.
+    """
+
+    credentials = CredentialsSerializer()
+    mountpoints = NestedMountPointSerializer(many=True, required=False, write_only=True)
+
+    class Meta:
+        model = Workload
+        fields = ["id", "ip", "credentials", "mountpoints"]
+        extra_kwargs = {"ip": {"validators": []}}
+        list_serializer_class = WorkloadBulkListSerializer
+
+
+class MountPointBulkListSerializer(BulkListSerializer):
+    def check_batch(self, items):
+        errors = [{} for _ in items]
+        ids = {item["workload_id"] for item in items}
+        existing = set(Workload.objects.filter(pk__in=ids).values_list("pk", flat=True))
+        taken = set(
+            MountPoint.objects.filter(
+                workload_id__in=ids,
+                mount_point_name__in={item["mount_point_name"] for item in items},
+            ).values_list("workload_id", "mount_point_name")
+        )
+        seen = {}
+        for index, item in enumerate(items):
+            key = (item["workload_id"], item["mount_point_name"])
+            if item["workload_id"] not in existing:
+                errors[index]["workload"] = [
+                    f'Invalid pk "{item["workload_id"]}" - object does not exist.'
+                ]
+            elif key in seen:
+                errors[index]["mount_point_name"] = [
+                    f"Duplicate of item {seen[key]} in this batch."
+                ]
+            elif key in taken:
+                errors[index]["mount_point_name"] = [
+                    "This workload already has a mount point with this name."
+                ]
+            seen.setdefault(key, index)
+        return errors
+
+    def create(self, validated_data):
+        mountpoints = MountPoint.objects.bulk_create(
+            [MountPoint(**item) for item in validated_data],
+            batch_size=bulk_batch_size(),
+        )
+        caching.invalidate(
+            caching.WORKLOADS, {item["workload_id"] for item in validated_data}
+        )
+        return mountpoints
+
+
+class MountPointBulkSerializer(serializers.ModelSerializer):
+    """
+    Item serializer for POST /api/mountpoints/bulk/.
+    Workload existence is checked once for the whole batch instead of per row.
+    """
+
+    workload = serializers.IntegerField(source="workload_id")
+
+    class Meta:
+        model = MountPoint
+        fields = ["id", "workload", "mount_point_name", "total_size"]
+        list_serializer_class = MountPointBulkListSerializer
@@ -0,0 +1,78 @@
+from billiard.process import current_process
+from celery.signals import task_postrun, task_prerun, worker_process_init
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching, instrumentation
+from .events import publish_migration
+from .models import Credentials, Migration, MigrationTarget, MountPoint, Workload
+
+
+@receiver(post_save, sender=Migration)
+def migration_saved(sender, instance, **kwargs):
+    publish_migration(instance)
+
+
+@receiver(post_save, sender=Workload)
+@receiver(post_delete, sender=Workload)
+def workload_changed(sender, instance, **kwargs):
+    caching.invalidate(caching.WORKLOADS, [instance.pk])
+
+
+@receiver(post_save, sender=MountPoint)
+@receiver(post_delete, sender=MountPoint)
+def mountpoint_changed(sender, instance, **kwargs):
+    caching.invalidate(caching.WORKLOADS, [instance.workload_id])
+
+
+@receiver(post_save, sender=MigrationTarget)
+@receiver(post_delete, sender=MigrationTarget)
+def target_changed(sender, instance, **kwargs):
+    caching.invalidate(caching.TARGETS, [instance.pk])
+
+
+@receiver(post_save, sender=Credentials)
+def credentials_changed(sender, instance, created, **kwargs):
+    # Credentials are nested in both workload and target responses. A new
+    # row is not referenced by anything yet, and deleting one cascades to
+    # its workloads and targets, whose own receivers invalidate them.
+    if created:
+        return
+    caching.invalidate(
+        caching.WORKLOADS,
+        Workload.objects.filter(credentials_id=instance.pk).values_list(
+            "pk", flat=True
+        ),
+    )
+    caching.invalidate(
+        caching.TARGETS,
+        MigrationTarget.objects.filter(cloud_credentials_id=instance.pk).values_list(
+            "pk", flat=True
+        ),
+    )
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if instrumentation.record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(instrumentation.record_query)
+
+
+@task_prerun.connect
+def task_started(task_id=None, **kwargs):
+    instrumentation.task_started(task_id)
+
+
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    instrumentation.task_finished(task_id, task.name, state)
+
+
+@worker_process_init.connect
+def serve_worker_metrics(**kwargs):
+    # Each prefork child has its own registry, so each gets its own port.
+    port = getattr(settings, "WORKER_METRICS_PORT", 0)
+    if port:
+        instrumentation.serve_metrics(port + getattr(current_process(), "index", 0))
@@ -1,24 +1,460 @@
-from celery import shared_task
-from core.models import Migration
-from django.core.exceptions import ObjectDoesNotExist
+import logging
+from uuid import uuid4
 
+from celery import chord, group, shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from core.models import Migration, MigrationBatch, MigrationShard
+from core.scheduler import Job, MigrationScheduler
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
-@shared_task(bind=True)
-def run_migration(self, migration_id: int, simulated_minutes: int = 1):
+logger = logging.getLogger(__name__)
+
+
+def retry_countdown(retries: int) -> int:
+    """
+    Exponential backoff with full jitter: a random delay between 0 and
+    MIGRATION_RETRY_BACKOFF * 2**retries seconds, capped at
+    MIGRATION_RETRY_BACKOFF_MAX.
+    """
+    return get_exponential_backoff_interval(
+        factor=getattr(settings, "MIGRATION_RETRY_BACKOFF", 60),
+        retries=retries,
+        maximum=getattr(settings, "MIGRATION_RETRY_BACKOFF_MAX", 3600),
+        full_jitter=True,
+    )
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def run_migration(
+    self,
+    migration_id: int,
+    simulated_minutes: int = 1,
+    claimed: bool = False,
+    incremental: bool = False,
+    resume: bool = False,
+):
     """
     Celery task to perform a Migration asynchronously by delegating
-    to the model's run() method. Retries on failure.
+    to the model's run() method. Retries on failure with exponential
+    backoff; each retry resumes from the migration's checkpoint.
+    With MIGRATION_TRANSFER_WINDOW set, each task transfers one window of
+    chunks and then hands the run to a new task at the back of the queue
+    (see continue_run), so a worker process is free between windows and
+    takes turns between the migrations queued on it.
+    A duplicate delivery, or a task racing another run of the same
+    migration, loses the atomic claim and returns without doing any work.
+    The message is acknowledged only when the task finishes; if the worker
+    dies mid-transfer it is redelivered and resumes from the checkpoint.
+    Large selections are fanned out as per-mount-point shards instead (see
+    run_sharded); the migration then finishes in the chord callback.
     :param self:
     :param migration_id:
     :param simulated_minutes:
-    :return: None
+    :param claimed: the row was already claimed for this task's id
+        by dispatch_migration()
+    :param incremental: only sync what changed on the target VM
+    :param resume: continue a windowed run this task was handed
+    :return: True if this task completed the migration, None if it handed
+        the rest to another task
     """
     try:
         migration = Migration.objects.get(pk=migration_id)
     except ObjectDoesNotExist:
         raise
 
+    task_id = self.request.id or ""
+    if not resume and migration.should_shard():
+        return run_sharded(migration, simulated_minutes, task_id, claimed, incremental)
+    window = getattr(settings, "MIGRATION_TRANSFER_WINDOW", 0) or None
     try:
-        migration.run(simulated_minutes=simulated_minutes)
+        if resume:
+            done = migration.resume(
+                task_id,
+                simulated_minutes=simulated_minutes,
+                incremental=incremental,
+                window=window,
+                retry=self.request.retries > 0,
+            )
+        else:
+            done = migration.run(
+                simulated_minutes=simulated_minutes,
+                task_id=task_id,
+                claimed=claimed,
+                incremental=incremental,
+                window=window,
+            )
+        if done is None:
+            # The run has started; whatever goes wrong from here on is
+            # retried as a resume of it.
+            resume = True
+            continue_run(migration.pk, task_id, simulated_minutes, incremental)
+        elif done and not self.request.is_eager:
+            # Eager runs finish inside advance_batch(), which moves on itself.
+            advance_batches(migration.pk, simulated_minutes=simulated_minutes)
+        return done
+    except ValidationError:
+        raise
     except Exception as exc:
-        raise self.retry(exc=exc, countdown=60)
+        raise self.retry(
+            exc=exc,
+            countdown=retry_countdown(self.request.retries),
+            kwargs={**self.request.kwargs, "resume": resume},
+        )
+
+
+def continue_run(migration_id, task_id, simulated_minutes, incremental):
+    """
+    Hand a windowed run from task_id to a new run_migration task and publish
+    it, so the current task can end. Ownership moves with one conditional
+    UPDATE; if publishing fails it moves back and the error is raised.
+    :return: the new task id, or None if task_id no longer owned the run
+    """
+    next_id = str(uuid4())
+    handed = Migration.objects.filter(
+        pk=migration_id, task_id=task_id, state=Migration.State.RUNNING
+    ).update(task_id=next_id, progress_updated_at=timezone.now())
+    if not handed:
+        return None
+    try:
+        run_migration.apply_async(
+            (migration_id,),
+            {
+                "simulated_minutes": simulated_minutes,
+                "claimed": True,
+                "incremental": incremental,
+                "resume": True,
+            },
+            task_id=next_id,
+        )
+    except Exception:
+        Migration.objects.filter(pk=migration_id, task_id=next_id).update(
+            task_id=task_id
+        )
+        raise
+    return next_id
+
+
+def run_sharded(migration, simulated_minutes, task_id, claimed, incremental=False):
+    """
+    Claim the migration and run each selected mount point as its own
+    run_migration_shard task, in parallel on any worker, with
+    finish_sharded_migration as the chord callback. Each shard is paced to
+    its share of the simulated duration.
+    :return: True if this call started the run
+    """
+    shard_ids = migration.start_shards(
+        task_id=task_id, claimed=claimed, incremental=incremental
+    )
+    if shard_ids is None:
+        return False
+    callback = finish_sharded_migration.s(
+        migration.pk, task_id=task_id, incremental=incremental
+    )
+    if not shard_ids:
+        callback.delay([])
+        return True
+    sizes = dict(
+        MigrationShard.objects.filter(pk__in=shard_ids).values_list("pk", "bytes_total")
+    )
+    total = sum(sizes.values()) or 1
+    header = group(
+        run_migration_shard.si(
+            shard_id, duration=simulated_minutes * 60 * sizes[shard_id] / total
+        )
+        for shard_id in shard_ids
+    )
+    chord(header)(callback)
+    return True
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def run_migration_shard(self, shard_id: int, duration: float = 0):
+    """
+    Transfer one shard of a sharded migration. A failure is retried with
+    exponential backoff, each retry resuming from the shard's checkpoint.
+    Once the retries are used up the failure is recorded on the shard and
+    logged, not raised, so the chord callback still runs and the other
+    shards are unaffected.
+    :return: final state of the shard
+    """
+    shard = MigrationShard.objects.select_related("migration", "mountpoint").get(
+        pk=shard_id
+    )
+    try:
+        shard.run(task_id=self.request.id or "", duration=duration)
+    except Exception as exc:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc, countdown=retry_countdown(self.request.retries))
+        logger.exception(
+            "Shard %s of migration %s failed", shard_id, shard.migration_id
+        )
+    return shard.state
+
+
+@shared_task(bind=True)
+def finish_sharded_migration(
+    self, results, migration_id: int, task_id: str = "", incremental: bool = False
+):
+    """
+    Chord callback of run_sharded: finalise the target VM if every shard
+    succeeded, otherwise mark the migration failed.
+    :param results: shard states from the chord header (unused)
+    :param task_id: id of the task that claimed the run
+    :param incremental: apply only the differences to the target VM
+    :return: final state of the migration, or None if the run lost its claim
+    """
+    state = Migration.objects.get(pk=migration_id).finish_shards(
+        task_id=task_id, incremental=incremental
+    )
+    if state is not None and not self.request.is_eager:
+        advance_batches(migration_id)
+    return state
+
+
+SIZE_ROUTED_TASKS = {"core.tasks.run_migration"}
+
+
+def migration_queue(size_gb):
+    """
+    Queue for a migration selecting size_gb: the first MIGRATION_QUEUES entry
+    whose limit it fits under; an entry with limit None takes the rest.
+    """
+    queues = settings.MIGRATION_QUEUES
+    for queue, max_gb in queues:
+        if max_gb is None or size_gb <= max_gb:
+            return queue
+    return queues[-1][0]
+
+
+def route_migration(name, args, kwargs, options, task=None, **kw):
+    """
+    Celery router (CELERY_TASK_ROUTES) sending migration tasks to a queue by
+    the GB they select (a shard by its mount point's size), so short
+    migrations never wait behind multi-hour ones. Other tasks fall through
+    to the default queue.
+    """
+    if not args:
+        return None
+    if name == "core.tasks.run_migration_shard":
+        size_gb = (
+            MigrationShard.objects.filter(pk=args[0])
+            .values_list("mountpoint__total_size", flat=True)
+            .first()
+        )
+        return {"queue": migration_queue(size_gb or 0)}
+    if name not in SIZE_ROUTED_TASKS:
+        return None
+    size_gb = Migration.selected_mountpoints.through.objects.filter(
+        migration_id=args[0]
+    ).aggregate(gb=Coalesce(Sum("mountpoint__total_size"), 0))["gb"]
+    return {"queue": migration_queue(size_gb)}
+
+
+def dispatch_migration(
+    migration_id: int,
+    simulated_minutes: int = 1,
+    run_key: str = "",
+    states=None,
+    incremental: bool = False,
+):
+    """
+    Claim a migration for a new run_migration task and enqueue it.
+    The claim locks the row, so of several concurrent callers exactly one
+    dispatches; the others get None back. If the task cannot be published
+    (broker down, routing error) the claim is rolled back and the error
+    re-raised, so the migration is not left running without a task.
+    :param states: states the migration may be claimed from
+        (default: anything but running, or running with a stale heartbeat)
+    :param incremental: run in incremental mode (see Migration.run)
+    :return: the new task id, or None if the migration was not claimable
+    """
+    task_id = str(uuid4())
+    rows = Migration.objects.filter(pk=migration_id)
+    if states is not None:
+        rows = rows.filter(state__in=states)
+    else:
+        rows = rows.claimable()
+    with transaction.atomic():
+        previous = (
+            rows.select_for_update()
+            .values("state", "task_id", "run_key", "started_at", "progress_updated_at")
+            .first()
+        )
+        if previous is None:
+            return None
+        Migration.objects.filter(pk=migration_id).update(
+            state=Migration.State.RUNNING,
+            task_id=task_id,
+            run_key=run_key,
+            started_at=None,
+            progress_updated_at=timezone.now(),
+        )
+    try:
+        run_migration.apply_async(
+            (migration_id,),
+            {
+                "simulated_minutes": simulated_minutes,
+                "claimed": True,
+                "incremental": incremental,
+            },
+            task_id=task_id,
+        )
+    except Exception:
+        Migration.objects.filter(
+            pk=migration_id,
+            task_id=task_id,
+            state=Migration.State.RUNNING,
+            started_at__isnull=True,
+        ).update(**previous)
+        raise
+    return task_id
+
+
+def expire_stale_runs():
+    """
+    Mark runs whose worker died (started, but no heartbeat for
+    MIGRATION_HEARTBEAT_TIMEOUT) as failed, so they stop counting against
+    the scheduler limits and can be run again; their checkpoint is kept.
+    The owning task id is cleared, so a task of the expired run that is
+    still queued (a redelivery, retry or windowed continuation) can no
+    longer claim it while another run uses the target.
+    Claims that were never started are left alone: their task may still be
+    waiting in a busy queue.
+    :return: number of runs expired
+    """
+    return (
+        Migration.objects.stale()
+        .filter(started_at__isnull=False)
+        .update(state=Migration.State.ERROR, transfer_rate=0, task_id="", run_key="")
+    )
+
+
+@shared_task
+def advance_batch(batch_id: int, simulated_minutes: int = 1):
+    """
+    Start members of a batch through dispatch_migration() until
+    batch.concurrency of them are running, and stamp the batch as finished
+    once every member has been started and none is running any more.
+    Called when the batch is created, whenever one of its runs completes
+    (see advance_batches) and on every scheduler tick, so a member starts
+    as soon as a slot is free rather than waiting for a fixed predecessor.
+    A member whose run was expired (see expire_stale_runs) is started again.
+    Like the scheduler it counts running members without a lock, so calls
+    that overlap can briefly start more than batch.concurrency members.
+    :param batch_id:
+    :param simulated_minutes:
+    :return: ids of the migrations dispatched
+    """
+    batch = MigrationBatch.objects.filter(pk=batch_id, finished_at__isnull=True).first()
+    if batch is None:
+        return []
+    members = batch.migrations.all()
+    dispatched, tried = [], set()
+    while True:
+        slots = (
+            batch.concurrency - members.filter(state=Migration.State.RUNNING).count()
+        )
+        pending = list(
+            batch.pending()
+            .exclude(pk__in=tried)
+            .values_list("pk", flat=True)[: max(slots, 0)]
+        )
+        if not pending:
+            break
+        for migration_id in pending:
+            tried.add(migration_id)
+            try:
+                task_id = dispatch_migration(
+                    migration_id,
+                    simulated_minutes=simulated_minutes,
+                    run_key=batch.run_key,
+                    incremental=batch.incremental,
+                )
+            except Exception:
+                # With eager tasks the run's own failure surfaces here; it is
+                # already recorded on the migration.
+                logger.exception("Migration %s in batch failed", migration_id)
+                continue
+            if task_id is not None:
+                dispatched.append(migration_id)
+
+    unfinished = members.filter(
+        Q(state=Migration.State.RUNNING) | ~Q(run_key=batch.run_key)
+    )
+    if not unfinished.exists():
+        MigrationBatch.objects.filter(pk=batch_id, finished_at__isnull=True).update(
+            finished_at=timezone.now()
+        )
+    return dispatched
+
+
+def advance_batches(migration_id: int, simulated_minutes: int = 1):
+    """
+    Let the unfinished batches of a migration whose run just completed start
+    their next members.
+    """
+    batch_ids = MigrationBatch.objects.filter(
+        migrations=migration_id, finished_at__isnull=True
+    ).values_list("pk", flat=True)
+    for batch_id in batch_ids:
+        advance_batch.delay(batch_id, simulated_minutes=simulated_minutes)
+
+
+def scheduler_jobs(queryset):
+    """
+    Build scheduler Jobs for the given migrations with one aggregate query.
+    """
+    rows = queryset.annotate(
+        size_gb=Coalesce(Sum("selected_mountpoints__total_size"), 0)
+    ).values_list(
+        "pk",
+        "migration_target__target_vm_id",
+        "migration_target__cloud_type",
+        "size_gb",
+        "priority",
+    )
+    return [Job(*row) for row in rows]
+
+
+@shared_task
+def schedule_migrations(simulated_minutes: int = 1):
+    """
+    Admit queued migrations within the MIGRATION_SCHEDULER limits and
+    dispatch them. Runs periodically (celery beat) and after each enqueue.
+    Unfinished batches are advanced first (see advance_batch), which is how
+    a batch moves on after a member fails.
+    Each admitted migration is claimed by dispatch_migration() so
+    overlapping ticks never dispatch it twice. Runs of dead workers are
+    expired first (see expire_stale_runs).
+    :param simulated_minutes:
+    :return: ids of the migrations dispatched
+    """
+    expire_stale_runs()
+    batch_ids = MigrationBatch.objects.filter(finished_at__isnull=True).values_list(
+        "pk", flat=True
+    )
+    for batch_id in batch_ids:
+        advance_batch(batch_id, simulated_minutes=simulated_minutes)
+    scheduler = MigrationScheduler.from_settings()
+    running = Migration.objects.filter(state=Migration.State.RUNNING)
+    for job in scheduler_jobs(running):
+        scheduler.start(job)
+    queued = Migration.objects.filter(state=Migration.State.QUEUED)
+    for job in scheduler_jobs(queued):
+        scheduler.submit(job)
+
+    dispatched = []
+    for job in scheduler.admit_all():
+        task_id = dispatch_migration(
+            job.migration_id,
+            simulated_minutes=simulated_minutes,
+            states=[Migration.State.QUEUED],
+        )
+        if task_id is not None:
+            dispatched.append(job.migration_id)
+    return dispatched
@@ -0,0 +1,60 @@
+import pytest
+from core.models import Credentials, Migration, MigrationTarget, MountPoint, Workload
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Cached API responses must not leak between tests.
+    """
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def assert_constant_queries():
+    """
+    Assert that an operation issues the same number of queries before and
+    after the data set grows, i.e. that it has no N+1 behaviour.
+
+    Usage: assert_constant_queries(lambda: client.get(url), grow=lambda: ...)
+    """
+
+    def check(operation, grow, rounds=2):
+        counts = []
+        for i in range(rounds + 1):
+            if i:
+                grow()
+            with CaptureQueriesContext(connection) as ctx:
+                operation()
+            counts.append(len(ctx.captured_queries))
+        assert len(set(counts)) == 1, f"Query count grew with row count: {counts}"
+        return counts[0]
+
+    return check
+
+
+@pytest.fixture
+def make_migration():
+    creds = Credentials.objects.create(username="u", password="p", domain="d")
+    counter = iter(range(1, 250))
+
+    def make(names=("D:\\",), cloud_type="aws"):
+        src = Workload.objects.create(ip=f"192.0.2.{next(counter)}", credentials=creds)
+        dst = Workload.objects.create(ip=f"192.0.2.{next(counter)}", credentials=creds)
+        mps = [
+            MountPoint.objects.create(workload=src, mount_point_name=n, total_size=1)
+            for n in names
+        ]
+        tgt = MigrationTarget.objects.create(
+            cloud_type=cloud_type, cloud_credentials=creds, target_vm=dst
+        )
+        mig = Migration.objects.create(source=src, migration_target=tgt)
+        mig.selected_mountpoints.set(mps)
+        return mig
+
+    return make
@@ -1,4 +1,5 @@
 import pytest
+from core.models import Credentials, Migration, MigrationTarget, MountPoint, Workload
 from django.urls import reverse
 from rest_framework.test import APIClient
 
@@ -81,3 +82,68 @@ def test_full_migration_flow(client):
     status_resp = client.get(reverse("migration-detail", args=[mig_id]), format="json")
     assert status_resp.status_code == 200
     assert status_resp.data["state"] == returned_status
+
+
+def _seed_row(index):
+    creds = Credentials.objects.create(username="u", password="p", domain="d")
+    wl = Workload.objects.create(ip=f"198.51.100.{index}", credentials=creds)
+    mps = [
+        MountPoint.objects.create(workload=wl, mount_point_name=name, total_size=5)
+        for name in ("D:\\", "E:\\")
+    ]
+    tgt = MigrationTarget.objects.create(
+        cloud_type="aws", cloud_credentials=creds, target_vm=wl
+    )
+    mig = Migration.objects.create(source=wl, migration_target=tgt)
+    mig.selected_mountpoints.set(mps)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize(
+    "url_name", ["workload-list", "migrationtarget-list", "migration-list"]
+)
+def test_list_query_count_is_constant(client, assert_constant_queries, url_name):
+    counter = iter(range(1, 250))
+
+    def grow():
+        for _ in range(3):
+            _seed_row(next(counter))
+
+    grow()
+    assert_constant_queries(lambda: client.get(reverse(url_name)), grow)
+
+
+@pytest.mark.django_db
+def test_list_is_cursor_paginated(client):
+    for i in range(1, 6):
+        _seed_row(i)
+
+    first = client.get(reverse("workload-list"), {"page_size": 2})
+    assert first.status_code == 200
+    assert len(first.data["results"]) == 2
+    assert first.data["next"]
+
+    second = client.get(first.data["next"])
+    first_ids = [row["id"] for row in first.data["results"]]
+    second_ids = [row["id"] for row in second.data["results"]]
+    assert min(second_ids) > max(first_ids)
+
+
+@pytest.mark.django_db
+def test_sparse_fieldset_skips_nested(client, django_assert_num_queries):
+    _seed_row(1)
+
+    with django_assert_num_queries(1):
+        resp = client.get(reverse("workload-list"), {"fields": "id,ip"})
+    assert resp.status_code == 200
+    assert set(resp.data["results"][0]) == {"id", "ip"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["workload-list", "workload-export"])
+def test_unknown_sparse_field_is_rejected(client, url_name):
+    _seed_row(1)
+
+    resp = client.get(reverse(url_name), {"fields": "id,bogus"})
+    assert resp.status_code == 400
+    assert "bogus" in str(resp.json()["fields"])
@@ -0,0 +1,102 @@
+import pytest
+from asgiref.sync import async_to_sync
+from core import tasks
+from core.models import Migration, MountPoint
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+def _get(url, **params):
+    return async_to_sync(AsyncClient().get)(url, params)
+
+
+def _post(url, headers=None, data=None):
+    if data is None:
+        return async_to_sync(AsyncClient().post)(url, headers=headers)
+    return async_to_sync(AsyncClient().post)(
+        url, data, content_type="application/json", headers=headers
+    )
+
+
+@pytest.mark.django_db
+def test_async_reads_match_sync_api(make_migration):
+    mig = make_migration(names=("D:\\", "E:\\"))
+    sync = APIClient()
+
+    for name, args, fields in (
+        ("workload-detail", [mig.source_id], "id,mountpoints"),
+        ("migration-detail", [mig.pk], "id,selected_mountpoints"),
+        ("workload-list", [], "id,mountpoints"),
+        ("migration-list", [], "id,selected_mountpoints"),
+        ("workload-list", [], "id,bogus"),
+        ("migration-detail", [mig.pk], "bogus"),
+    ):
+        expected = sync.get(reverse(name, args=args), {"fields": fields})
+        actual = _get(reverse(f"async-{name}", args=args), fields=fields)
+        assert actual.status_code == expected.status_code
+        assert actual.json() == expected.json()
+
+    assert _get(reverse("async-migration-detail", args=[999999])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_async_list_pages_with_cursor(make_migration):
+    for _ in range(3):
+        make_migration()
+
+    first = _get(reverse("async-workload-list"), page_size=4).json()
+    second = _get(first["next"]).json()
+    assert first["previous"] is None and second["next"] is None
+    ids = [w["id"] for w in first["results"] + second["results"]]
+    assert len(ids) == 6 and ids == sorted(ids)
+
+    back = _get(second["previous"]).json()
+    assert back["results"] == first["results"]
+
+
+@pytest.mark.django_db
+def test_async_run_claims_once(make_migration):
+    mig = make_migration()
+    url = reverse("async-migration-run", args=[mig.pk])
+
+    resp = _post(url, {"Idempotency-Key": "k1"})
+    assert resp.status_code == 202
+    task_id = resp.json()["task_id"]
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.SUCCESS
+
+    replay = _post(url, {"Idempotency-Key": "k1"})
+    assert replay["Idempotent-Replayed"] == "true"
+    assert replay.json()["task_id"] == task_id
+
+    MountPoint.objects.filter(pk__in=mig.selected_mountpoints.all()).update(
+        mount_point_name="c:\\"
+    )
+    assert _post(url).status_code == 400
+
+
+@pytest.mark.django_db
+def test_async_run_parses_the_body_like_the_sync_api(make_migration, monkeypatch):
+    mig = make_migration()
+    sync = APIClient()
+    for body in ([True], {"incremental": "maybe"}):
+        expected = sync.post(
+            reverse("migration-run", args=[mig.pk]), body, format="json"
+        )
+        actual = _post(reverse("async-migration-run", args=[mig.pk]), data=body)
+        assert actual.status_code == expected.status_code == 400
+        assert actual.json() == expected.json()
+
+    calls = []
+
+    def dispatch(migration_id, **kwargs):
+        calls.append(kwargs["incremental"])
+        return "task"
+
+    monkeypatch.setattr(tasks, "dispatch_migration", dispatch)
+    resp = _post(
+        reverse("async-migration-run", args=[mig.pk]), data={"incremental": True}
+    )
+    assert resp.status_code == 202
+    assert calls == [True]
@@ -0,0 +1,140 @@
+import pytest
+from core.models import Migration, MigrationBatch
+from core.tasks import advance_batch, run_migration, schedule_migrations
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.mark.django_db
+def test_run_batch_by_ids(client, make_migration):
+    migs = [make_migration() for _ in range(5)]
+
+    resp = client.post(
+        reverse("migration-run-batch"),
+        {"ids": [m.id for m in migs], "concurrency": 2},
+        format="json",
+    )
+
+    assert resp.status_code == 202, resp.data
+    assert resp.data["total"] == 5
+    assert resp.data["concurrency"] == 2
+
+    batch = client.get(reverse("migrationbatch-detail", args=[resp.data["id"]]))
+    assert batch.data["states"]["success"] == 5
+    assert batch.data["finished_at"] is not None
+    assert batch.data["bytes_total"] > 0
+    assert batch.data["bytes_transferred"] == batch.data["bytes_total"]
+
+
+@pytest.mark.django_db
+def test_batch_members_start_as_slots_free_up(make_migration, monkeypatch):
+    published = []
+    monkeypatch.setattr(
+        run_migration,
+        "apply_async",
+        lambda args, kwargs, task_id: published.append(
+            (task_id, kwargs["incremental"])
+        ),
+    )
+    migs = [make_migration() for _ in range(3)]
+    batch = MigrationBatch.objects.create(concurrency=2, incremental=True)
+    batch.migrations.set(migs)
+
+    assert advance_batch(batch.pk) == [migs[0].pk, migs[1].pk]
+    assert advance_batch(batch.pk) == []
+    running = Migration.objects.filter(state=Migration.State.RUNNING).order_by("pk")
+    assert set(running.values_list("run_key", flat=True)) == {batch.run_key}
+    assert published == [
+        (task_id, True) for task_id in running.values_list("task_id", flat=True)
+    ]
+
+    Migration.objects.filter(pk=migs[1].pk).update(state=Migration.State.ERROR)
+    assert schedule_migrations() == []
+    assert Migration.objects.get(pk=migs[2].pk).state == Migration.State.RUNNING
+    batch.refresh_from_db()
+    assert batch.finished_at is None
+
+    running.update(state=Migration.State.SUCCESS)
+    assert advance_batch(batch.pk) == []
+    batch.refresh_from_db()
+    assert batch.finished_at is not None
+
+
+@pytest.mark.django_db
+def test_run_batch_by_filter(client, make_migration):
+    make_migration(cloud_type="aws")
+    azure = make_migration(cloud_type="azure")
+
+    resp = client.post(
+        reverse("migration-run-batch"),
+        {"filter": {"cloud_type": "azure", "state": "not_started"}},
+        format="json",
+    )
+
+    assert resp.status_code == 202, resp.data
+    assert resp.data["total"] == 1
+    azure.refresh_from_db()
+    assert azure.state == Migration.State.SUCCESS
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "bad_filter",
+    [
+        {"source": "abc"},
+        {"migration_target": [1]},
+        {"state": "bogus"},
+        {"cloud_type": "gcp"},
+        {"owner": 1},
+        ["state"],
+    ],
+)
+def test_run_batch_rejects_bad_filter(client, make_migration, bad_filter):
+    make_migration()
+
+    for name in ("migration-run-batch", "migration-plan"):
+        resp = client.post(reverse(name), {"filter": bad_filter}, format="json")
+        assert resp.status_code == 400, (name, resp.content)
+        assert "filter" in resp.json()
+
+
+@pytest.mark.django_db
+def test_run_batch_rejects_c_root_and_missing(
+    client, make_migration, django_assert_max_num_queries
+):
+    ok = make_migration()
+    bad = make_migration(names=("c:\\", "D:\\"))
+
+    with django_assert_max_num_queries(1):
+        resp = client.post(
+            reverse("migration-run-batch"),
+            {"ids": [ok.id, bad.id, 999999]},
+            format="json",
+        )
+
+    assert resp.status_code == 400
+    assert str(bad.id) in resp.data["c_root"][0]
+    assert "999999" in resp.data["missing"][0]
+    ok.refresh_from_db()
+    assert ok.state == Migration.State.NOT_STARTED
+
+
+@pytest.mark.django_db
+def test_run_batch_does_not_select_by_workloads(client, make_migration):
+    mig = make_migration()
+
+    resp = client.post(
+        reverse("migration-run-batch"),
+        {"workloads": [mig.source_id]},
+        format="json",
+    )
+
+    assert resp.status_code == 400
+    assert "ids or filter" in str(resp.data)
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.NOT_STARTED
@@ -0,0 +1,43 @@
+import pytest
+from core.benchmarks import run_benchmark, seed_fleet, simulate_workers, summarize
+from core.models import Credentials, Migration, MountPoint
+
+
+def test_summarize_percentiles():
+    stats = summarize([float(ms) for ms in range(1, 101)], elapsed=2.0)
+    assert stats["rps"] == 50.0
+    assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]) == (50, 95, 99)
+
+
+def test_prefetch_lets_a_busy_node_hoard_short_jobs():
+    # One long job, then three short ones; two single-process nodes.
+    jobs = [("q", 100), ("q", 1), ("q", 1), ("q", 1)]
+    nodes = [(("q",), 1), (("q",), 1)]
+
+    hoarded = simulate_workers(jobs, nodes, prefetch_multiplier=4, acks_late=False)
+    assert hoarded[2] == 101  # reserved by the node stuck on the long job
+
+    fair = simulate_workers(jobs, nodes, prefetch_multiplier=1, acks_late=True)
+    assert fair == [100, 1, 2, 3]
+
+
+@pytest.mark.django_db
+def test_seed_fleet_never_selects_system_drive():
+    creds = seed_fleet(workloads=30, migrations=10)
+    migrations = Migration.objects.filter(source__credentials=creds)
+    assert 0 < migrations.count() <= 10
+    assert not any(m.has_c_root() for m in migrations)
+    assert MountPoint.objects.filter(mount_point_name="C:\\").count() == 30
+
+
+@pytest.mark.django_db(transaction=True)
+def test_suite_reports_every_endpoint_and_cleans_up():
+    result = run_benchmark(
+        "suite", workloads=10, migrations=3, requests=4, concurrency=2
+    )
+
+    assert result["endpoints"]["workload_list"]["errors"] == 0
+    assert all(stats["requests"] == 4 for stats in result["endpoints"].values())
+    assert result["run_migration"]["requests"] == 3
+    assert result["run_migration"]["errors"] == 0
+    assert not Credentials.objects.exists()
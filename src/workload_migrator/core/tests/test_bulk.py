@@ -0,0 +1,90 @@
+import pytest
+from core.models import Credentials, MountPoint, Workload
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+def _workload_payload(ip, mountpoints=()):
+    return {
+        "ip": ip,
+        "credentials": {"username": "svc", "password": "p", "domain": "corp"},
+        "mountpoints": [
+            {"mount_point_name": name, "total_size": 10} for name in mountpoints
+        ],
+    }
+
+
+@pytest.mark.django_db
+def test_bulk_workloads_created_in_constant_queries(client, django_assert_num_queries):
+    payload = [_workload_payload(f"203.0.113.{i}", ["D:\\", "E:\\"]) for i in range(50)]
+
+    # savepoint, ip check, credentials, workloads, mountpoints, release
+    with django_assert_num_queries(6):
+        resp = client.post(reverse("workload-bulk"), payload, format="json")
+
+    assert resp.status_code == 201, resp.data
+    assert len(resp.data) == 50
+    assert Workload.objects.count() == 50
+    assert MountPoint.objects.count() == 100
+    assert Credentials.objects.count() == 50
+
+
+@pytest.mark.django_db
+def test_bulk_workloads_reports_duplicate_and_existing_ips(client):
+    c = Credentials.objects.create(username="u", password="p", domain="d")
+    Workload.objects.create(ip="203.0.113.1", credentials=c)
+    payload = [
+        _workload_payload("203.0.113.1"),
+        _workload_payload("203.0.113.2"),
+        _workload_payload("203.0.113.2"),
+    ]
+
+    resp = client.post(reverse("workload-bulk"), payload, format="json")
+
+    assert resp.status_code == 400
+    assert "ip" in resp.data[0]
+    assert resp.data[1] == {}
+    assert "ip" in resp.data[2]
+    assert Workload.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_bulk_mountpoints_validates_workloads_in_batch(client):
+    c = Credentials.objects.create(username="u", password="p", domain="d")
+    wl = Workload.objects.create(ip="203.0.113.9", credentials=c)
+    payload = [
+        {"workload": wl.id, "mount_point_name": "D:\\", "total_size": 5},
+        {"workload": wl.id + 1000, "mount_point_name": "E:\\", "total_size": 5},
+    ]
+
+    resp = client.post(reverse("mountpoint-bulk"), payload, format="json")
+    assert resp.status_code == 400
+    assert "workload" in resp.data[1]
+
+    resp = client.post(reverse("mountpoint-bulk"), payload[:1], format="json")
+    assert resp.status_code == 201
+    assert resp.data[0]["workload"] == wl.id
+    assert wl.mountpoints.count() == 1
+
+
+@pytest.mark.django_db
+def test_bulk_mountpoints_rejects_duplicate_names(client):
+    c = Credentials.objects.create(username="u", password="p", domain="d")
+    wl = Workload.objects.create(ip="203.0.113.10", credentials=c)
+    MountPoint.objects.create(workload=wl, mount_point_name="D:\\", total_size=5)
+    payload = [
+        {"workload": wl.id, "mount_point_name": "D:\\", "total_size": 5},
+        {"workload": wl.id, "mount_point_name": "E:\\", "total_size": 5},
+        {"workload": wl.id, "mount_point_name": "E:\\", "total_size": 5},
+    ]
+
+    resp = client.post(reverse("mountpoint-bulk"), payload, format="json")
+    assert resp.status_code == 400
+    assert "mount_point_name" in resp.data[0]
+    assert resp.data[1] == {}
+    assert "mount_point_name" in resp.data[2]
@@ -0,0 +1,116 @@
+import pytest
+from core import caching
+from core.models import Credentials, MountPoint, Workload
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def workload():
+    creds = Credentials.objects.create(username="u", password="p", domain="d")
+    return Workload.objects.create(ip="192.0.2.10", credentials=creds)
+
+
+@pytest.mark.django_db
+def test_repeat_get_is_served_from_cache(client, workload, django_assert_num_queries):
+    url = reverse("workload-detail", args=[workload.pk])
+    first = client.get(url)
+    assert first.status_code == 200
+
+    with django_assert_num_queries(0):
+        second = client.get(url)
+    assert second.content == first.content
+    assert second["ETag"] == first["ETag"]
+
+
+@pytest.mark.django_db
+def test_if_none_match_returns_not_modified(client, workload):
+    url = reverse("workload-list")
+    etag = client.get(url)["ETag"]
+
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+    assert resp.content == b""
+
+
+@pytest.mark.django_db(transaction=True)
+def test_nested_writes_invalidate(client, workload, make_migration):
+    detail = reverse("workload-detail", args=[workload.pk])
+    etag = client.get(detail)["ETag"]
+
+    MountPoint.objects.create(workload=workload, mount_point_name="D:\\", total_size=1)
+    resp = client.get(detail, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert [mp["mount_point_name"] for mp in resp.json()["mountpoints"]] == ["D:\\"]
+
+    workload.credentials.username = "renamed"
+    workload.credentials.save()
+    assert client.get(detail).json()["credentials"]["username"] == "renamed"
+
+    mig = make_migration()
+    target_vm = mig.migration_target.target_vm
+    target_url = reverse("workload-detail", args=[target_vm.pk])
+    assert client.get(target_url).json()["mountpoints"] == []
+    mig.copy_mountpoints_to_target(mig.selected_mountpoints.all())
+    assert len(client.get(target_url).json()["mountpoints"]) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_create_invalidates_list(client):
+    url = reverse("workload-list")
+    assert client.get(url).json()["results"] == []
+
+    client.post(
+        reverse("workload-bulk"),
+        [
+            {
+                "ip": "192.0.2.30",
+                "credentials": {"username": "u", "password": "p", "domain": "d"},
+            }
+        ],
+        format="json",
+    )
+    assert [w["ip"] for w in client.get(url).json()["results"]] == ["192.0.2.30"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidation_waits_for_commit(client, workload):
+    key = caching._version_key(caching.WORKLOADS)
+    before = caching._get_version(key)
+
+    with transaction.atomic():
+        MountPoint.objects.create(
+            workload=workload, mount_point_name="D:\\", total_size=1
+        )
+        assert caching._get_version(key) == before
+    after = caching._get_version(key)
+    assert after != before
+
+    with transaction.atomic():
+        MountPoint.objects.create(
+            workload=workload, mount_point_name="E:\\", total_size=1
+        )
+        transaction.set_rollback(True)
+    assert caching._get_version(key) == after
+
+
+@pytest.mark.django_db(transaction=True)
+def test_evicted_version_does_not_revive_old_responses(client, workload):
+    url = reverse("workload-list")
+
+    def names():
+        return [w["credentials"]["username"] for w in client.get(url).json()["results"]]
+
+    assert names() == ["u"]
+
+    # A write that skips signals, then the version key is evicted.
+    Credentials.objects.filter(pk=workload.credentials_id).update(username="renamed")
+    cache.delete(caching._version_key(caching.WORKLOADS))
+    assert names() == ["renamed"]
@@ -0,0 +1,133 @@
+import pytest
+from core.models import (
+    Credentials,
+    CredentialsQuerySet,
+    MigrationTarget,
+    Workload,
+    credentials_fingerprint,
+)
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+CREDS = {"username": "svc", "password": "p", "domain": "corp"}
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.mark.django_db
+def test_dedup_shares_one_row(
+    client, settings, django_capture_on_commit_callbacks, django_assert_num_queries
+):
+    settings.CREDENTIALS_DEDUP = True
+    for i in range(3):
+        with django_capture_on_commit_callbacks(execute=True):
+            resp = client.post(
+                reverse("workload-list"),
+                {"ip": f"192.0.2.{i + 1}", "credentials": CREDS},
+                format="json",
+            )
+        assert resp.status_code == 201
+    client.post(
+        reverse("workload-bulk"),
+        [{"ip": "192.0.2.9", "credentials": CREDS}],
+        format="json",
+    )
+    assert Credentials.objects.count() == 1
+    assert Workload.objects.filter(credentials__username="svc").count() == 4
+
+    with django_assert_num_queries(1):
+        Credentials.objects.intern(**CREDS)
+
+
+@pytest.mark.django_db
+def test_intern_never_hands_out_a_deleted_row(settings):
+    settings.CREDENTIALS_DEDUP = True
+    creds = Credentials.objects.intern(**CREDS)
+    # e.g. another web process moved the last owner off the row
+    Credentials.objects.filter(pk=creds.pk).delete()
+
+    again = Credentials.objects.intern(**CREDS)
+    assert again.pk != creds.pk
+    Workload.objects.create(ip="192.0.2.1", credentials=again)
+
+
+@pytest.mark.django_db
+def test_intern_picks_up_a_concurrent_insert(settings, monkeypatch):
+    settings.CREDENTIALS_DEDUP = True
+    lookup = CredentialsQuerySet._interned_pks
+
+    def racing(self, fingerprints):
+        found = lookup(self, fingerprints)
+        # Another request inserts the row between lookup and insert.
+        monkeypatch.setattr(CredentialsQuerySet, "_interned_pks", lookup)
+        racing.winner = Credentials.objects.intern(**CREDS)
+        return found
+
+    monkeypatch.setattr(CredentialsQuerySet, "_interned_pks", racing)
+    creds = Credentials.objects.intern(**CREDS)
+    assert creds.pk == racing.winner.pk
+    assert Credentials.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_update_of_shared_credentials_is_copy_on_write(client, settings):
+    settings.CREDENTIALS_DEDUP = True
+    creds = Credentials.objects.intern(**CREDS)
+    workload = Workload.objects.create(ip="192.0.2.1", credentials=creds)
+    target = MigrationTarget.objects.create(
+        cloud_type="aws", cloud_credentials=creds, target_vm=workload
+    )
+
+    resp = client.patch(
+        reverse("migrationtarget-detail", args=[target.pk]),
+        {"cloud_credentials": {**CREDS, "password": "rotated"}},
+        format="json",
+    )
+    assert resp.status_code == 200
+    target.refresh_from_db()
+    workload.refresh_from_db()
+    assert target.cloud_credentials_id != creds.pk
+    assert target.cloud_credentials.password == "rotated"
+    assert workload.credentials.password == "p"
+
+    # Moving the last owner off a row deletes it.
+    resp = client.patch(
+        reverse("workload-detail", args=[workload.pk]),
+        {"credentials": {**CREDS, "password": "rotated"}},
+        format="json",
+    )
+    assert resp.status_code == 200
+    assert list(Credentials.objects.values_list("password", flat=True)) == ["rotated"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_migration_compacts_duplicates():
+    executor = MigrationExecutor(connection)
+    executor.migrate([("core", "0009_credentials_fingerprint")])
+    apps = executor.loader.project_state(
+        [("core", "0009_credentials_fingerprint")]
+    ).apps
+    OldCredentials = apps.get_model("core", "Credentials")
+    OldWorkload = apps.get_model("core", "Workload")
+    first, second = (OldCredentials.objects.create(**CREDS) for _ in range(2))
+    other = OldCredentials.objects.create(**{**CREDS, "username": "other"})
+    for i, creds in enumerate([first, second, other]):
+        OldWorkload.objects.create(ip=f"192.0.2.{i + 1}", credentials=creds)
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+    assert set(Credentials.objects.values_list("pk", flat=True)) == {
+        first.pk,
+        other.pk,
+    }
+    assert Workload.objects.filter(credentials_id=first.pk).count() == 2
+    assert all(c.fingerprint and c.interned for c in Credentials.objects.all())
+    assert Credentials.objects.get(pk=first.pk).fingerprint == credentials_fingerprint(
+        CREDS["username"], CREDS["password"], CREDS["domain"]
+    )
@@ -0,0 +1,297 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from core.models import Migration, MountPoint
+from core.tasks import (
+    dispatch_migration,
+    expire_stale_runs,
+    route_migration,
+    run_migration,
+    schedule_migrations,
+)
+from core.transfer import LocalTransport, TransferEngine
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from workload_migrator.celery import close_old_connections
+
+
+class SlowTransport(LocalTransport):
+    def send(self, chunk):
+        time.sleep(0.01)
+        super().send(chunk)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_runs_execute_exactly_once(make_migration):
+    mig = make_migration(names=("D:\\", "E:\\", "F:\\"))
+    transport = SlowTransport()
+    workers = 8
+    barrier = threading.Barrier(workers)
+    results = []
+
+    def worker():
+        try:
+            instance = Migration.objects.get(pk=mig.pk)
+            barrier.wait()
+            engine = TransferEngine(transport, max_workers=1)
+            results.append(instance.run(simulated_minutes=0, engine=engine))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [False] * (workers - 1) + [True]
+    assert len(transport.sent) == 3
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.SUCCESS
+
+
+@pytest.mark.django_db
+def test_run_with_idempotency_key_is_replayed(make_migration):
+    mig = make_migration()
+    client = APIClient()
+    url = reverse("migration-run", args=[mig.pk])
+
+    first = client.post(url, HTTP_IDEMPOTENCY_KEY="abc")
+    second = client.post(url, HTTP_IDEMPOTENCY_KEY="abc")
+
+    assert first.status_code == second.status_code == 202
+    assert second.data["task_id"] == first.data["task_id"]
+    assert second["Idempotent-Replayed"] == "true"
+
+    third = client.post(url, HTTP_IDEMPOTENCY_KEY="def")
+    assert third.data["task_id"] != first.data["task_id"]
+
+
+@pytest.mark.django_db
+def test_run_while_running_is_rejected_cheaply(
+    make_migration, django_assert_num_queries
+):
+    mig = make_migration()
+    Migration.objects.filter(pk=mig.pk).update(
+        state=Migration.State.RUNNING,
+        task_id="owner",
+        progress_updated_at=timezone.now(),
+    )
+
+    with django_assert_num_queries(1):
+        resp = APIClient().post(reverse("migration-run", args=[mig.pk]))
+
+    assert resp.status_code == 409
+    assert resp.data["task_id"] == "owner"
+
+
+@pytest.mark.django_db
+def test_duplicate_task_delivery_is_a_no_op(make_migration):
+    mig = make_migration()
+    Migration.objects.filter(pk=mig.pk).update(
+        state=Migration.State.RUNNING, task_id="owner"
+    )
+
+    result = run_migration.apply((mig.pk,), {"claimed": True}, task_id="intruder")
+
+    assert result.get() is False
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.RUNNING
+
+
+@pytest.mark.django_db
+def test_redelivered_task_reclaims_only_a_dead_run(make_migration):
+    mig = make_migration()
+    target_vm = mig.migration_target.target_vm
+    Migration.objects.filter(pk=mig.pk).update(
+        state=Migration.State.RUNNING,
+        task_id="owner",
+        started_at=timezone.now(),
+        progress_updated_at=timezone.now(),
+    )
+
+    # The broker's visibility timeout expired while the run is still alive.
+    result = run_migration.apply(
+        (mig.pk,), {"claimed": True, "simulated_minutes": 0}, task_id="owner"
+    )
+    assert result.get() is False
+    assert not target_vm.mountpoints.exists()
+
+    # The worker died: its heartbeat is stale, so the redelivery resumes it.
+    Migration.objects.filter(pk=mig.pk).update(
+        progress_updated_at=timezone.now() - timedelta(hours=1)
+    )
+    result = run_migration.apply(
+        (mig.pk,), {"claimed": True, "simulated_minutes": 0}, task_id="owner"
+    )
+    assert result.get() is True
+    assert target_vm.mountpoints.count() == 1
+
+
+@pytest.mark.django_db
+def test_run_that_lost_its_claim_leaves_target_alone(make_migration, monkeypatch):
+    mig = make_migration()
+    transfer = TransferEngine.transfer
+
+    def taken_over(self, *args, **kwargs):
+        Migration.objects.filter(pk=mig.pk).update(task_id="successor")
+        return transfer(self, *args, **kwargs)
+
+    monkeypatch.setattr(TransferEngine, "transfer", taken_over)
+
+    assert mig.run(simulated_minutes=0, task_id="owner") is False
+    assert not mig.migration_target.target_vm.mountpoints.exists()
+    mig.refresh_from_db()
+    assert (mig.state, mig.task_id) == (Migration.State.RUNNING, "successor")
+
+
+@pytest.mark.django_db
+def test_windowed_run_hands_over_between_windows(make_migration, monkeypatch, settings):
+    settings.MIGRATION_TRANSFER_WINDOW = 1e-6
+    settings.MIGRATION_TRANSFER_WORKERS = 1
+    mig = make_migration(names=("D:\\", "E:\\", "F:\\"))
+    sent, owners = [], []
+    monkeypatch.setattr(LocalTransport, "send", lambda self, chunk: sent.append(chunk))
+    resume = Migration.resume
+
+    def spy(self, task_id, *args, **kwargs):
+        owners.append(task_id)
+        return resume(self, task_id, *args, **kwargs)
+
+    monkeypatch.setattr(Migration, "resume", spy)
+
+    result = run_migration.apply((mig.pk,), {"simulated_minutes": 0}, task_id="first")
+
+    # One chunk per window: the first task starts the run and two
+    # continuations, each under a fresh task id, finish it.
+    assert result.get() is None
+    assert len(sent) == 3
+    assert len(set(owners)) == 2 and "first" not in owners
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.SUCCESS
+    assert mig.task_id == owners[-1]
+    assert mig.migration_target.target_vm.mountpoints.count() == 3
+
+
+@pytest.mark.django_db
+def test_expired_windowed_run_is_not_resumed(make_migration):
+    mig = make_migration(names=("D:\\", "E:\\", "F:\\"))
+    engine = TransferEngine(LocalTransport(), max_workers=1)
+    assert (
+        mig.run(simulated_minutes=0, task_id="t1", engine=engine, window=1e-6) is None
+    )
+
+    # The continuation waited in its queue past the heartbeat timeout.
+    Migration.objects.filter(pk=mig.pk).update(
+        progress_updated_at=timezone.now() - timedelta(hours=1)
+    )
+    assert expire_stale_runs() == 1
+    mig.refresh_from_db()
+    assert (mig.state, mig.task_id) == (Migration.State.ERROR, "")
+
+    for retry in (False, True):
+        assert (
+            mig.resume("t1", simulated_minutes=0, engine=engine, retry=retry) is False
+        )
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.ERROR
+    assert not mig.migration_target.target_vm.mountpoints.exists()
+
+
+@pytest.mark.django_db
+def test_only_a_retry_resumes_its_own_failed_window(make_migration):
+    mig = make_migration(names=("D:\\", "E:\\"))
+    engine = TransferEngine(LocalTransport(), max_workers=1)
+    assert (
+        mig.run(simulated_minutes=0, task_id="t1", engine=engine, window=1e-6) is None
+    )
+    failing = TransferEngine(LocalTransport(fail_on=lambda c: True), max_workers=1)
+    with pytest.raises(IOError):
+        mig.resume("t1", simulated_minutes=0, engine=failing)
+    mig.refresh_from_db()
+    assert (mig.state, mig.task_id) == (Migration.State.ERROR, "t1")
+
+    assert mig.resume("t1", simulated_minutes=0, engine=engine) is False
+    assert mig.resume("t1", simulated_minutes=0, engine=engine, retry=True) is True
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.SUCCESS
+
+
+@pytest.mark.django_db
+def test_failed_publish_releases_the_claim(make_migration, monkeypatch):
+    mig = make_migration()
+
+    def broker_down(*args, **kwargs):
+        raise ConnectionError("broker unreachable")
+
+    monkeypatch.setattr(run_migration, "apply_async", broker_down)
+    with pytest.raises(ConnectionError):
+        dispatch_migration(mig.pk, simulated_minutes=0)
+    mig.refresh_from_db()
+    assert (mig.state, mig.task_id) == (Migration.State.NOT_STARTED, "")
+
+    # A claim whose task never reported back is recoverable once stale.
+    monkeypatch.undo()
+    Migration.objects.filter(pk=mig.pk).update(
+        state=Migration.State.RUNNING,
+        task_id="lost",
+        progress_updated_at=timezone.now() - timedelta(hours=1),
+    )
+    resp = APIClient().post(reverse("migration-run", args=[mig.pk]))
+    assert resp.status_code == 202
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.SUCCESS and mig.task_id != "lost"
+
+
+@pytest.mark.django_db
+def test_scheduler_tick_expires_dead_runs_only(make_migration):
+    dead, waiting, alive = (make_migration() for _ in range(3))
+    long_ago = timezone.now() - timedelta(hours=1)
+    for mig, started_at, heartbeat in [
+        (dead, long_ago, long_ago),
+        (waiting, None, long_ago),
+        (alive, long_ago, timezone.now()),
+    ]:
+        Migration.objects.filter(pk=mig.pk).update(
+            state=Migration.State.RUNNING,
+            started_at=started_at,
+            progress_updated_at=heartbeat,
+        )
+
+    schedule_migrations(simulated_minutes=0)
+
+    states = dict(Migration.objects.values_list("pk", "state"))
+    assert states == {
+        dead.pk: Migration.State.ERROR,
+        waiting.pk: Migration.State.RUNNING,
+        alive.pk: Migration.State.RUNNING,
+    }
+
+
+@pytest.mark.django_db
+def test_task_connection_cleanup_leaves_open_transaction_alone():
+    connection.ensure_connection()
+    raw = connection.connection
+    close_old_connections()
+    assert connection.connection is raw
+
+
+@pytest.mark.django_db
+def test_migrations_are_routed_by_selected_size(make_migration, settings):
+    settings.MIGRATION_QUEUES = [("small", 10), ("large", None)]
+    small = make_migration(names=("D:\\", "E:\\"))
+    large = make_migration()
+    MountPoint.objects.filter(workload=large.source).update(total_size=11)
+
+    assert route_migration("core.tasks.run_migration", (small.pk,), {}, {}) == {
+        "queue": "small"
+    }
+    assert route_migration("core.tasks.run_migration", (large.pk,), {}, {}) == {
+        "queue": "large"
+    }
+    assert route_migration("core.tasks.advance_batch", (1,), {}, {}) is None
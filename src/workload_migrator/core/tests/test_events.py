@@ -0,0 +1,78 @@
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from core.events import InMemoryBroker, migration_channel
+from core.models import Migration
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+
+def _parse(part):
+    text = part.decode() if isinstance(part, bytes) else part
+    assert text.startswith("data: ")
+    return json.loads(text[len("data: ") :])
+
+
+@pytest.mark.django_db
+def test_detail_stream_pushes_changes_until_terminal(make_migration):
+    mig = make_migration()
+
+    async def consume():
+        response = await AsyncClient().get(
+            reverse("migration-events-detail", args=[mig.pk])
+        )
+        assert response["Content-Type"] == "text/event-stream"
+        events = []
+        async for part in response.streaming_content:
+            events.append(_parse(part))
+            if len(events) == 1:
+                await sync_to_async(mig.run)(simulated_minutes=0)
+        return events
+
+    events = async_to_sync(consume)()
+
+    states = [event["state"] for event in events]
+    assert states[0] == Migration.State.NOT_STARTED
+    assert states[-1] == Migration.State.SUCCESS
+    assert Migration.State.RUNNING in states
+    assert events[-1]["bytes_transferred"] == events[-1]["bytes_total"]
+
+
+@pytest.mark.django_db
+def test_detail_stream_404_for_unknown_migration():
+    async def fetch():
+        return await AsyncClient().get(
+            reverse("migration-events-detail", args=[999999])
+        )
+
+    assert async_to_sync(fetch)().status_code == 404
+
+
+@pytest.mark.django_db
+def test_stream_is_refused_under_wsgi(make_migration):
+    mig = make_migration()
+    for url in (
+        reverse("migration-events"),
+        reverse("migration-events-detail", args=[mig.pk]),
+    ):
+        assert Client().get(url).status_code == 501
+
+
+def test_in_memory_broker_delivers_across_threads():
+    broker = InMemoryBroker()
+    channel = migration_channel(1)
+
+    async def receive():
+        async with broker.subscribe(channel) as subscription:
+            thread = threading.Thread(
+                target=broker.publish, args=(channel, {"state": "running"})
+            )
+            thread.start()
+            message = await subscription.get(timeout=5)
+            thread.join()
+            assert await subscription.get(timeout=0.01) is None
+            return message
+
+    assert async_to_sync(receive)() == {"state": "running"}
@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+
+import pytest
+from core.models import Credentials, Migration, MigrationTarget, MountPoint, Workload
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def seeded():
+    c = Credentials.objects.create(username="u", password="p", domain="d")
+    src = Workload.objects.create(ip="192.0.2.60", credentials=c)
+    dst = Workload.objects.create(ip="192.0.2.61", credentials=c)
+    mp = MountPoint.objects.create(workload=src, mount_point_name="D:\\", total_size=7)
+    tgt = MigrationTarget.objects.create(
+        cloud_type="aws", cloud_credentials=c, target_vm=dst
+    )
+    mig = Migration.objects.create(source=src, migration_target=tgt)
+    mig.selected_mountpoints.set([mp])
+    return src, mig
+
+
+def _body(resp):
+    return b"".join(resp.streaming_content).decode()
+
+
+@pytest.mark.django_db
+def test_workload_export_ndjson(client, seeded):
+    src, _ = seeded
+    resp = client.get(reverse("workload-export"))
+
+    assert resp.status_code == 200
+    assert resp["Content-Type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in _body(resp).splitlines()]
+    assert [row["ip"] for row in rows] == ["192.0.2.60", "192.0.2.61"]
+    assert rows[0]["mountpoints"][0]["total_size"] == 7
+    assert rows[0]["credentials"]["username"] == "u"
+
+
+@pytest.mark.django_db
+def test_migration_export_csv(client, seeded):
+    _, mig = seeded
+    resp = client.get(reverse("migration-export"), {"fmt": "csv"})
+
+    assert resp.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(_body(resp))))
+    assert len(rows) == 1
+    assert rows[0]["id"] == str(mig.id)
+    assert rows[0]["state"] == "not_started"
+
+
+@pytest.mark.django_db
+def test_export_rejects_unknown_format(client):
+    resp = client.get(reverse("workload-export"), {"fmt": "xml"})
+    assert resp.status_code == 400
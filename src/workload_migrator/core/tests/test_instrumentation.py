@@ -0,0 +1,114 @@
+import os
+import re
+import socket
+import subprocess
+import sys
+import textwrap
+from urllib.request import urlopen
+
+import pytest
+from core.instrumentation import registry
+from core.tasks import run_migration
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+def _metric(text, name, **labels):
+    wanted = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    match = re.search(rf"^{name}\{{{wanted}\}} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+@pytest.mark.django_db
+def test_server_timing_reports_queries_and_serialization(client, make_migration):
+    mig = make_migration()
+
+    resp = client.get(reverse("migration-detail", args=[mig.pk]))
+
+    timing = resp["Server-Timing"]
+    assert re.search(r'db;dur=[\d.]+;desc="2 queries"', timing)
+    assert re.search(r"serialize;dur=[\d.]+", timing)
+    assert timing.startswith("total;dur=")
+
+
+@pytest.mark.django_db
+def test_metrics_count_requests_and_tasks(client, make_migration):
+    mig = make_migration()
+    view = {"view": "migration-list", "method": "GET"}
+    before = registry.exposition()
+
+    client.get(reverse("migration-list"))
+    run_migration.apply((mig.pk,), {"simulated_minutes": 0})
+
+    after = client.get(reverse("metrics")).content.decode()
+    assert _metric(after, "workload_migrator_http_total", **view, status=200) == (
+        _metric(before, "workload_migrator_http_total", **view, status=200) + 1
+    )
+    task = {"task": "core.tasks.run_migration"}
+    assert _metric(after, "workload_migrator_task_total", **task, state="SUCCESS") > 0
+    assert _metric(after, "workload_migrator_task_db_queries_total", **task) > 0
+    assert (
+        'workload_migrator_http_duration_seconds_bucket{view="migration-list"' in after
+    )
+
+
+WORKER = textwrap.dedent("""
+    import sys
+
+    import django
+
+    django.setup()
+    from celery.signals import worker_process_init
+    from workload_migrator.celery import app
+
+    worker_process_init.send(sender=None)
+    app.tasks["celery.accumulate"].apply((1, 2))
+    print("ready", flush=True)
+    sys.stdin.read()
+    """)
+
+
+def test_worker_process_serves_its_task_metrics():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(sys.path),
+        "WORKER_METRICS_PORT": str(port),
+    }
+    worker = subprocess.Popen(
+        [sys.executable, "-c", WORKER],
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # Settings may print a banner first.
+        assert "ready\n" in iter(worker.stdout.readline, "")
+        with urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+            text = resp.read().decode()
+    finally:
+        worker.communicate("", timeout=10)
+
+    task = {"task": "celery.accumulate"}
+    assert _metric(text, "workload_migrator_task_total", **task, state="SUCCESS") == 1
+    assert "celery.accumulate" not in registry.exposition()
+
+
+@pytest.mark.django_db
+def test_slow_sampled_requests_are_profiled(client, settings, tmp_path):
+    settings.PROFILE_SAMPLE_RATE = 1
+    settings.PROFILE_THRESHOLD_MS = 0
+    settings.PROFILE_DIR = str(tmp_path)
+
+    client.get(reverse("workload-list"))
+
+    [dump] = tmp_path.iterdir()
+    assert dump.name.endswith("-GET-api-workloads.prof")
@@ -2,7 +2,11 @@ import time
 
 import pytest
 from core.models import Credentials, Migration, MigrationTarget, MountPoint, Workload
+from core.transfer import GB, LocalTransport, TransferEngine
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test.utils import CaptureQueriesContext
 
 
 @pytest.mark.django_db
@@ -45,6 +49,36 @@ class TestWorkloadModel:
         with pytest.raises(ValueError):
             w.save()
 
+    def test_save_of_loaded_instance_needs_no_extra_query(
+        self, django_assert_num_queries
+    ):
+        c = Credentials.objects.create(username="u", password="p", domain="d")
+        Workload.objects.create(ip="192.0.2.30", credentials=c)
+        w = Workload.objects.get(ip="192.0.2.30")
+
+        with django_assert_num_queries(1):
+            w.save()
+
+        w.ip = "192.0.2.31"
+        with pytest.raises(ValueError):
+            w.save()
+
+    def test_ip_immutable_for_unloaded_instance(self):
+        c = Credentials.objects.create(username="u", password="p", domain="d")
+        w = Workload.objects.create(ip="192.0.2.32", credentials=c)
+        with pytest.raises(ValueError):
+            Workload(pk=w.pk, ip="192.0.2.33", credentials=c).save()
+
+    def test_ip_immutable_for_set_based_writes(self):
+        c = Credentials.objects.create(username="u", password="p", domain="d")
+        w = Workload.objects.create(ip="192.0.2.34", credentials=c)
+        with pytest.raises(ValueError):
+            Workload.objects.filter(pk=w.pk).update(ip="192.0.2.35")
+        w.ip = "192.0.2.35"
+        with pytest.raises(ValueError):
+            Workload.objects.bulk_update([w], ["ip"])
+        assert Workload.objects.get(pk=w.pk).ip == "192.0.2.34"
+
     def test_mountpoint_relation(self):
         c = Credentials.objects.create(username="u", password="p", domain="d")
         w = Workload.objects.create(ip="192.0.2.4", credentials=c)
@@ -54,6 +88,21 @@ class TestWorkloadModel:
         assert w.mountpoints.count() == 1
         assert w.mountpoints.first() == m
 
+    def test_mountpoint_name_unique_per_workload(self):
+        c = Credentials.objects.create(username="u", password="p", domain="d")
+        w = Workload.objects.create(ip="192.0.2.5", credentials=c)
+        MountPoint.objects.create(workload=w, mount_point_name="D:\\", total_size=1)
+        with pytest.raises(IntegrityError):
+            MountPoint.objects.create(workload=w, mount_point_name="D:\\", total_size=1)
+
+    def test_iexact_lookup_can_use_upper_index(self):
+        query = MountPoint.objects.filter(mount_point_name__iexact="c:\\")
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Tiny test tables would otherwise always be scanned sequentially.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = query.explain()
+        assert "mountpoint_name_upper_idx" in plan
+
 
 @pytest.mark.django_db
 class TestMigrationTargetModel:
@@ -123,3 +172,115 @@ class TestMigrationModel:
         assert len(mps) == 1
         assert mps[0].mount_point_name == "Y:\\"
         assert mig.state == Migration.State.SUCCESS
+
+    def test_run_copy_query_count_is_constant(self):
+        c = Credentials.objects.create(username="u", password="p", domain="d")
+
+        def run_with(count, ip_suffix):
+            src = Workload.objects.create(ip=f"192.0.2.{ip_suffix}", credentials=c)
+            tgt_vm = Workload.objects.create(
+                ip=f"192.0.2.{ip_suffix + 1}", credentials=c
+            )
+            MountPoint.objects.create(
+                workload=tgt_vm, mount_point_name="Z:\\", total_size=1
+            )
+            mps = [
+                MountPoint.objects.create(
+                    workload=src, mount_point_name=f"M{i}", total_size=1
+                )
+                for i in range(count)
+            ]
+            tgt = MigrationTarget.objects.create(
+                cloud_type="aws", cloud_credentials=c, target_vm=tgt_vm
+            )
+            mig = Migration.objects.create(source=src, migration_target=tgt)
+            mig.selected_mountpoints.set(mps)
+            with CaptureQueriesContext(connection) as ctx:
+                mig.run(simulated_minutes=0)
+            assert tgt_vm.mountpoints.count() == count
+            return len(ctx.captured_queries)
+
+        assert run_with(2, 100) == run_with(40, 110)
+
+    def test_incremental_run_applies_only_changes(self, make_migration):
+        mig = make_migration(names=("D:\\", "E:\\", "F:\\"))
+        mig.run(simulated_minutes=0)
+        target_vm = mig.migration_target.target_vm
+        kept = target_vm.mountpoints.get(mount_point_name="D:\\").pk
+
+        source = mig.source.mountpoints
+        source.filter(mount_point_name="E:\\").update(total_size=3)
+        mig.selected_mountpoints.remove(source.get(mount_point_name="F:\\"))
+        mig.selected_mountpoints.add(
+            MountPoint.objects.create(
+                workload=mig.source, mount_point_name="G:\\", total_size=2
+            )
+        )
+        transport = LocalTransport()
+        mig.run(simulated_minutes=0, engine=TransferEngine(transport), incremental=True)
+
+        mig.refresh_from_db()
+        assert mig.state == Migration.State.SUCCESS
+        assert mig.bytes_transferred == mig.bytes_total == 5 * GB
+        assert {c.mount_point_name for c in transport.sent} == {"E:\\", "G:\\"}
+        assert dict(
+            target_vm.mountpoints.values_list("mount_point_name", "total_size")
+        ) == {"D:\\": 1, "E:\\": 3, "G:\\": 2}
+        assert target_vm.mountpoints.get(mount_point_name="D:\\").pk == kept
+
+        # A re-sync with nothing to change transfers nothing and writes no
+        # mount points.
+        transport = LocalTransport()
+        with CaptureQueriesContext(connection) as ctx:
+            mig.run(
+                simulated_minutes=0, engine=TransferEngine(transport), incremental=True
+            )
+        assert transport.sent == []
+        assert not [
+            q
+            for q in ctx.captured_queries
+            if 'core_mountpoint"' in q["sql"] and not q["sql"].startswith("SELECT")
+        ]
+        assert mig.bytes_total == 0 and mig.state == Migration.State.SUCCESS
+
+
+@pytest.mark.django_db(transaction=True)
+def test_migration_merges_duplicate_mountpoints():
+    executor = MigrationExecutor(connection)
+    executor.migrate([("core", "0006_migration_claim")])
+    apps = executor.loader.project_state([("core", "0006_migration_claim")]).apps
+    OldMountPoint = apps.get_model("core", "MountPoint")
+    OldMigration = apps.get_model("core", "Migration")
+    creds = apps.get_model("core", "Credentials").objects.create(
+        username="u", password="p", domain="d"
+    )
+    OldWorkload = apps.get_model("core", "Workload")
+    source = OldWorkload.objects.create(ip="192.0.2.1", credentials=creds)
+    target = apps.get_model("core", "MigrationTarget").objects.create(
+        cloud_type="aws",
+        cloud_credentials=creds,
+        target_vm=OldWorkload.objects.create(ip="192.0.2.2", credentials=creds),
+    )
+    first, second = (
+        OldMountPoint.objects.create(
+            workload=source, mount_point_name="D:\\", total_size=size
+        )
+        for size in (1, 2)
+    )
+    both = OldMigration.objects.create(source=source, migration_target=target)
+    both.selected_mountpoints.set([first, second])
+    duplicate = OldMigration.objects.create(source=source, migration_target=target)
+    duplicate.selected_mountpoints.set([second])
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+    assert list(MountPoint.objects.values_list("pk", flat=True)) == [first.pk]
+    for migration in Migration.objects.all():
+        assert list(migration.selected_mountpoints.values_list("pk", flat=True)) == [
+            first.pk
+        ]
+    with pytest.raises(IntegrityError), transaction.atomic():
+        MountPoint.objects.create(
+            workload_id=source.pk, mount_point_name="D:\\", total_size=1
+        )
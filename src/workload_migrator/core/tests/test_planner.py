@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+import pytest
+from core.models import Migration, MountPoint
+from core.planner import plan_migrations
+from core.transfer import GB
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.mark.django_db
+def test_plan_totals_and_conflicts(client, make_migration):
+    first = make_migration(names=("D:\\", "E:\\"))
+    second = make_migration(names=("C:\\",), cloud_type="azure")
+    # A second migration onto the same target VM as `first`.
+    shared = make_migration()
+    shared.migration_target = first.migration_target
+    shared.save()
+
+    resp = client.post(
+        reverse("migration-plan"),
+        {"ids": [first.pk, second.pk, shared.pk]},
+        format="json",
+    )
+    assert resp.status_code == 200
+    plan = resp.json()
+    assert plan["migrations"] == 3
+    assert plan["total_gb"] == 4
+    assert {c["cloud_type"]: c["total_gb"] for c in plan["clouds"]} == {
+        "aws": 3,
+        "azure": 1,
+    }
+    target_vm = first.migration_target.target_vm_id
+    assert {t["target_vm"]: t["total_gb"] for t in plan["targets"]} == {
+        target_vm: 3,
+        second.migration_target.target_vm_id: 1,
+    }
+    assert plan["conflicts"]["shared_target_vm"] == [
+        {"target_vm": target_vm, "migrations": [first.pk, shared.pk]}
+    ]
+    assert plan["conflicts"]["c_root"] == [second.pk]
+    assert plan["throughput"]["aws"]["source"] == "default"
+
+
+@pytest.mark.django_db
+def test_plan_selects_by_workload_and_rejects_missing_ids(client, make_migration):
+    mig = make_migration()
+    make_migration()
+    resp = client.post(
+        reverse("migration-plan"), {"workloads": [mig.source_id]}, format="json"
+    )
+    assert resp.json()["migrations"] == 1
+
+    resp = client.post(
+        reverse("migration-plan"), {"ids": [mig.pk, 999999]}, format="json"
+    )
+    assert resp.status_code == 400
+    resp = client.post(
+        reverse("migration-plan"),
+        {"ids": [mig.pk], "workloads": [mig.source_id]},
+        format="json",
+    )
+    assert resp.status_code == 400
+
+
+@pytest.mark.django_db
+def test_duration_uses_historical_throughput(make_migration):
+    done = make_migration()
+    now = timezone.now()
+    Migration.objects.filter(pk=done.pk).update(
+        state=Migration.State.SUCCESS,
+        bytes_total=10 * GB,
+        started_at=now - timedelta(seconds=100),
+        finished_at=now,
+    )
+    pending = make_migration()
+    MountPoint.objects.filter(workload=pending.source).update(total_size=5)
+
+    plan = plan_migrations(Migration.objects.filter(pk=pending.pk))
+    assert plan["throughput"]["aws"]["source"] == "cloud_history"
+    assert plan["throughput"]["aws"]["bytes_per_second"] == pytest.approx(GB / 10)
+    assert plan["estimated_seconds"] == pytest.approx(50)
+
+
+@pytest.mark.django_db
+def test_plan_query_count_is_constant(make_migration, assert_constant_queries):
+    make_migration(names=("C:\\",))
+    make_migration()
+
+    def grow():
+        for _ in range(3):
+            make_migration(names=("C:\\", "D:\\"))
+
+    assert_constant_queries(lambda: plan_migrations(Migration.objects.all()), grow=grow)
@@ -0,0 +1,55 @@
+import pytest
+from core.models import Migration
+from core.progress import ProgressTracker
+from core.transfer import GB, Chunk
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.django_db
+def test_tracker_flushes_at_most_once_per_interval(make_migration):
+    mig = make_migration()
+    clock = FakeClock()
+    tracker = ProgressTracker(mig, interval=5, clock=clock)
+    chunk = Chunk(1, "D:\\", 0, 0, GB)
+
+    for _ in range(10):
+        clock.now += 1
+        tracker.update(chunk)
+
+    assert tracker.flushes == 2
+    mig.refresh_from_db()
+    assert mig.bytes_transferred == 10 * GB
+    assert mig.transfer_rate == pytest.approx(GB)
+
+
+@pytest.mark.django_db
+def test_run_records_progress_and_api_exposes_it(make_migration):
+    mig = make_migration(names=("D:\\", "E:\\"))
+
+    mig.run(simulated_minutes=0)
+
+    resp = APIClient().get(reverse("migration-detail", args=[mig.id]))
+    assert resp.data["bytes_total"] == 2 * GB
+    assert resp.data["bytes_transferred"] == 2 * GB
+    assert resp.data["started_at"] is not None
+    assert resp.data["finished_at"] is not None
+    assert resp.data["eta_seconds"] is None
+
+
+def test_eta_from_rate():
+    mig = Migration(
+        state=Migration.State.RUNNING,
+        bytes_total=100,
+        bytes_transferred=40,
+        transfer_rate=20,
+    )
+    assert mig.eta_seconds == 3.0
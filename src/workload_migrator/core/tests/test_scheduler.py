@@ -0,0 +1,108 @@
+import pytest
+from core.models import Migration
+from core.scheduler import Job, Limits, MigrationScheduler
+from core.tasks import schedule_migrations
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+class TestMigrationScheduler:
+    def test_per_target_limit(self):
+        s = MigrationScheduler(Limits(per_target=1))
+        a1, a2 = Job(1, target_id=10, cloud_type="aws"), Job(2, 10, "aws")
+        b1 = Job(3, target_id=20, cloud_type="aws")
+        for job in (a1, a2, b1):
+            s.submit(job)
+
+        admitted = s.admit_all()
+        assert {j.migration_id for j in admitted} == {1, 3}
+
+        s.finish(a1)
+        assert s.admit() == a2
+        assert s.queued == 0
+
+    def test_per_cloud_limit_parks_and_releases(self):
+        s = MigrationScheduler(Limits(per_target=None, per_cloud=1))
+        aws1, aws2 = Job(1, 10, "aws"), Job(2, 11, "aws")
+        azure = Job(3, 12, "azure")
+        for job in (aws1, aws2, azure):
+            s.submit(job)
+
+        assert {j.migration_id for j in s.admit_all()} == {1, 3}
+        assert s.admit() is None
+
+        s.finish(aws1)
+        assert s.admit() == aws2
+
+    def test_gb_budget_blocks_until_capacity_frees(self):
+        s = MigrationScheduler(Limits(per_target=None, max_gb_in_flight=100), "size")
+        small = Job(1, 10, "aws", size_gb=60)
+        large = Job(2, 11, "aws", size_gb=500)
+        s.submit(large)
+        s.submit(small)
+
+        assert s.admit() == small
+        assert s.admit() is None  # large does not fit alongside small
+
+        s.finish(small)
+        assert s.admit() == large  # admitted alone even though over budget
+
+    def test_priority_order(self):
+        s = MigrationScheduler(Limits(per_target=None))
+        s.submit(Job(1, 10, "aws", size_gb=5, priority=0))
+        s.submit(Job(2, 11, "aws", size_gb=50, priority=9))
+        s.submit(Job(3, 12, "aws", size_gb=1, priority=0))
+
+        assert [j.migration_id for j in s.admit_all()] == [2, 3, 1]
+
+    def test_already_running_jobs_count_against_limits(self):
+        s = MigrationScheduler(Limits(per_target=1))
+        s.start(Job(1, 10, "aws"))
+        s.submit(Job(2, 10, "aws"))
+
+        assert s.admit() is None
+
+
+@pytest.mark.django_db
+def test_enqueue_and_schedule_respects_per_target(make_migration, settings):
+    settings.MIGRATION_SCHEDULER = {"PER_TARGET": 1, "ORDER": "priority"}
+    first = make_migration()
+    second = make_migration()
+    # Point both migrations at the same target VM.
+    second.migration_target = first.migration_target
+    second.save()
+    Migration.objects.filter(pk__in=[first.pk, second.pk]).update(
+        state=Migration.State.QUEUED
+    )
+    Migration.objects.filter(pk=second.pk).update(priority=5)
+
+    # The eager run finishes synchronously, but only one job per target is
+    # admitted per tick.
+    assert schedule_migrations(simulated_minutes=0) == [second.pk]
+    assert schedule_migrations(simulated_minutes=0) == [first.pk]
+
+    first.refresh_from_db()
+    assert first.state == Migration.State.SUCCESS
+
+
+@pytest.mark.django_db
+def test_enqueue_endpoint_rejects_c_root(make_migration):
+    mig = make_migration(names=("C:\\",))
+    resp = APIClient().post(reverse("migration-enqueue", args=[mig.id]))
+
+    assert resp.status_code == 400
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.NOT_STARTED
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("body", [[5], {"priority": "high"}])
+def test_enqueue_endpoint_rejects_bad_body(make_migration, body):
+    mig = make_migration()
+    resp = APIClient().post(
+        reverse("migration-enqueue", args=[mig.id]), body, format="json"
+    )
+
+    assert resp.status_code == 400
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.NOT_STARTED
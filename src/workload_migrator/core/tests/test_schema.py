@@ -0,0 +1,60 @@
+import json
+
+import pytest
+from core import schema
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def static_schema(settings, tmp_path):
+    settings.API_SCHEMA_MODE = "static"
+    settings.API_SCHEMA_DIR = str(tmp_path)
+    schema._generated.clear()
+    schema._manifests.clear()
+    yield tmp_path
+    schema._generated.clear()
+    schema._manifests.clear()
+
+
+def test_build_schema_writes_versioned_artifacts(static_schema):
+    call_command("build_schema")
+    manifest = json.loads((static_schema / "manifest.json").read_text())
+    entry = manifest["formats"]["json"]
+    assert entry["file"].startswith(f"openapi-{manifest['version']}-")
+    document = json.loads((static_schema / entry["file"]).read_bytes())
+    assert "/api/migrations/plan/" in document["paths"]
+
+    client = APIClient()
+    resp = client.get(reverse("schema"), {"format": "json"})
+    assert resp.status_code == 200
+    assert resp.streaming
+    assert resp["ETag"] == entry["etag"]
+    assert (
+        b"".join(resp.streaming_content) == (static_schema / entry["file"]).read_bytes()
+    )
+
+    resp = client.get(reverse("schema"), HTTP_IF_NONE_MATCH=entry["etag"])
+    assert resp.status_code == 200  # yaml has its own etag
+    resp = client.get(
+        reverse("schema"),
+        {"format": "json"},
+        HTTP_IF_NONE_MATCH=entry["etag"],
+    )
+    assert resp.status_code == 304
+
+
+def test_static_mode_without_artifacts_generates_once(static_schema, monkeypatch):
+    client = APIClient()
+    first = client.get(reverse("schema"))
+    assert first.status_code == 200
+    assert first["Content-Type"].startswith("application/vnd.oai.openapi")
+
+    def fail():
+        raise AssertionError("schema generated twice")
+
+    monkeypatch.setattr(schema, "generate", fail)
+    second = client.get(reverse("schema"))
+    assert second.content == first.content
+    assert second["ETag"] == first["ETag"]
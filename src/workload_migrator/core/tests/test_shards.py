@@ -0,0 +1,144 @@
+import pytest
+from core import transfer
+from core.models import Migration, MigrationShard, MountPoint
+from core.tasks import dispatch_migration, run_migration_shard
+from core.transfer import GB, LocalTransport
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def sharded(settings):
+    settings.MIGRATION_SHARD_MIN_MOUNTPOINTS = 2
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """
+    The transport every TransferEngine in the test uses; set .fail_on to
+    make chunks fail.
+    """
+    shared = LocalTransport()
+    monkeypatch.setattr(transfer, "get_transport", lambda: shared)
+    return shared
+
+
+@pytest.mark.django_db
+def test_sharded_run_transfers_each_mountpoint_and_finalises(
+    sharded, transport, make_migration
+):
+    mig = make_migration(names=("D:\\", "E:\\", "F:\\"))
+
+    assert dispatch_migration(mig.pk, simulated_minutes=0)
+
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.SUCCESS
+    assert mig.bytes_transferred == mig.bytes_total == 3 * GB
+    assert sorted(c.mount_point_name for c in transport.sent) == [
+        "D:\\",
+        "E:\\",
+        "F:\\",
+    ]
+    target = mig.migration_target.target_vm
+    assert target.mountpoints.count() == 3
+    assert not mig.shards.exists()
+
+
+@pytest.mark.django_db
+def test_failed_shard_is_the_only_one_marked_and_rerun(
+    sharded, transport, make_migration, monkeypatch
+):
+    # Eager Celery cannot finish a chord whose header retries.
+    monkeypatch.setattr(run_migration_shard, "max_retries", 0)
+    mig = make_migration(names=("D:\\", "E:\\", "F:\\"))
+    transport.fail_on = lambda chunk: chunk.mount_point_name == "E:\\"
+
+    dispatch_migration(mig.pk, simulated_minutes=0)
+
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.ERROR
+    states = dict(mig.shards.values_list("mountpoint__mount_point_name", "state"))
+    assert states == {
+        "D:\\": Migration.State.SUCCESS,
+        "E:\\": Migration.State.ERROR,
+        "F:\\": Migration.State.SUCCESS,
+    }
+    assert "E:\\" in mig.shards.get(state=Migration.State.ERROR).error
+    assert not MountPoint.objects.filter(workload=mig.migration_target.target_vm)
+
+    resp = APIClient().get(reverse("migration-shards", args=[mig.pk]))
+    assert [s["state"] for s in resp.json()] == ["success", "error", "success"]
+
+    transport.fail_on = None
+    transport.sent.clear()
+    dispatch_migration(mig.pk, simulated_minutes=0)
+
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.SUCCESS
+    assert [c.mount_point_name for c in transport.sent] == ["E:\\"]
+    assert mig.migration_target.target_vm.mountpoints.count() == 3
+    assert not MigrationShard.objects.exists()
+
+
+@pytest.mark.django_db
+def test_shard_retries_a_transient_failure(transport, make_migration):
+    mig = make_migration(names=("D:\\", "E:\\"))
+    shard_ids = mig.start_shards(task_id="t1")
+    failures = []
+
+    def fail_once(chunk):
+        if chunk.mount_point_name == "E:\\" and not failures:
+            failures.append(chunk)
+            return True
+        return False
+
+    transport.fail_on = fail_once
+    for shard_id in shard_ids:
+        run_migration_shard.apply((shard_id,), throw=False)
+
+    assert len(failures) == 1
+    assert set(mig.shards.values_list("state", flat=True)) == {Migration.State.SUCCESS}
+    assert mig.finish_shards(task_id="t1") == Migration.State.SUCCESS
+    assert mig.migration_target.target_vm.mountpoints.count() == 2
+
+
+@pytest.mark.django_db
+def test_finish_leaves_a_run_that_lost_its_claim_alone(transport, make_migration):
+    mig = make_migration(names=("D:\\", "E:\\"))
+    for shard_id in mig.start_shards(task_id="t1"):
+        run_migration_shard.apply((shard_id,))
+
+    # The run was expired and dispatched again while its shards ran.
+    Migration.objects.filter(pk=mig.pk).update(task_id="t2")
+    assert mig.finish_shards(task_id="t1") is None
+
+    mig.refresh_from_db()
+    assert (mig.state, mig.task_id) == (Migration.State.RUNNING, "t2")
+    assert mig.shards.count() == 2
+    assert not mig.migration_target.target_vm.mountpoints.exists()
+
+
+@pytest.mark.django_db
+def test_incremental_run_shards_only_changed_mountpoints(
+    sharded, transport, make_migration
+):
+    mig = make_migration(names=("D:\\", "E:\\", "F:\\"))
+    dispatch_migration(mig.pk, simulated_minutes=0)
+    mig.source.mountpoints.filter(mount_point_name="F:\\").update(total_size=2)
+    transport.sent.clear()
+
+    client = APIClient()
+    url = reverse("migration-run", args=[mig.pk])
+    assert client.post(url, {"incremental": "maybe"}).status_code == 400
+    assert client.post(url, [True], format="json").status_code == 400
+    assert client.post(url, {"incremental": True}, format="json").status_code == 202
+
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.SUCCESS
+    assert mig.bytes_total == 2 * GB
+    assert {c.mount_point_name for c in transport.sent} == {"F:\\"}
+    assert dict(
+        mig.migration_target.target_vm.mountpoints.values_list(
+            "mount_point_name", "total_size"
+        )
+    ) == {"D:\\": 1, "E:\\": 1, "F:\\": 2}
@@ -0,0 +1,131 @@
+import pytest
+from core.models import Credentials, Migration, MigrationTarget, MountPoint, Workload
+from core.tasks import retry_countdown
+from core.transfer import (
+    GB,
+    Checkpoint,
+    Chunk,
+    LocalTransport,
+    TransferEngine,
+    Transport,
+    plan_chunks,
+)
+
+
+class TestPlanChunks:
+    def test_chunks_cover_total_size(self):
+        mp = MountPoint(pk=1, mount_point_name="D:\\", total_size=5)
+        chunks = list(plan_chunks([mp], chunk_size=2 * GB))
+        assert [c.size for c in chunks] == [2 * GB, 2 * GB, GB]
+        assert [c.offset for c in chunks] == [0, 2 * GB, 4 * GB]
+
+    def test_empty_mountpoint_has_no_chunks(self):
+        mp = MountPoint(pk=1, mount_point_name="D:\\", total_size=0)
+        assert list(plan_chunks([mp])) == []
+
+
+class TestTransferEngine:
+    def test_transfers_every_chunk_once(self):
+        mps = [
+            MountPoint(pk=1, mount_point_name="D:\\", total_size=3),
+            MountPoint(pk=2, mount_point_name="E:\\", total_size=4),
+        ]
+        transport = LocalTransport()
+        seen = []
+        engine = TransferEngine(transport, chunk_size=GB, max_workers=3)
+
+        transferred = engine.transfer(mps, on_chunk=seen.append)
+
+        assert transferred == 7 * GB
+        assert len(transport.sent) == 7
+        assert sorted((c.mountpoint_id, c.index) for c in seen) == sorted(
+            (c.mountpoint_id, c.index) for c in transport.sent
+        )
+
+    def test_transport_must_implement_send(self):
+        class Incomplete(Transport):
+            pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_transport_failure_propagates(self):
+        mp = MountPoint(pk=1, mount_point_name="D:\\", total_size=4)
+        transport = LocalTransport(fail_on=lambda c: c.index == 2)
+        engine = TransferEngine(transport, chunk_size=GB, max_workers=2)
+
+        with pytest.raises(IOError):
+            engine.transfer([mp])
+
+
+@pytest.mark.django_db
+def test_run_uses_engine_and_marks_error_on_failure():
+    c = Credentials.objects.create(username="u", password="p", domain="d")
+    src = Workload.objects.create(ip="192.0.2.20", credentials=c)
+    mp = MountPoint.objects.create(workload=src, mount_point_name="D:\\", total_size=2)
+    tgt = MigrationTarget.objects.create(
+        cloud_type="aws",
+        cloud_credentials=c,
+        target_vm=Workload.objects.create(ip="192.0.2.21", credentials=c),
+    )
+    mig = Migration.objects.create(source=src, migration_target=tgt)
+    mig.selected_mountpoints.set([mp])
+
+    engine = TransferEngine(LocalTransport(fail_on=lambda c: True), chunk_size=GB)
+    with pytest.raises(IOError):
+        mig.run(simulated_minutes=0, engine=engine)
+
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.ERROR
+
+
+class TestCheckpoint:
+    def test_out_of_order_chunks_advance_once_gap_closes(self):
+        cp = Checkpoint(GB)
+        chunks = [Chunk(1, "D:\\", i, i * GB, GB) for i in range(3)]
+        cp.mark(chunks[1])
+        cp.mark(chunks[2])
+        assert cp.done.get(1, 0) == 0
+        cp.mark(chunks[0])
+        assert cp.done[1] == 3
+
+    def test_load_discards_other_chunk_size(self):
+        cp = Checkpoint(GB, {1: 4})
+        assert Checkpoint.load(cp.as_dict(), GB).done == {1: 4}
+        assert Checkpoint.load(cp.as_dict(), 2 * GB).done == {}
+
+
+@pytest.mark.django_db
+def test_failed_run_resumes_from_checkpoint(make_migration):
+    mig = make_migration(names=("D:\\", "E:\\"))
+    MountPoint.objects.filter(workload=mig.source).update(total_size=4)
+    d_drive = mig.selected_mountpoints.get(mount_point_name="D:\\")
+
+    failing = LocalTransport(
+        fail_on=lambda c: c.mountpoint_id != d_drive.pk and c.index == 2
+    )
+    engine = TransferEngine(failing, chunk_size=GB, max_workers=1)
+    with pytest.raises(IOError):
+        mig.run(simulated_minutes=0, engine=engine)
+
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.ERROR
+    assert mig.bytes_transferred == 6 * GB
+    assert sorted(mig.checkpoint["mountpoints"].values()) == [2, 4]
+
+    transport = LocalTransport()
+    mig.run(simulated_minutes=0, engine=TransferEngine(transport, chunk_size=GB))
+
+    assert sorted(c.index for c in transport.sent) == [2, 3]
+    mig.refresh_from_db()
+    assert mig.state == Migration.State.SUCCESS
+    assert mig.bytes_transferred == mig.bytes_total == 8 * GB
+    assert mig.checkpoint == {}
+
+
+def test_retry_countdown_grows_and_is_capped(settings):
+    settings.MIGRATION_RETRY_BACKOFF = 10
+    settings.MIGRATION_RETRY_BACKOFF_MAX = 100
+    assert all(0 <= retry_countdown(0) <= 10 for _ in range(20))
+    assert all(0 <= retry_countdown(3) <= 80 for _ in range(20))
+    assert all(retry_countdown(10) <= 100 for _ in range(20))
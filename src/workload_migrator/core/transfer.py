@@ -0,0 +1,260 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+GB = 1024**3
+
+DEFAULT_CHUNK_SIZE = GB
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """
+    A fixed-size slice of a mount point's data.
+    """
+
+    mountpoint_id: int
+    mount_point_name: str
+    index: int
+    offset: int
+    size: int
+
+
+class Transport(ABC):
+    """
+    Moves chunks of data to the target environment.
+    Subclasses must implement send(); it is called from executor threads.
+    """
+
+    @abstractmethod
+    def send(self, chunk: Chunk) -> None: ...
+
+
+class LocalTransport(Transport):
+    """
+    In-process fake transport that records every chunk it is handed.
+    Used as the default in development and tests.
+    """
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, chunk: Chunk) -> None:
+        if self.fail_on is not None and self.fail_on(chunk):
+            raise IOError(f"Simulated failure sending {chunk}")
+        with self._lock:
+            self.sent.append(chunk)
+
+
+def get_transport() -> Transport:
+    """
+    Instantiate the transport configured by MIGRATION_TRANSPORT.
+    """
+    path = getattr(settings, "MIGRATION_TRANSPORT", "core.transfer.LocalTransport")
+    return import_string(path)()
+
+
+def plan_chunks(mountpoints, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Split each mount point into fixed-size chunks based on its total_size (GB).
+    Yields Chunk objects lazily so multi-TB selections are never materialised.
+    """
+    for mp in mountpoints:
+        remaining = mp.total_size * GB
+        index = 0
+        offset = 0
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            yield Chunk(mp.pk, mp.mount_point_name, index, offset, size)
+            index += 1
+            offset += size
+            remaining -= size
+
+
+def count_chunks(mountpoints, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    return sum(-(-mp.total_size * GB // chunk_size) for mp in mountpoints)
+
+
+class Checkpoint:
+    """
+    Records, per mount point, how many leading chunks are known to be
+    transferred. Chunks completed out of order are held back until the gap
+    before them closes, so at most one window of in-flight chunks is
+    re-sent after a failure.
+
+    Serialised form: {"chunk_size": int, "mountpoints": {"<id>": done_count}}.
+    """
+
+    def __init__(self, chunk_size, done=None):
+        self.chunk_size = chunk_size
+        self.done = dict(done or {})
+        self._ahead = defaultdict(set)
+
+    @classmethod
+    def load(cls, data, chunk_size):
+        """
+        Restore a checkpoint; one taken with a different chunk size is discarded.
+        """
+        if not data or data.get("chunk_size") != chunk_size:
+            return cls(chunk_size)
+        done = {int(mp_id): count for mp_id, count in data["mountpoints"].items()}
+        return cls(chunk_size, done)
+
+    def as_dict(self):
+        if not self.done:
+            return {}
+        return {
+            "chunk_size": self.chunk_size,
+            "mountpoints": {str(mp_id): count for mp_id, count in self.done.items()},
+        }
+
+    def is_done(self, chunk: Chunk) -> bool:
+        return chunk.index < self.done.get(chunk.mountpoint_id, 0)
+
+    def mark(self, chunk: Chunk) -> None:
+        mp_id = chunk.mountpoint_id
+        count = self.done.get(mp_id, 0)
+        if chunk.index != count:
+            self._ahead[mp_id].add(chunk.index)
+            return
+        count += 1
+        ahead = self._ahead[mp_id]
+        while count in ahead:
+            ahead.remove(count)
+            count += 1
+        self.done[mp_id] = count
+
+    def chunks_done(self, mountpoints) -> int:
+        return sum(self.done.get(mp.pk, 0) for mp in mountpoints)
+
+    def bytes_done(self, mountpoints) -> int:
+        return sum(
+            min(self.done.get(mp.pk, 0) * self.chunk_size, mp.total_size * GB)
+            for mp in mountpoints
+        )
+
+
+class TransferEngine:
+    """
+    Streams chunks through a Transport on a bounded thread pool.
+
+    At most ``max_workers`` chunks are in flight at once, and the on_chunk
+    callback runs on the calling thread after each one (to report progress,
+    checkpoint, etc.). transfer() still blocks its caller until it returns;
+    pass a deadline to stop after a slice of the work, so that a Celery
+    task can end and continue in a new task (see Migration.run).
+    """
+
+    def __init__(self, transport=None, chunk_size=None, max_workers=None):
+        self.transport = transport or get_transport()
+        self.chunk_size = chunk_size or getattr(
+            settings, "MIGRATION_CHUNK_SIZE", DEFAULT_CHUNK_SIZE
+        )
+        self.max_workers = max_workers or getattr(
+            settings, "MIGRATION_TRANSFER_WORKERS", DEFAULT_MAX_WORKERS
+        )
+
+    def transfer(
+        self,
+        mountpoints,
+        duration: float = 0,
+        on_chunk=None,
+        checkpoint=None,
+        deadline=None,
+    ) -> int:
+        """
+        Transfer every chunk of the given mount points.
+
+        :param mountpoints: iterable of MountPoint instances
+        :param duration: simulated wall-clock seconds to spread the transfer
+            over; each chunk is paced to its share of the total
+        :param on_chunk: optional callback invoked on the calling thread
+            with each Chunk once it has been sent
+        :param checkpoint: optional Checkpoint; chunks it already covers are
+            skipped and completed chunks are marked on it
+        :param deadline: optional time.monotonic() value after which no new
+            chunks are started (at least one always is); chunks in flight
+            are finished. The rest is left for a later call, so pass a
+            checkpoint with it.
+        :return: number of bytes transferred
+        """
+        mountpoints = list(mountpoints)
+        total = count_chunks(mountpoints, self.chunk_size)
+        if checkpoint is not None:
+            total -= checkpoint.chunks_done(mountpoints)
+        if total <= 0:
+            return 0
+
+        pace = duration * min(self.max_workers, total) / total if duration else 0
+        transferred = 0
+        pending = deque()
+        chunks = plan_chunks(mountpoints, self.chunk_size)
+        if checkpoint is not None:
+            chunks = (chunk for chunk in chunks if not checkpoint.is_done(chunk))
+            on_chunk = self._marking(checkpoint, on_chunk)
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="transfer"
+        ) as executor:
+            try:
+                for started, chunk in enumerate(chunks):
+                    if (
+                        started
+                        and deadline is not None
+                        and time.monotonic() >= deadline
+                    ):
+                        break
+                    if len(pending) >= self.max_workers:
+                        transferred += self._drain(pending, on_chunk)
+                    pending.append((chunk, executor.submit(self._send, chunk, pace)))
+                while pending:
+                    transferred += self._drain(pending, on_chunk)
+            except BaseException:
+                for _, future in pending:
+                    future.cancel()
+                raise
+
+        return transferred
+
+    @staticmethod
+    def _marking(checkpoint, on_chunk):
+        def callback(chunk):
+            checkpoint.mark(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+
+        return callback
+
+    def _send(self, chunk: Chunk, pace: float) -> None:
+        started = time.monotonic()
+        self.transport.send(chunk)
+        if pace:
+            remaining = pace - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def _drain(self, pending, on_chunk) -> int:
+        """
+        Wait for at least one in-flight chunk and report all finished ones.
+        """
+        wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+        transferred = 0
+        for _ in range(len(pending)):
+            chunk, future = pending.popleft()
+            if not future.done():
+                pending.append((chunk, future))
+                continue
+            future.result()
+            transferred += chunk.size
+            if on_chunk is not None:
+                on_chunk(chunk)
+        return transferred
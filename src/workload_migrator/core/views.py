@@ -1,33 +1,182 @@
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError
+from django.db.models import Prefetch
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 
-from .models import Migration, MigrationTarget, MountPoint, Workload
+from .caching import TARGETS, WORKLOADS, CachedResponseMixin
+from .events import (
+    ALL_MIGRATIONS,
+    get_broker,
+    migration_channel,
+    migration_event,
+    publish_migration,
+)
+from .exports import EXPORT_FORMATS, export_response, iter_serialized
+from .models import Migration, MigrationBatch, MigrationTarget, MountPoint, Workload
+from .planner import plan_migrations
 from .serializers import (
+    MigrationBatchSerializer,
     MigrationSerializer,
+    MigrationShardSerializer,
     MigrationTargetSerializer,
+    MountPointBulkSerializer,
     MountPointSerializer,
+    PlanSerializer,
+    RunBatchSerializer,
+    RunOptionsSerializer,
+    WorkloadBulkSerializer,
     WorkloadSerializer,
+    bulk_max_items,
+    requested_fields,
 )
 
 
-class WorkloadViewSet(viewsets.ModelViewSet):
+def workload_queryset(request):
+    """
+    Workloads with only the relations the request's ?fields= will render.
+    """
+    queryset = Workload.objects.select_related("credentials").prefetch_related(
+        "mountpoints"
+    )
+    fields = requested_fields(request)
+    if fields is not None:
+        if "credentials" not in fields:
+            queryset = queryset.select_related(None)
+        if "mountpoints" not in fields:
+            queryset = queryset.prefetch_related(None)
+    return queryset
+
+
+def migration_queryset(request):
+    """
+    Migrations with their selected mount point ids, unless ?fields= omits them.
+    """
+    queryset = Migration.objects.prefetch_related(
+        Prefetch("selected_mountpoints", queryset=MountPoint.objects.only("id"))
+    )
+    fields = requested_fields(request)
+    if fields is not None and "selected_mountpoints" not in fields:
+        queryset = queryset.prefetch_related(None)
+    return queryset
+
+
+def parse_run_options(request):
+    """
+    Validate the body of a run request (a DRF Request) with
+    RunOptionsSerializer; shared by the sync and async run endpoints.
+    :return: (options, errors), errors being None if the body is valid
+    """
+    try:
+        data = request.data
+    except ParseError as exc:
+        return None, {"detail": exc.detail}
+    serializer = RunOptionsSerializer(data=data)
+    if not serializer.is_valid():
+        return None, serializer.errors
+    return serializer.validated_data, None
+
+
+def bulk_create_response(view, request):
+    """
+    Validate and insert a JSON array of objects with the view's serializer.
+    """
+    if not isinstance(request.data, list):
+        return Response(
+            {"detail": "Expected a list of items."}, status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(request.data) > bulk_max_items():
+        return Response(
+            {"detail": f"At most {bulk_max_items()} items per request."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    serializer = view.get_serializer(data=request.data, many=True)
+    serializer.is_valid(raise_exception=True)
+    try:
+        serializer.save()
+    except IntegrityError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+def export_stream_response(view, request, filename):
     """
-    API endpoint for managing workloads.
+    Stream every row of the view's queryset as NDJSON (default) or CSV.
+    """
+    fmt = request.query_params.get("fmt", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return Response(
+            {"detail": f"Unsupported fmt, expected one of {sorted(EXPORT_FORMATS)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    # Validate ?fields= before the response starts streaming.
+    view.get_serializer()
+    rows = iter_serialized(
+        view.filter_queryset(view.get_queryset()),
+        view.get_serializer_class(),
+        context=view.get_serializer_context(),
+    )
+    return export_response(rows, fmt, filename)
+
+
+class WorkloadViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    """
+    API endpoint for managing workloads. List and detail responses are
+    cached and carry an ETag.
     """
 
+    cache_namespace = WORKLOADS
     queryset = Workload.objects.all()
     serializer_class = WorkloadSerializer
 
+    def get_queryset(self):
+        return workload_queryset(self.request)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        serializer_class=WorkloadBulkSerializer,
+    )
+    def bulk(self, request):
+        """
+        Create many workloads, with nested credentials and mount points,
+        from a JSON array in a single request.
+        """
+        return bulk_create_response(self, request)
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        """
+        Stream all workloads with credentials and mount points (?fmt=ndjson|csv).
+        """
+        return export_stream_response(self, request, "workloads")
+
 
-class MigrationTargetViewSet(viewsets.ModelViewSet):
+class MigrationTargetViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
-    API endpoint for managing migration targets.
+    API endpoint for managing migration targets. List and detail responses
+    are cached and carry an ETag.
     """
 
-    queryset = MigrationTarget.objects.all()
+    cache_namespace = TARGETS
+    queryset = MigrationTarget.objects.select_related("cloud_credentials")
     serializer_class = MigrationTargetSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = requested_fields(self.request)
+        if fields is not None and "cloud_credentials" not in fields:
+            queryset = queryset.select_related(None)
+        return queryset
+
 
 class MigrationViewSet(viewsets.ModelViewSet):
     """
@@ -37,21 +186,187 @@ class MigrationViewSet(viewsets.ModelViewSet):
     queryset = Migration.objects.all()
     serializer_class = MigrationSerializer
 
+    def get_queryset(self):
+        queryset = migration_queryset(self.request)
+        if self.action in ("run", "enqueue"):
+            queryset = queryset.prefetch_related(None)
+        return queryset
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        """
+        Stream all migrations with their state (?fmt=ndjson|csv).
+        """
+        return export_stream_response(self, request, "migrations")
+
     @action(detail=True, methods=["post"])
     def run(self, request, pk=None):
         """
         Trigger the migration asynchronously via Celery.
         Returns a task ID which can be used for tracking.
+
+        The migration is claimed atomically before dispatch, so repeated
+        requests never start a second run while one is in progress. Clients
+        may send an Idempotency-Key header: a retry with the key of the last
+        accepted request gets that request's task ID back without a dispatch.
+
+        With {"incremental": true} only the mount points that are missing or
+        resized on the target VM are transferred, and the target is updated
+        in place; a re-sync with nothing to change finishes immediately.
         """
         migration = self.get_object()
-        from core.tasks import run_migration
+        options, errors = parse_run_options(request)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        key = request.headers.get("Idempotency-Key", "")
+        if key and migration.run_key == key:
+            return self._run_response(migration, migration.task_id, replayed=True)
+        if migration.is_running:
+            return Response(
+                {
+                    "detail": "Migration is already running.",
+                    "task_id": migration.task_id,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        if migration.has_c_root():
+            return Response(
+                {"detail": "Migrations including C:\\ are not allowed."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        from core.tasks import dispatch_migration
 
-        result = run_migration.delay(migration.id, simulated_minutes=0)
+        task_id = dispatch_migration(
+            migration.id,
+            simulated_minutes=0,
+            run_key=key,
+            incremental=options["incremental"],
+        )
+        if task_id is None:
+            migration.refresh_from_db()
+            return Response(
+                {
+                    "detail": "Migration is already running.",
+                    "task_id": migration.task_id,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
         migration.refresh_from_db()
-        return Response(
-            {"task_id": result.id, "status": migration.state},
+        return self._run_response(migration, task_id)
+
+    @action(detail=True, methods=["get"], serializer_class=MigrationShardSerializer)
+    def shards(self, request, pk=None):
+        """
+        Per-mount-point shards of the current or last failed sharded run.
+        """
+        migration = self.get_object()
+        shards = migration.shards.select_related("mountpoint").order_by("pk")
+        return Response(self.get_serializer(shards, many=True).data)
+
+    @staticmethod
+    def _run_response(migration, task_id, replayed=False):
+        response = Response(
+            {"task_id": task_id, "status": migration.state},
             status=status.HTTP_202_ACCEPTED,
         )
+        if replayed:
+            response["Idempotent-Replayed"] = "true"
+        return response
+
+    @action(detail=True, methods=["post"])
+    def enqueue(self, request, pk=None):
+        """
+        Queue the migration for the scheduler, which starts it once the
+        per-target, per-cloud and GB-in-flight limits allow.
+        Accepts an optional integer "priority".
+        """
+        migration = self.get_object()
+        if not isinstance(request.data, dict):
+            return Response(
+                {"detail": "Expected an object."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            priority = int(request.data.get("priority", migration.priority))
+        except (TypeError, ValueError):
+            return Response(
+                {"priority": "A valid integer is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if migration.has_c_root():
+            return Response(
+                {"detail": "Migrations including C:\\ are not allowed."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queued = Migration.objects.filter(
+            pk=migration.pk,
+            state__in=[Migration.State.NOT_STARTED, Migration.State.ERROR],
+        ).update(state=Migration.State.QUEUED, priority=priority)
+        if not queued:
+            return Response(
+                {"detail": f"Migration is {migration.state} and cannot be queued."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        from core.tasks import schedule_migrations
+
+        migration.refresh_from_db()
+        publish_migration(migration)
+        schedule_migrations.delay(simulated_minutes=0)
+        migration.refresh_from_db()
+        return Response({"status": migration.state}, status=status.HTTP_202_ACCEPTED)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="run-batch",
+        serializer_class=RunBatchSerializer,
+    )
+    def run_batch(self, request):
+        """
+        Validate a set of migrations with one query and start them as a
+        batch, at most concurrency at a time. Returns the batch handle.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        migration_ids = serializer.validated_data["migration_ids"]
+
+        batch = MigrationBatch.objects.create(
+            concurrency=serializer.validated_data["concurrency"],
+            incremental=serializer.validated_data["incremental"],
+        )
+        batch.migrations.set(migration_ids)
+        from core.tasks import advance_batch
+
+        result = advance_batch.delay(batch.pk, simulated_minutes=0)
+        batch.refresh_from_db()
+        data = MigrationBatchSerializer(batch).data
+        data["task_id"] = result.id
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="plan",
+        serializer_class=PlanSerializer,
+    )
+    def plan(self, request):
+        """
+        Dry run: size the selected migrations per target VM and cloud type,
+        estimate the wave's duration from historical throughput and report
+        conflicts (shared target VMs, C:\\ selections). Nothing is started.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(plan_migrations(serializer.validated_data["queryset"]))
+
+
+class MigrationBatchViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only endpoints for tracking the progress of migration batches.
+    """
+
+    queryset = MigrationBatch.objects.all()
+    serializer_class = MigrationBatchSerializer
 
 
 class MountPointViewSet(viewsets.ModelViewSet):
@@ -61,3 +376,63 @@ class MountPointViewSet(viewsets.ModelViewSet):
 
     queryset = MountPoint.objects.all()
     serializer_class = MountPointSerializer
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        serializer_class=MountPointBulkSerializer,
+    )
+    def bulk(self, request):
+        """
+        Create many mount points on existing workloads from a JSON array.
+        """
+        return bulk_create_response(self, request)
+
+
+TERMINAL_STATES = {Migration.State.SUCCESS, Migration.State.ERROR}
+
+
+def sse_message(data):
+    return f"data: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def migration_events(request, pk=None):
+    """
+    Server-sent events stream of migration state and progress changes.
+
+    /api/migrations/events/ streams every migration; /api/migrations/{id}/events/
+    sends the current snapshot, then changes to that migration, and closes once
+    it reaches a terminal state. Must be served by an ASGI server: under WSGI
+    each open stream would hold a worker for good, so it answers 501 instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "Event streams are only served by the ASGI application."},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+    if pk is not None and not await Migration.objects.filter(pk=pk).aexists():
+        raise Http404
+    channel = ALL_MIGRATIONS if pk is None else migration_channel(pk)
+    heartbeat = getattr(settings, "MIGRATION_EVENTS_HEARTBEAT", 15)
+
+    async def stream():
+        async with get_broker().subscribe(channel) as subscription:
+            if pk is not None:
+                migration = await Migration.objects.aget(pk=pk)
+                yield sse_message(migration_event(migration))
+                if migration.state in TERMINAL_STATES:
+                    return
+            while True:
+                message = await subscription.get(timeout=heartbeat)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_message(message)
+                if pk is not None and message["state"] in TERMINAL_STATES:
+                    return
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
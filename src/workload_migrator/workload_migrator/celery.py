@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_process_init
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "workload_migrator.settings")
 
@@ -11,6 +12,33 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
 
+@worker_process_init.connect
+def close_inherited_connections(**kwargs):
+    """
+    A prefork child must not reuse database connections opened by
+    the parent before the fork; drop them so each child connects on its own.
+    """
+    from django.db import connections
+
+    connections.close_all()
+
+
+@task_prerun.connect
+@task_postrun.connect
+def close_old_connections(**kwargs):
+    """
+    Give tasks the same connection lifecycle as web requests: discard
+    connections that are broken or older than CONN_MAX_AGE. Connections
+    inside an atomic block are left alone; eager tasks run inside their
+    caller's transaction.
+    """
+    from django.db import connections
+
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close_if_unusable_or_obsolete()
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f"Request: {self.request!r}")
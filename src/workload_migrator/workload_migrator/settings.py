@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+
 import os
 from pathlib import Path
 
@@ -43,6 +44,80 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
 
+# Size-aware routing (core.tasks.route_migration): a migration task goes to the
+# first queue whose limit (GB selected) it fits under. Give each queue its own
+# workers; see the worker services in docker-compose.yml.
+MIGRATION_QUEUES = [
+    ("migrations.small", int(os.getenv("MIGRATION_QUEUE_SMALL_MAX_GB", 100))),
+    ("migrations.medium", int(os.getenv("MIGRATION_QUEUE_MEDIUM_MAX_GB", 1024))),
+    ("migrations.large", None),
+]
+CELERY_TASK_ROUTES = ["core.tasks.route_migration"]
+# Migration tasks run for minutes to hours and ack late, so a worker process
+# reserves only the task it is running instead of hoarding a backlog.
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(
+    os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER", 1)
+)
+# Redis redelivers an unacknowledged message once its visibility timeout
+# expires, even while the task is still running. Keep it above the longest
+# expected migration; a worker that dies hard is redelivered after this long.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": int(os.getenv("CELERY_VISIBILITY_TIMEOUT", 48 * 3600)),
+}
+
+# Migration transfer engine
+MIGRATION_TRANSPORT = os.getenv("MIGRATION_TRANSPORT", "core.transfer.LocalTransport")
+MIGRATION_CHUNK_SIZE = int(os.getenv("MIGRATION_CHUNK_SIZE", 1024**3))  # bytes
+MIGRATION_TRANSFER_WORKERS = int(os.getenv("MIGRATION_TRANSFER_WORKERS", 8))
+# Seconds of transfer per run_migration task before the run re-enqueues itself
+# from its checkpoint and frees the worker process (0 = one task per run)
+MIGRATION_TRANSFER_WINDOW = float(os.getenv("MIGRATION_TRANSFER_WINDOW", 60))
+# Minimum seconds between progress writes for a running migration
+MIGRATION_PROGRESS_INTERVAL = float(os.getenv("MIGRATION_PROGRESS_INTERVAL", 2))
+# run_migration retries: random delay up to BACKOFF * 2**retries, capped at MAX
+MIGRATION_RETRY_BACKOFF = int(os.getenv("MIGRATION_RETRY_BACKOFF", 60))
+MIGRATION_RETRY_BACKOFF_MAX = int(os.getenv("MIGRATION_RETRY_BACKOFF_MAX", 3600))
+# A running migration or shard whose progress_updated_at heartbeat is older than
+# this (seconds) is presumed dead and may be claimed again. Must exceed the time
+# one chunk takes to transfer, since progress is written between chunks, and the
+# time a windowed run waits in its queue between windows.
+MIGRATION_HEARTBEAT_TIMEOUT = int(os.getenv("MIGRATION_HEARTBEAT_TIMEOUT", 900))
+# Run migrations selecting at least this many mount points as one Celery task
+# per mount point (0 = never shard)
+MIGRATION_SHARD_MIN_MOUNTPOINTS = int(os.getenv("MIGRATION_SHARD_MIN_MOUNTPOINTS", 0))
+# Default number of migrations a run-batch request may run at the same time
+MIGRATION_BATCH_CONCURRENCY = int(os.getenv("MIGRATION_BATCH_CONCURRENCY", 10))
+
+# Pub/sub for migration state/progress events (server-sent events endpoint).
+# InMemoryBroker only reaches subscribers in the same process; use
+# core.events.RedisBroker when Celery workers run separately.
+MIGRATION_EVENTS_BROKER = os.getenv(
+    "MIGRATION_EVENTS_BROKER", "core.events.InMemoryBroker"
+)
+MIGRATION_EVENTS_URL = os.getenv("MIGRATION_EVENTS_URL", CELERY_BROKER_URL)
+MIGRATION_EVENTS_HEARTBEAT = float(os.getenv("MIGRATION_EVENTS_HEARTBEAT", 15))
+
+# Admission limits for queued migrations (0 = unlimited).
+# ORDER is one of "priority", "size" (smallest first) or "size_desc".
+MIGRATION_SCHEDULER = {
+    "PER_TARGET": int(os.getenv("MIGRATION_MAX_PER_TARGET", 1)),
+    "PER_CLOUD": int(os.getenv("MIGRATION_MAX_PER_CLOUD", 50)),
+    "MAX_GB_IN_FLIGHT": int(os.getenv("MIGRATION_MAX_GB_IN_FLIGHT", 0)),
+    "ORDER": os.getenv("MIGRATION_SCHEDULER_ORDER", "priority"),
+}
+
+# Bytes per second assumed by the migration planner before any migration has finished.
+MIGRATION_PLAN_DEFAULT_THROUGHPUT = int(
+    os.getenv("MIGRATION_PLAN_DEFAULT_THROUGHPUT", 100 * 1024**2)
+)
+
+CELERY_BEAT_SCHEDULE = {
+    "schedule-migrations": {
+        "task": "core.tasks.schedule_migrations",
+        "schedule": float(os.getenv("MIGRATION_SCHEDULER_INTERVAL", 10)),
+    },
+}
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -68,6 +143,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -79,14 +155,41 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.IdCursorPagination",
+    "PAGE_SIZE": 100,
 }
 
+# Request profiling (core.instrumentation): profile this fraction of requests
+# and dump the profiles of those slower than the threshold to PROFILE_DIR.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))  # 0 = off
+PROFILE_THRESHOLD_MS = float(os.getenv("PROFILE_THRESHOLD_MS", 500))
+PROFILER = os.getenv("PROFILER", "cprofile")  # or "pyinstrument"
+PROFILE_DIR = os.getenv("PROFILE_DIR", str(PROJECT_ROOT.parent / "profiles"))
+
+# Celery worker processes serve no HTTP, so each prefork child exports its own
+# task metrics at http://<host>:<WORKER_METRICS_PORT + child index>/metrics.
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 0))  # 0 = off
+
+# Bulk import endpoints (POST /api/<resource>/bulk/)
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 10000))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 1000))
+
+# Share one Credentials row between every workload/target with the same
+# username, domain and password instead of inserting a row per write.
+CREDENTIALS_DEDUP = os.getenv("CREDENTIALS_DEDUP", "false").lower() == "true"
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Workload Migrator API",
     "DESCRIPTION": "Manage workloads, mountpoints, migration targets, and async migrations.",
     "VERSION": "1.0.0",
 }
 
+# OpenAPI schema at /api/schema/: "live" regenerates it on every request;
+# "static" serves the artifacts written by `manage.py build_schema` (or, if
+# none were built, a copy generated once per process). See core.schema.
+API_SCHEMA_MODE = os.getenv("API_SCHEMA_MODE", "live" if DEBUG else "static")
+API_SCHEMA_DIR = os.getenv("API_SCHEMA_DIR", str(PROJECT_ROOT.parent / "schema"))
+
 ROOT_URLCONF = "workload_migrator.urls"
 
 TEMPLATES = [
@@ -127,9 +230,34 @@ DATABASES = {
         "PASSWORD": require_env("DB_PASSWORD"),
         "HOST": require_env("DB_HOST"),
         "PORT": require_env("DB_PORT"),
+        # Seconds to keep a connection open between requests/tasks instead of
+        # reconnecting every time (0 = close after each request, None = never
+        # close). Off by default: under ASGI every request runs in its own
+        # thread, so persistent connections pile up instead of being reused.
+        # Set it for WSGI (Gunicorn) web processes and Celery workers.
+        # Health checks detect connections the server dropped while idle.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "true").lower()
+        == "true",
     }
 }
 
+# Response cache for the read-heavy API endpoints (see core.caching).
+# Process-local by default; set CACHE_URL=redis://... to share it between
+# web processes so invalidations are seen everywhere.
+CACHE_URL = os.getenv("CACHE_URL")
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+        if CACHE_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", 300))  # seconds
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
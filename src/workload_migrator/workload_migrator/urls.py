@@ -15,15 +15,20 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from core import async_views
+from core.instrumentation import metrics_view
+from core.schema import schema_view
 from core.views import (
+    MigrationBatchViewSet,
     MigrationTargetViewSet,
     MigrationViewSet,
     MountPointViewSet,
     WorkloadViewSet,
+    migration_events,
 )
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
@@ -31,11 +36,44 @@ router.register(r"workloads", WorkloadViewSet)
 router.register(r"targets", MigrationTargetViewSet)
 router.register(r"migrations", MigrationViewSet)
 router.register(r"mountpoints", MountPointViewSet)
+router.register(r"batches", MigrationBatchViewSet)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
+    path("api/migrations/events/", migration_events, name="migration-events"),
+    path(
+        "api/migrations/<int:pk>/events/",
+        migration_events,
+        name="migration-events-detail",
+    ),
+    path(
+        "api/async/workloads/",
+        async_views.workload_list,
+        name="async-workload-list",
+    ),
+    path(
+        "api/async/workloads/<int:pk>/",
+        async_views.workload_detail,
+        name="async-workload-detail",
+    ),
+    path(
+        "api/async/migrations/",
+        async_views.migration_list,
+        name="async-migration-list",
+    ),
+    path(
+        "api/async/migrations/<int:pk>/",
+        async_views.migration_detail,
+        name="async-migration-detail",
+    ),
+    path(
+        "api/async/migrations/<int:pk>/run/",
+        async_views.migration_run,
+        name="async-migration-run",
+    ),
     path("api/", include(router.urls)),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("api/schema/", schema_view, name="schema"),
     path(
         "api/docs/",
         SpectacularSwaggerView.as_view(url_name="schema"),